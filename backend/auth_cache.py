@@ -0,0 +1,99 @@
+"""Cache of verified bearer tokens -> authenticated user.
+
+Every admin request used to decode the JWT and then load the user row.
+`PrincipalCache` remembers the result per token so repeated requests with
+the same token skip both. Entries live until the token expires or the TTL
+runs out, whichever comes first.
+
+Skipping the user lookup is only safe while the user has not been changed,
+so entries are also tied to the `users` table version (see cache.py):
+any committed change to a user bumps it, which invalidates every worker's
+entries on their next request. Within that constraint, `trust_window`
+controls how long a principal is trusted without re-reading its row;
+0 means always re-read (the cache then only saves the JWT decode).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class _Entry(NamedTuple):
+    principal: Any
+    username: str
+    expires_at: float
+    checked_at: float
+    users_version: int
+
+
+class PrincipalCache:
+    def __init__(self, versions, ttl: float = 300.0, trust_window: float = 30.0, max_entries: int = 1024):
+        self.versions = versions
+        self.ttl = ttl
+        self.trust_window = trust_window
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.lookups_saved = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[_Entry]:
+        """Return the cached entry for `token` if it is still valid."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or now >= entry.expires_at:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry
+
+    def trusted(self, entry: _Entry) -> bool:
+        """True if `entry.principal` can be used without reloading the user."""
+        if time.time() - entry.checked_at > self.trust_window:
+            return False
+        if self.versions.current("users") != entry.users_version:
+            return False
+        self.lookups_saved += 1
+        return True
+
+    def put(self, token: str, principal: Any, username: str, token_expires_at: float, users_version: int) -> None:
+        now = time.time()
+        entry = _Entry(principal, username, min(now + self.ttl, token_expires_at), now, users_version)
+        with self._lock:
+            self._entries[token] = entry
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, username: str) -> None:
+        """Drop this worker's entries for `username` and bump `users` for the rest."""
+        with self._lock:
+            stale = [token for token, entry in self._entries.items() if entry.username == username]
+            for token in stale:
+                del self._entries[token]
+            self.invalidations += 1
+        self.versions.bump("users")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "lookups_saved": self.lookups_saved,
+                "invalidations": self.invalidations,
+                "saved_ratio": round(self.lookups_saved / requests, 4) if requests else 0.0,
+                "ttl_seconds": self.ttl,
+                "trust_window_seconds": self.trust_window,
+            }
@@ -0,0 +1,254 @@
+"""Online snapshots of the SQLite database, and restoring one.
+
+Copying `medassoc.db` while workers write can tear it (and misses whatever
+is still in the -wal file). `BackupManager.snapshot()` copies it with
+SQLite's online backup API instead, on its own connection, meant for a
+thread:
+
+* the source connection first opens a read transaction, so every step of
+  the copy reads the same snapshot of the database. Without it the backup
+  API starts over from page one whenever another connection commits, and
+  under steady writes it never finishes. In WAL mode a reader never blocks
+  writers; the only cost is that checkpoints cannot recycle the WAL past
+  the snapshot until the copy is done;
+* pages are copied `pages` at a time with a `pause` between steps, so the
+  copy comes in short bursts of I/O instead of one long one next to the
+  live site;
+* the copy is switched to a rollback journal (one self-contained file),
+  checked with `PRAGMA quick_check`, optionally gzip-compressed, fsynced
+  and only then renamed into place: a `.partial` file is never a snapshot;
+* the oldest snapshots beyond `keep` are deleted.
+
+Snapshots are `<db name>-<UTC timestamp>.db[.gz]` files in `directory`.
+One backup runs at a time across all workers and scripts (an flock on
+`directory/.lock`). With an `interval`, `start()` runs a task that takes a
+snapshot whenever the newest one is older than that; every worker runs
+it, and the lock plus the age check make only one of them do the work.
+
+`restore()` writes a snapshot back over the database, also through the
+backup API so the target's WAL and shared memory stay consistent. Stop the
+app first: running workers keep caches of the old data. A restored
+snapshot from an older schema is migrated by the next worker that starts
+(see migrations.py).
+"""
+import asyncio
+import fcntl
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%SZ"
+CHUNK_BYTES = 1024 * 1024
+
+
+class BackupBusy(Exception):
+    """Raised when another process is taking a snapshot."""
+
+
+class Snapshot(NamedTuple):
+    path: str
+    created: datetime
+    size: int
+
+    def as_dict(self) -> dict:
+        return {"name": os.path.basename(self.path), "created": self.created.isoformat(), "size": self.size}
+
+
+def _fsync_dir(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _copy(source: sqlite3.Connection, target: sqlite3.Connection, pages: int, pause: float,
+          progress: Optional[Callable[[int, int], None]]) -> None:
+    def step(status, remaining, total):
+        if progress is not None:
+            progress(total - remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    source.backup(target, pages=pages, progress=step)
+
+
+def _check(conn: sqlite3.Connection, pragma: str = "quick_check") -> None:
+    result = [row[0] for row in conn.execute(f"PRAGMA {pragma}").fetchall()]
+    if result != ["ok"]:
+        raise sqlite3.DatabaseError(f"{pragma} failed: {'; '.join(result[:5])}")
+
+
+class BackupManager:
+    def __init__(self, db_path: str, directory: str, keep: int = 7, compress: bool = True, compress_level: int = 6,
+                 pages: int = 1024, pause: float = 0.005, interval: float = 0.0):
+        self.db_path = db_path
+        self.directory = directory
+        self.keep = max(1, keep)
+        self.compress = compress
+        self.compress_level = compress_level
+        self.pages = pages
+        self.pause = pause
+        # Seconds between scheduled snapshots; 0 leaves it to scripts/backup.py
+        self.interval = interval
+        self.name = os.path.splitext(os.path.basename(db_path))[0]
+        self._pattern = re.compile(rf"^{re.escape(self.name)}-(\d{{8}}T\d{{6}}Z)\.db(\.gz)?$")
+        self._task: Optional[asyncio.Task] = None
+
+    def list(self) -> List[Snapshot]:
+        """Snapshots in `directory`, newest first."""
+        snapshots = []
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return []
+        for entry in entries:
+            match = self._pattern.match(entry.name)
+            if match and entry.is_file():
+                created = datetime.strptime(match.group(1), TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+                snapshots.append(Snapshot(entry.path, created, entry.stat().st_size))
+        return sorted(snapshots, key=lambda snapshot: snapshot.created, reverse=True)
+
+    def snapshot(self, progress: Optional[Callable[[int, int], None]] = None,
+                 max_age: Optional[float] = None) -> Snapshot:
+        """Take a snapshot and prune old ones. Blocking; raises BackupBusy if one is running.
+
+        `progress(pages copied, total pages)` is called after each step. With
+        `max_age`, a snapshot younger than that many seconds is returned instead.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise BackupBusy(f"a backup of {self.db_path} is already running")
+            started = time.perf_counter()
+            created = datetime.now(timezone.utc).replace(microsecond=0)
+            newest = self.list()
+            if newest and max_age is not None and (created - newest[0].created).total_seconds() < max_age:
+                # Another worker took one since we checked
+                return newest[0]
+            # Two snapshots within a second would share a name
+            if newest and newest[0].created >= created:
+                time.sleep(1)
+                created = datetime.now(timezone.utc).replace(microsecond=0)
+            base = os.path.join(self.directory, f"{self.name}-{created.strftime(TIMESTAMP_FORMAT)}.db")
+            path = base + ".gz" if self.compress else base
+            partial = base + ".partial"
+            try:
+                self._copy_to(partial, progress)
+                if self.compress:
+                    with open(partial, "rb") as src, gzip.open(path + ".partial", "wb", self.compress_level) as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_BYTES)
+                    os.unlink(partial)
+                    partial = path + ".partial"
+                with open(partial, "rb+") as f:
+                    os.fsync(f.fileno())
+                os.replace(partial, path)
+                _fsync_dir(self.directory)
+            finally:
+                for leftover in (base + ".partial", path + ".partial"):
+                    if os.path.exists(leftover):
+                        os.unlink(leftover)
+            snapshot = Snapshot(path, created, os.path.getsize(path))
+            logger.info("Backed up %s to %s (%d bytes) in %.1fs", self.db_path, path, snapshot.size,
+                        time.perf_counter() - started)
+            self.prune()
+            return snapshot
+
+    def _copy_to(self, path: str, progress: Optional[Callable[[int, int], None]]) -> None:
+        source = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+        target = sqlite3.connect(path, isolation_level=None)
+        try:
+            source.execute("PRAGMA query_only=ON")
+            # Pin one snapshot for the whole copy (see the module docstring)
+            source.execute("BEGIN")
+            source.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            try:
+                _copy(source, target, self.pages, self.pause, progress)
+            finally:
+                source.execute("COMMIT")
+            target.execute("PRAGMA journal_mode=DELETE")
+            _check(target)
+        finally:
+            target.close()
+            source.close()
+
+    def prune(self) -> List[Snapshot]:
+        """Delete all but the newest `keep` snapshots; returns the deleted ones."""
+        removed = self.list()[self.keep:]
+        for snapshot in removed:
+            os.unlink(snapshot.path)
+            logger.info("Removed old backup %s", snapshot.path)
+        return removed
+
+    def find(self, name: str) -> Snapshot:
+        """A snapshot by file name or path."""
+        for snapshot in self.list():
+            if name in (snapshot.path, os.path.basename(snapshot.path)):
+                return snapshot
+        raise FileNotFoundError(f"no backup named {name} in {self.directory}")
+
+    # --- schedule ---------------------------------------------------------
+
+    def due(self) -> bool:
+        newest = self.list()
+        return not newest or (datetime.now(timezone.utc) - newest[0].created).total_seconds() >= self.interval
+
+    async def _run(self) -> None:
+        while True:
+            if self.due():
+                try:
+                    await asyncio.to_thread(self.snapshot, None, self.interval)
+                except BackupBusy:
+                    pass
+                except (OSError, sqlite3.Error):
+                    logger.exception("Scheduled backup of %s failed", self.db_path)
+            await asyncio.sleep(min(self.interval, 60))
+
+    def start(self) -> None:
+        if self.interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        # A snapshot in progress finishes in its thread, or leaves a .partial file behind
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def restore(snapshot_path: str, db_path: str, pages: int = -1) -> None:
+    """Replace the database at `db_path` with a snapshot (plain or .gz). Stop the app first."""
+    plain = snapshot_path
+    if snapshot_path.endswith(".gz"):
+        plain = f"{db_path}.restore"
+        with gzip.open(snapshot_path, "rb") as src, open(plain, "wb") as dst:
+            shutil.copyfileobj(src, dst, CHUNK_BYTES)
+    try:
+        source = sqlite3.connect(f"file:{plain}?mode=ro", uri=True)
+        target = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+        try:
+            _check(source, "integrity_check")
+            _copy(source, target, pages, 0, None)
+            # The snapshot is in rollback-journal mode; the app runs in WAL
+            target.execute("PRAGMA journal_mode=WAL")
+            _check(target)
+        finally:
+            target.close()
+            source.close()
+    finally:
+        if plain != snapshot_path:
+            os.unlink(plain)
+    logger.info("Restored %s from %s", db_path, snapshot_path)
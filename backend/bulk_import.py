@@ -0,0 +1,259 @@
+"""Streaming bulk import of directory rows (CSV or NDJSON).
+
+Loading a roster of tens of thousands of doctors one `POST /api/doctors`
+at a time costs a round trip, a validation pass and a commit per row.
+`import_rows` instead reads the request body as it arrives, decodes it line
+by line and validates records in chunks of `chunk_size` against the same
+pydantic schema the single-row endpoint uses. Each chunk of valid rows is
+written with one executemany INSERT submitted to the `SerializedWriter`,
+so a chunk is one bounded transaction; the next chunk is parsed while the
+previous one is being written.
+
+Rows that fail validation are skipped and reported by line number. Chunks
+commit independently: if the import fails midway, the chunks before the
+failure stay committed and `ImportReport.inserted` says how many rows that
+was.
+
+CSV needs a header row naming the columns; empty cells count as missing.
+A quoted field may span lines, up to `MAX_RECORD_LINES` lines and
+`MAX_RECORD_CHARS` characters: a quote that is never closed is reported
+on the line it opened, and the lines after it are read again as rows of
+their own, so one bad row costs one row. NDJSON is one JSON object per
+line. Blank lines are ignored in both.
+"""
+import asyncio
+import codecs
+import csv
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Table, insert
+
+FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/x-jsonlines": "ndjson",
+}
+
+# Keeps the report (and the response) bounded for a badly broken file
+MAX_REPORTED_ERRORS = 1000
+
+# Bounds of one CSV record whose quoted fields span lines
+MAX_RECORD_LINES = 200
+MAX_RECORD_CHARS = 256 * 1024
+
+
+class ImportRejected(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def reject(self, line: int, messages: List[str]) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": messages})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "errors_truncated": self.rejected > len(self.errors),
+        }
+
+
+def detect_format(content_type: Optional[str], requested: Optional[str] = None) -> str:
+    if requested:
+        if requested not in ("csv", "ndjson"):
+            raise ImportRejected(400, "Unknown format; expected 'csv' or 'ndjson'.")
+        return requested
+    fmt = FORMATS.get((content_type or "").split(";")[0].strip().lower())
+    if fmt is None:
+        raise ImportRejected(415, f"Send text/csv or application/x-ndjson (got {content_type or 'no content type'}).")
+    return fmt
+
+
+async def _lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """(line number, text) pairs of a UTF-8 byte stream, BOM and CR stripped."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    number = 0
+    async for chunk in stream:
+        try:
+            text, bad = decoder.decode(chunk), False
+        except UnicodeDecodeError as exc:
+            # The lines before the bad byte are still imported
+            text, bad = exc.object[:exc.start].decode("utf-8"), True
+        pending += text
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            number += 1
+            yield number, line.rstrip("\r")
+        if bad:
+            raise ImportRejected(400, f"The upload is not valid UTF-8 (line {number + 1}).")
+    try:
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ImportRejected(400, f"The upload is not valid UTF-8 (line {number + 1}).")
+    if pending:
+        yield number + 1, pending.rstrip("\r")
+
+
+def _ends_quoted(line: str, quoted: bool) -> bool:
+    """Whether a record is still inside a quoted field after `line`, as csv.reader reads it.
+
+    Only a quote at the start of a field opens one: `Dr. A 5" tall` is a
+    plain field with a quote in it.
+    """
+    if not quoted and '"' not in line:
+        return False
+    field_start = not quoted
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if quoted:
+            if char == '"':
+                if line.startswith('"', i + 1):
+                    i += 1
+                else:
+                    quoted = False
+        elif char == '"' and field_start:
+            quoted = True
+        field_start = char == "," and not quoted
+        i += 1
+    return quoted
+
+
+async def _csv_records(stream) -> AsyncIterator[Tuple[int, Any]]:
+    lines = _lines(stream)
+    # Lines after the start of a record that never closed its quote, to read again
+    replay: Deque[Tuple[int, str]] = deque()
+    record: List[Tuple[int, str]] = []
+    quoted = False
+    chars = 0
+    header = None
+    while True:
+        if replay:
+            number, line = replay.popleft()
+        else:
+            try:
+                number, line = await lines.__anext__()
+            except StopAsyncIteration:
+                number = line = None
+        if number is not None:
+            if not record and not line.strip():
+                continue
+            record.append((number, line))
+            chars += len(line)
+            quoted = _ends_quoted(line, quoted)
+            if quoted and len(record) <= MAX_RECORD_LINES and chars <= MAX_RECORD_CHARS:
+                continue
+        elif not record:
+            break
+
+        start = record[0][0]
+        if quoted:
+            # No closing quote before the end of the input or the record limits
+            if header is None:
+                raise ImportRejected(400, "Unreadable CSV header: unterminated quoted field")
+            replay.extendleft(reversed(record[1:]))
+            record, quoted, chars = [], False, 0
+            yield start, ValueError("Unterminated quoted field")
+            continue
+
+        try:
+            fields = next(csv.reader(["\n".join(text for _, text in record)]))
+        except csv.Error as exc:
+            fields = exc
+        record, chars = [], 0
+        if header is None:
+            if isinstance(fields, Exception):
+                raise ImportRejected(400, f"Unreadable CSV header: {fields}")
+            header = [name.strip().lower() for name in fields]
+            continue
+        if isinstance(fields, Exception):
+            yield start, fields
+        elif len(fields) > len(header):
+            yield start, ValueError(f"{len(fields)} fields, the header has {len(header)}")
+        else:
+            yield start, {name: value for name, value in zip(header, fields) if value != ""}
+
+
+async def _ndjson_records(stream) -> AsyncIterator[Tuple[int, Any]]:
+    async for number, line in _lines(stream):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, ValueError(f"Invalid JSON: {exc}")
+            continue
+        yield number, record if isinstance(record, dict) else ValueError("Expected a JSON object")
+
+
+def _messages(exc: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in exc.errors()]
+
+
+async def import_rows(request, fmt: str, schema: Type[BaseModel], table: Table, writer, report: ImportReport,
+                      chunk_size: int = 1000,
+                      prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> ImportReport:
+    """Stream `request`'s body into `table`, validating rows against `schema`.
+
+    `prepare`, if given, maps each validated row to the column values to insert.
+    """
+    records = _csv_records(request.stream()) if fmt == "csv" else _ndjson_records(request.stream())
+    statement = insert(table)
+    pending: Optional[asyncio.Future] = None
+
+    async def flush(rows: List[Dict[str, Any]]) -> None:
+        nonlocal pending
+        if pending is not None:
+            report.inserted += await pending
+            pending = None
+        if rows:
+            async def write(session):
+                await session.execute(statement, rows)
+                return len(rows)
+
+            # Written while the next chunk is parsed and validated
+            pending = asyncio.ensure_future(writer.submit(write))
+
+    chunk: List[Dict[str, Any]] = []
+    try:
+        async for line, record in records:
+            if isinstance(record, Exception):
+                report.reject(line, [str(record)])
+                continue
+            try:
+                row = schema.model_validate(record).model_dump()
+                chunk.append(prepare(row) if prepare else row)
+            except ValidationError as exc:
+                report.reject(line, _messages(exc))
+                continue
+            if len(chunk) >= chunk_size:
+                await flush(chunk)
+                chunk = []
+        await flush(chunk)
+        await flush([])
+    finally:
+        if pending is not None:
+            # Do not leave a write running behind a failed import
+            try:
+                report.inserted += await pending
+            except Exception:
+                pass
+    return report
@@ -0,0 +1,163 @@
+"""Versioned in-process response cache for the public GET endpoints.
+
+Directory data only changes when an admin edits it, so the serialized
+response of a listing can be reused until the underlying table changes.
+Every entry is keyed by (table, table version, path, normalized query),
+which means a write never has to find and evict entries: bumping the
+table version simply makes the old keys unreachable, and the LRU ages
+them out.
+
+Table versions live in small stamp files (their mtime is the version)
+rather than in memory, so a write handled by one gunicorn worker is seen
+by every other worker on its next request for the price of one stat()
+call - no database round trip and no external service.
+"""
+import fcntl
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl
+
+
+def default_version_dir() -> str:
+    """Where the server keeps its stamp files: $CACHE_VERSION_DIR, else backend/.versions.
+
+    Scripts that write to the database bump here, whatever database path
+    they were given, so the running workers see their bumps.
+    """
+    return os.environ.get("CACHE_VERSION_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".versions"))
+
+
+class DataVersions:
+    """Per-table version counters shared by all workers through stamp files."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, table: str) -> str:
+        return os.path.join(self.directory, f"{table}.version")
+
+    def current(self, table: str) -> int:
+        try:
+            return os.stat(self._path(table)).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def bump(self, table: str) -> int:
+        """Advance `table`'s version. Call after the write has committed."""
+        return self.advance(table)[1]
+
+    def advance(self, table: str) -> Tuple[int, int]:
+        """Advance `table`'s version; returns (the version it replaced, the new one).
+
+        Bumps from every process are serialized on an flock, so no other
+        bump falls between reading the old version and writing the new one.
+        """
+        path = self._path(table)
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            previous = self.current(table)
+            # Never reuse a version, even if the clock did not move or went back
+            version = max(time.time_ns(), previous + 1000)
+            with open(path, "a"):
+                pass
+            os.utime(path, ns=(version, version))
+        return previous, version
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison function (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def normalize_query(query_string: str) -> Tuple[Tuple[str, str], ...]:
+    # Parameter order and empty values ("?city=") never change the result
+    return tuple(sorted((k, v) for k, v in parse_qsl(query_string, keep_blank_values=True) if v != ""))
+
+
+class ResponseCache:
+    """Bounded LRU of serialized responses with hit/miss counters."""
+
+    def __init__(self, versions: DataVersions, max_entries: int = 512, max_bytes: int = 32 * 1024 * 1024):
+        self.versions = versions
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def key(self, table: str, path: str, query_string: str) -> tuple:
+        return (table, self.versions.current(table), path, normalize_query(query_string))
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, status_code: int, headers: Iterable[Tuple[str, str]], body: bytes) -> CachedResponse:
+        entry = CachedResponse(status_code, list(headers), body, make_etag(body))
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+        return entry
+
+    def bump(self, table: str) -> int:
+        return self.versions.bump(table)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
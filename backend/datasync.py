@@ -0,0 +1,101 @@
+"""Diff-based, idempotent sync of a table with a desired list of rows.
+
+The seed scripts used to wipe `doctors` and `events` and re-insert every
+row under a new UUID on each run, and the container runs a seeder on every
+start. `sync_table` instead matches existing rows to the desired ones by a
+natural key and applies only the difference:
+
+* desired rows with no match are inserted (new id, `created_at` now);
+* matched rows whose columns differ are updated in place, keeping their id;
+* existing rows matching no desired row are deleted (unless `delete_missing`
+  is off), including duplicates of a key left behind by earlier runs.
+
+Keys are compared after collapsing whitespace and case, so fixing the
+capitalization of a name is an update rather than a delete plus an insert.
+Running the same sync twice changes nothing.
+
+`sync_table` works on a DB-API cursor and does no transaction handling:
+the caller wraps all tables in one transaction so a sync is all or nothing.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+# Natural keys of the seeded tables
+DOCTOR_KEY = ("name",)
+EVENT_KEY = ("title", "date")
+
+
+class TableDiff(NamedTuple):
+    table: str
+    inserts: List[Dict[str, Any]]
+    updates: List[Tuple[str, Dict[str, Any]]]  # (id, changed columns)
+    deletes: List[str]
+    unchanged: int
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserts or self.updates or self.deletes)
+
+    def summary(self) -> str:
+        return (f"{self.table}: {len(self.inserts)} inserted, {len(self.updates)} updated, "
+                f"{len(self.deletes)} deleted, {self.unchanged} unchanged")
+
+
+def natural_key(row: Dict[str, Any], key: Sequence[str]) -> tuple:
+    return tuple(" ".join(str(row.get(name) or "").split()).casefold() for name in key)
+
+
+def diff_rows(table: str, existing: List[Dict[str, Any]], desired: List[Dict[str, Any]], key: Sequence[str],
+              delete_missing: bool = True) -> TableDiff:
+    """Compare `existing` rows (with their `id`) against `desired` rows."""
+    wanted: Dict[tuple, Dict[str, Any]] = {}
+    for row in desired:
+        k = natural_key(row, key)
+        if k in wanted:
+            raise ValueError(f"Duplicate {table} key {k!r} in the desired rows")
+        wanted[k] = row
+
+    inserts, updates, deletes = [], [], []
+    unchanged = 0
+    seen = set()
+    for row in existing:
+        k = natural_key(row, key)
+        target = wanted.get(k)
+        if target is None or k in seen:
+            if delete_missing or k in seen:
+                deletes.append(row["id"])
+            continue
+        seen.add(k)
+        changes = {col: value for col, value in target.items() if row.get(col) != value}
+        if changes:
+            updates.append((row["id"], changes))
+        else:
+            unchanged += 1
+    for k, row in wanted.items():
+        if k not in seen:
+            inserts.append(row)
+    return TableDiff(table, inserts, updates, deletes, unchanged)
+
+
+def sync_table(cursor, table: str, key: Sequence[str], desired: List[Dict[str, Any]],
+               delete_missing: bool = True) -> TableDiff:
+    """Bring `table` in line with `desired`, touching only rows that differ."""
+    columns = sorted({col for row in desired for col in row} | set(key))
+    cursor.execute(f"SELECT id, {', '.join(columns)} FROM {table} ORDER BY created_at, id")
+    existing = [dict(zip(["id", *columns], values)) for values in cursor.fetchall()]
+    diff = diff_rows(table, existing, [{col: row.get(col) for col in columns} for row in desired], key,
+                     delete_missing)
+
+    if diff.deletes:
+        cursor.executemany(f"DELETE FROM {table} WHERE id = ?", [(id_,) for id_ in diff.deletes])
+    for id_, changes in diff.updates:
+        assignments = ", ".join(f"{col} = ?" for col in changes)
+        cursor.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", (*changes.values(), id_))
+    if diff.inserts:
+        now = datetime.utcnow().isoformat(" ")
+        cursor.executemany(
+            f"INSERT INTO {table} (id, created_at, {', '.join(columns)}) VALUES (?, ?{', ?' * len(columns)})",
+            [(str(uuid.uuid4()), now, *(row[col] for col in columns)) for row in diff.inserts],
+        )
+    return diff
@@ -0,0 +1,146 @@
+"""Structured start/end times for events.
+
+`EventModel.date` and `time` are free text written by hand ("15-17 de
+Outubro, 2025", "08:00 - 18:00"), which cannot be sorted or filtered. This
+module parses them into `starts_at` / `ends_at`, naive local times in
+Belém (UTC-3, no daylight saving time), so `GET /api/events` can answer
+from/to/upcoming windows with an index range scan.
+
+Understood date forms, in any case and with or without accents:
+
+    22 de Novembro, 2025            15-17 de Outubro, 2025
+    15 e 16 de out. de 2025         30 de setembro a 2 de outubro de 2025
+    15/10/2025 - 17/10/2025         2025-10-15
+
+and times such as "08:00 - 18:00", "14h", "9h30 às 12h". The first time is
+the start, the last one the end; without an end time the event lasts until
+the end of its last day. Dates that cannot be parsed (no year, say) leave
+both columns NULL: such events are listed normally but never match a
+time-window filter.
+
+ORM writes fill the columns through mapper events (see server.py), the bulk
+import through `with_window`; `backfill` fixes up rows written any other way
+(seed scripts, raw SQL). Existing databases got the columns through the
+`0001_event_windows` migration, which runs `backfill_batch` in small
+transactions (see migrations.py).
+"""
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from search import fold
+
+LOCAL_TZ = timezone(timedelta(hours=-3))
+
+# Storage format of SQLAlchemy's SQLite DateTime, for writes through a raw cursor
+DB_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+MONTHS = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+MONTHS.update({name[:3]: number for name, number in list(MONTHS.items())})
+
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+_SPAN = r"(?:-|–|a|e|ate)"
+_TEXT_DATE = re.compile(
+    rf"(\d{{1,2}})(?:o|º)?(?:\s*{_SPAN}\s*(\d{{1,2}})(?:o|º)?)?\s+de\s+({_MONTH})\b\.?(?:,?\s*(?:de\s+)?(\d{{4}}))?"
+)
+_NUMERIC_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b|\b(\d{4})-(\d{2})-(\d{2})\b")
+_TIME = re.compile(r"\b(\d{1,2})\s*(?::|h)\s*(\d{2})?")
+
+
+def _dates(text: str) -> Optional[Tuple[date, date]]:
+    numeric = _NUMERIC_DATE.findall(text)
+    if numeric:
+        days = [date(int(y), int(m), int(d)) if d else date(int(iy), int(im), int(id_))
+                for d, m, y, iy, im, id_ in numeric]
+        return days[0], days[-1]
+
+    matches = _TEXT_DATE.findall(text)
+    if not matches:
+        return None
+    # "30 de setembro a 2 de outubro de 2025": a missing year is the next one given
+    years: List[Optional[int]] = [int(y) if y else None for *_, y in matches]
+    following = None
+    for i in range(len(years) - 1, -1, -1):
+        if years[i] is None:
+            years[i] = following
+        following = years[i]
+    if years[0] is None:
+        return None
+    first_day, _, first_month, _ = matches[0]
+    _, last_to, last_month, _ = matches[-1]
+    last_day = last_to or matches[-1][0]
+    start = date(years[0], MONTHS[first_month], int(first_day))
+    end = date(years[-1], MONTHS[last_month], int(last_day))
+    if start > end and not matches[0][3]:
+        # "28 de dezembro a 2 de janeiro de 2026" starts the year before
+        start = start.replace(year=start.year - 1)
+    return start, end
+
+
+def _times(text: str) -> List[time]:
+    found = []
+    for hour, minute in _TIME.findall(text):
+        if int(hour) < 24 and int(minute or 0) < 60:
+            found.append(time(int(hour), int(minute or 0)))
+    return found
+
+
+def parse_window(date_text: Optional[str], time_text: Optional[str] = None) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """(starts_at, ends_at) of an event, or (None, None) if its date is not understood."""
+    try:
+        days = _dates(fold(date_text or ""))
+    except ValueError:  # e.g. "31 de fevereiro"
+        days = None
+    if days is None:
+        return None, None
+    times = _times(fold(time_text or ""))
+    starts_at = datetime.combine(days[0], times[0] if times else time.min)
+    ends_at = datetime.combine(days[1], times[-1] if len(times) > 1 else time(23, 59, 59))
+    return starts_at, max(starts_at, ends_at)
+
+
+def with_window(row: Dict[str, Any]) -> Dict[str, Any]:
+    starts_at, ends_at = parse_window(row.get("date"), row.get("time"))
+    return dict(row, starts_at=starts_at, ends_at=ends_at)
+
+
+def local_now() -> datetime:
+    return datetime.now(LOCAL_TZ).replace(tzinfo=None)
+
+
+def to_local(value: datetime) -> datetime:
+    """Query parameters may carry an offset; the columns hold naive local times."""
+    return value.astimezone(LOCAL_TZ).replace(tzinfo=None) if value.tzinfo else value
+
+
+def backfill_batch(cursor, after: int, limit: int) -> Tuple[Optional[int], int]:
+    """Fix up to `limit` events with a rowid above `after`.
+
+    Returns (last rowid looked at, rows changed); the rowid is None once
+    there is nothing left.
+    """
+    cursor.execute(
+        "SELECT rowid, date, time, starts_at, ends_at FROM events WHERE rowid > ? ORDER BY rowid LIMIT ?",
+        (after, limit),
+    )
+    rows = cursor.fetchall()
+    changes = []
+    for rowid, date_text, time_text, starts_at, ends_at in rows:
+        window = tuple(v.strftime(DB_FORMAT) if v else None for v in parse_window(date_text, time_text))
+        if window != (starts_at, ends_at):
+            changes.append((*window, rowid))
+    if changes:
+        cursor.executemany("UPDATE events SET starts_at = ?, ends_at = ? WHERE rowid = ?", changes)
+    return (rows[-1][0] if rows else None), len(changes)
+
+
+def backfill(cursor) -> int:
+    """Recompute starts_at/ends_at wherever they disagree with date/time. Returns rows changed."""
+    after, changed = 0, 0
+    while after is not None:
+        after, count = backfill_batch(cursor, after, 1000)
+        changed += count
+    return changed
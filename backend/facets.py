@@ -0,0 +1,98 @@
+"""Facet counts (doctors per city and per specialty).
+
+`doctor_facets` holds one row per (field, value) with the number of
+doctors carrying that value. Like the search index, it is kept current by
+triggers on `doctors`, so the API endpoints, the bulk import, the seed
+scripts and raw SQL all update it incrementally in the same transaction as
+the write: reading the facets costs O(number of facets), never a scan of
+`doctors`. Empty and NULL values are not counted, and a value whose count
+drops to zero is removed.
+"""
+from typing import Dict, List
+
+FACET_TABLE = "doctor_facets"
+FACET_FIELDS = ("city", "specialty")
+
+
+def _increment(field: str, row: str) -> str:
+    return f"""
+        INSERT INTO {FACET_TABLE}(field, value, count)
+        SELECT '{field}', {row}.{field}, 1 WHERE coalesce({row}.{field}, '') <> ''
+        ON CONFLICT(field, value) DO UPDATE SET count = count + 1;"""
+
+
+def _decrement(field: str, row: str) -> str:
+    return f"""
+        UPDATE {FACET_TABLE} SET count = count - 1 WHERE field = '{field}' AND value = {row}.{field};
+        DELETE FROM {FACET_TABLE} WHERE field = '{field}' AND value = {row}.{field} AND count <= 0;"""
+
+
+FACET_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {FACET_TABLE} (
+        field TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (field, value)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS doctors_facets_ai AFTER INSERT ON doctors BEGIN
+        {"".join(_increment(field, "new") for field in FACET_FIELDS)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS doctors_facets_ad AFTER DELETE ON doctors BEGIN
+        {"".join(_decrement(field, "old") for field in FACET_FIELDS)}
+    END
+    """,
+    # One trigger per field, so changing only the city leaves specialties alone
+    *(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS doctors_facets_au_{field} AFTER UPDATE OF {field} ON doctors
+        WHEN old.{field} IS NOT new.{field} BEGIN
+            {_decrement(field, "old")}
+            {_increment(field, "new")}
+        END
+        """
+        for field in FACET_FIELDS
+    ),
+]
+
+TRIGGERS = ("doctors_facets_ai", "doctors_facets_ad", *(f"doctors_facets_au_{field}" for field in FACET_FIELDS))
+
+
+def ensure_facets(conn) -> None:
+    """Create the facet table and triggers; recount if the counts may be stale.
+
+    Same contract as `search.ensure_search_index`: missing triggers mean the
+    table is new or `doctors` was recreated, so the counts are rebuilt.
+    """
+    execute = getattr(conn, "exec_driver_sql", None) or conn.execute
+    names = (FACET_TABLE, *TRIGGERS)
+    present = execute(
+        f"SELECT count(*) FROM sqlite_master WHERE name IN ({', '.join('?' * len(names))})", names
+    ).fetchone()[0]
+    for ddl in FACET_DDL:
+        execute(ddl)
+    if present < len(names):
+        rebuild_facets(conn)
+
+
+def rebuild_facets(conn) -> None:
+    """Recount every facet from `doctors`."""
+    execute = getattr(conn, "exec_driver_sql", None) or conn.execute
+    execute(f"DELETE FROM {FACET_TABLE}")
+    for field in FACET_FIELDS:
+        execute(
+            f"INSERT INTO {FACET_TABLE}(field, value, count) "
+            f"SELECT '{field}', {field}, count(*) FROM doctors WHERE coalesce({field}, '') <> '' GROUP BY {field}"
+        )
+
+
+def group(rows) -> Dict[str, List[Dict[str, object]]]:
+    """{field: [{"value", "count"}, ...]} from (field, value, count) rows."""
+    facets: Dict[str, List[Dict[str, object]]] = {field: [] for field in FACET_FIELDS}
+    for field, value, count in rows:
+        facets.setdefault(field, []).append({"value": value, "count": count})
+    return facets
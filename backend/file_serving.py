@@ -0,0 +1,207 @@
+"""Serving of uploaded files: immutable caching, conditional GET, byte ranges.
+
+Uploads are stored under the SHA-256 of their content (see uploads.py) and
+resized variants under that name plus their width (see images.py). A name
+therefore never points at different bytes, and `FileServer.response`
+answers GET/HEAD /uploads/<name> accordingly:
+
+* `Cache-Control: public, max-age=31536000, immutable`, so browsers do not
+  revalidate at all. Variant manifests (`*.variants.json`) are the
+  exception: they are revalidated (`no-cache`);
+* a strong ETag: the SHA-256 in the name for originals, the modification
+  time and size for other files (derived, but never rewritten);
+* `If-None-Match`, or else `If-Modified-Since`, is answered with a 304;
+* a single `Range: bytes=...` gets a 206 with just those bytes (honouring
+  `If-Range`), an unsatisfiable one a 416. Requests for several ranges get
+  the whole file, which RFC 9110 allows, rather than a multipart body.
+
+The body is delivered the cheapest way available:
+
+1. with `accel_redirect` set (e.g. "/_uploads/"), the response carries an
+   `X-Accel-Redirect` header and no body. nginx, in front of the app, then
+   sends the file from an `internal` location with sendfile(2), ranges
+   included. The worker only builds headers;
+2. ASGI servers that offer the `http.response.pathsend` extension get the
+   path of whole-file responses and send it themselves (zero-copy);
+3. otherwise (uvicorn) the file is read with pread(2) in a worker thread,
+   `chunk_size` bytes at a time, and sent chunk by chunk.
+"""
+import asyncio
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+
+from starlette.responses import Response
+
+import cache
+from static_assets import IMMUTABLE, REVALIDATE, StaticManifest
+
+# <sha256>.<ext>, as uploads.py names originals
+CONTENT_NAME_RE = re.compile(r"^([0-9a-f]{64})\.[A-Za-z0-9]+$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+REVALIDATED_SUFFIXES = (".variants.json",)
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """The (first, last) byte offsets of a single `bytes=` range, or None to send the whole file.
+
+    Raises RangeNotSatisfiable when the range starts past the end.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if match is None:
+        # Several ranges, other units or bad syntax: all may be ignored
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - suffix), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable()
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def _http_date_seconds(value: str) -> Optional[int]:
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class FileBody(Response):
+    """`length` bytes of the file at `path`, starting at `offset`."""
+
+    def __init__(self, path: str, offset: int, length: int, whole: bool, status_code: int,
+                 headers: Mapping[str, str], media_type: str, chunk_size: int):
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.whole = whole
+        self.status_code = status_code
+        self.media_type = media_type
+        self.chunk_size = chunk_size
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["method"] == "HEAD" or not self.length:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if self.whole and "http.response.pathsend" in scope.get("extensions", ()):
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+        try:
+            fd = await asyncio.to_thread(os.open, self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            await Response(status_code=404)(scope, receive, send)
+            return
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            offset, end = self.offset, self.offset + self.length
+            while offset < end:
+                chunk = await asyncio.to_thread(os.pread, fd, min(self.chunk_size, end - offset), offset)
+                if not chunk:
+                    raise RuntimeError(f"{self.path} was truncated while being sent")
+                offset += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": offset < end})
+        finally:
+            os.close(fd)
+
+
+class FileServer:
+    def __init__(self, directory: str, chunk_size: int = 256 * 1024, accel_redirect: Optional[str] = None):
+        self.directory = os.path.abspath(directory)
+        self.chunk_size = chunk_size
+        # URL prefix of an nginx `internal` location aliased to `directory`
+        self.accel_redirect = accel_redirect
+        self.not_modified = 0
+        self.partial = 0
+
+    def etag(self, name: str, st: os.stat_result) -> str:
+        match = CONTENT_NAME_RE.match(name)
+        if match:
+            return f'"{match.group(1)}"'
+        return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+    def response(self, name: str, request) -> Optional[Response]:
+        """The response for GET/HEAD of `name`, or None if there is no such file."""
+        # Flat directory; dotfiles are uploads still being written
+        if name.startswith(".") or os.path.basename(name) != name:
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            # A stat of a cached inode costs microseconds, less than a thread hop
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        etag = self.etag(name, st)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+            "Cache-Control": REVALIDATE if name.endswith(REVALIDATED_SUFFIXES) else IMMUTABLE,
+            "Accept-Ranges": "bytes",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            not_modified = cache.etag_matches(if_none_match, etag)
+        else:
+            since = _http_date_seconds(request.headers.get("if-modified-since", ""))
+            not_modified = since is not None and int(st.st_mtime) <= since
+        if not_modified:
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        media_type = StaticManifest.media_type(name)
+        if self.accel_redirect:
+            # nginx sends the body and handles Range itself
+            headers["X-Accel-Redirect"] = self.accel_redirect + name
+            return Response(status_code=200, headers=headers, media_type=media_type)
+
+        size = st.st_size
+        byte_range = None
+        if request.method == "GET" and self._if_range_holds(request.headers.get("if-range"), etag, st):
+            try:
+                byte_range = parse_range(request.headers.get("range"), size)
+            except RangeNotSatisfiable:
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+        if byte_range is None:
+            headers["Content-Length"] = str(size)
+            return FileBody(path, 0, size, True, 200, headers, media_type, self.chunk_size)
+        first, last = byte_range
+        self.partial += 1
+        headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+        headers["Content-Length"] = str(last - first + 1)
+        return FileBody(path, first, last - first + 1, first == 0 and last == size - 1, 206, headers, media_type,
+                        self.chunk_size)
+
+    @staticmethod
+    def _if_range_holds(if_range: Optional[str], etag: str, st: os.stat_result) -> bool:
+        # Strong comparison: a weak tag never matches, a date has to be Last-Modified exactly
+        if if_range is None:
+            return True
+        if if_range.startswith(('"', "W/")):
+            return if_range == etag
+        return _http_date_seconds(if_range) == int(st.st_mtime)
+
+    def stats(self) -> dict:
+        return {"not_modified": self.not_modified, "partial": self.partial}
@@ -0,0 +1,74 @@
+"""Password hashing off the event loop.
+
+bcrypt is deliberately slow (~250 ms per hash at the default cost), and
+calling it directly from an async endpoint freezes every other request on
+that worker for the whole computation. `PasswordHasher` runs it in a small
+dedicated thread pool instead (the bcrypt extension releases the GIL while
+hashing), and caps how many requests may be waiting for a slot: past that
+point it fails fast with `HasherBusy` so a login burst turns into quick
+503s instead of an ever-growing queue.
+
+The passlib context is built on first use: importing passlib and its bcrypt
+handler adds ~30 ms to every worker boot, and most workers start, serve
+listings and stop without ever checking a password.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Optional, Sequence
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+class PasswordHasher:
+    def __init__(self, schemes: Sequence[str] = ("bcrypt",), max_workers: Optional[int] = None, max_pending: int = 32):
+        self.schemes = list(schemes)
+        self._context: Optional["CryptContext"] = None
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        # Jobs running or waiting for a worker, beyond which we shed load
+        self.max_pending = max(max_pending, self.max_workers)
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def context(self) -> "CryptContext":
+        if self._context is None:
+            from passlib.context import CryptContext
+
+            self._context = CryptContext(schemes=self.schemes, deprecated="auto")
+        return self._context
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Created lazily so importing the app (scripts, workers that never
+        # see a login) does not start threads
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn: Callable, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusy()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,185 @@
+"""Response encoding for the API: fast JSON rendering and compression.
+
+FastAPI validates what an endpoint returns against its `response_model`
+(pydantic-core turns the ORM rows into plain JSON-ready data) and then hands
+that to the response class to render. The stock `JSONResponse` renders it
+with the stdlib `json` module, which dominates the cost of large listings.
+`FastJSONResponse` renders the same data with orjson when it is installed.
+Validation is unchanged; only the encoder is swapped.
+
+`CompressionMiddleware` then compresses JSON and text responses under the
+given path prefixes once they pass `min_size`. It uses brotli when the client
+accepts it and the module is installed, and gzip otherwise:
+
+* only complete bodies with a known length are compressed; streamed or
+  already encoded responses and non-text types (images) pass through;
+* the ETag of a compressed response is made weak, since the bytes differ
+  but the representation does not, so If-None-Match keeps matching;
+* responses carrying an ETag (the cached listings) have their compressed
+  bodies memoized by (ETag, encoding), so a cache hit is not recompressed.
+"""
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json without it
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+# Dynamic responses: fast levels, most of the gain for a fraction of the CPU
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> set:
+    """Content codings an Accept-Encoding header allows (q=0 excluded)."""
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.partition(";")
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _CompressedBodies:
+    """Small LRU of compressed bodies keyed by (ETag, encoding)."""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: Tuple[str, str], body: bytes) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, prefixes: Iterable[str] = ("/api/",), min_size: int = 1024,
+                 max_buffer: int = 16 * 1024 * 1024):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+        self.min_size = min_size
+        self.max_buffer = max_buffer
+        self.memo = _CompressedBodies()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                length = headers.get("content-length")
+                if (
+                    "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                    or length is None
+                    or not self.min_size <= int(length) <= self.max_buffer
+                ):
+                    passthrough = True
+                    await send(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._send_compressed(send, start, b"".join(chunks), encoding)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_compressed(self, send, start, body: bytes, encoding: str) -> None:
+        headers = MutableHeaders(raw=start["headers"])
+        etag = headers.get("etag")
+        key = (etag, encoding) if etag else None
+        compressed = self.memo.get(key) if key else None
+        if compressed is None:
+            compressed = compress(body, encoding)
+            if key:
+                self.memo.put(key, compressed)
+        if len(compressed) >= len(body):
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+        await send(start)
+        await send({"type": "http.response.body", "body": compressed})
+
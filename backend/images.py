@@ -0,0 +1,189 @@
+"""Resized image variants for uploaded photos.
+
+Phone photos arrive as multi-megabyte JPEGs, while the directory grid shows
+them a few hundred pixels wide. At upload time `ImagePipeline.derive` hands
+the stored file to a process-pool worker that writes width-bounded copies
+(WebP by default) next to it:
+
+    /uploads/<sha256>.jpg               the original
+    /uploads/<sha256>-320w.webp         one file per width in `widths`
+    /uploads/<sha256>.variants.json     {"320w": "<sha256>-320w.webp", ...}
+
+Uploads are content addressed, so variants never go stale and deriving the
+same image twice is a no-op. The API exposes the manifest as an `srcset`
+style map through `ImagePipeline.srcset(image_url)`, which runs for every
+row a response serializes. The manifests are kept in a bounded LRU, and an
+endpoint `await`s `preload` with its rows first so the files are read in a
+thread rather than on the event loop. A missing manifest is looked for
+again after `miss_ttl` seconds.
+
+Resizing needs Pillow. Without it uploads still work, just without
+variants. Only the pool workers import it; the app process just checks
+that it is installed.
+"""
+import asyncio
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+# Optional: variants are skipped without Pillow
+HAVE_PILLOW = importlib.util.find_spec("PIL") is not None
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"webp": ("WEBP", ".webp"), "jpeg": ("JPEG", ".jpg")}
+QUALITY = 80
+
+# Manifests kept in memory, and how long "no manifest" is believed
+MAX_SRCSETS = 4096
+MISS_TTL = 60.0
+
+
+def _manifest_path(upload_dir: str, stem: str) -> str:
+    return os.path.join(upload_dir, f"{stem}.variants.json")
+
+
+def render_variants(upload_dir: str, filename: str, widths: Sequence[int], fmt: str) -> Dict[str, str]:
+    """Write the variants of `filename` and its manifest. Runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    pil_format, ext = FORMATS[fmt]
+    stem = os.path.splitext(filename)[0]
+    variants = {}
+    with Image.open(os.path.join(upload_dir, filename)) as original:
+        image = ImageOps.exif_transpose(original)
+        if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        for width in sorted(widths):
+            # Never upscale; the original already covers larger widths
+            if width >= image.width:
+                break
+            name = f"{stem}-{width}w{ext}"
+            path = os.path.join(upload_dir, name)
+            if not os.path.exists(path):
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+                tmp = f"{path}.tmp"
+                if pil_format == "WEBP":
+                    resized.save(tmp, pil_format, quality=QUALITY, method=4)
+                else:
+                    resized.save(tmp, pil_format, quality=QUALITY, optimize=True, progressive=True)
+                os.replace(tmp, path)
+            variants[f"{width}w"] = name
+    manifest = _manifest_path(upload_dir, stem)
+    with open(f"{manifest}.tmp", "w") as f:
+        json.dump(variants, f)
+    os.replace(f"{manifest}.tmp", manifest)
+    return variants
+
+
+class ImagePipeline:
+    def __init__(self, upload_dir: str, url_prefix: str = "/uploads/", widths: Sequence[int] = (320, 640, 1280),
+                 fmt: str = "webp", max_workers: int = 1, max_srcsets: int = MAX_SRCSETS,
+                 miss_ttl: float = MISS_TTL):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported variant format {fmt!r}; expected one of {sorted(FORMATS)}")
+        self.upload_dir = upload_dir
+        self.url_prefix = url_prefix
+        self.widths = tuple(widths)
+        self.fmt = fmt
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.max_srcsets = max_srcsets
+        self.miss_ttl = miss_ttl
+        # image filename -> ({"320w": url, ...} or None, monotonic expiry of a None)
+        self._srcsets: "OrderedDict[str, Tuple[Optional[Dict[str, str]], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return HAVE_PILLOW and bool(self.widths)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a worker that already runs threads is not safe
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def derive(self, filename: str) -> Optional[Dict[str, str]]:
+        """Render the variants of an uploaded file; returns its srcset map."""
+        if not self.enabled:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            variants = await loop.run_in_executor(
+                self.executor, render_variants, self.upload_dir, filename, self.widths, self.fmt
+            )
+        except Exception:
+            logger.exception("Could not derive image variants for %s", filename)
+            return None
+        srcset = {key: self.url_prefix + name for key, name in variants.items()}
+        self._remember(filename, srcset)
+        return srcset
+
+    def _filename(self, image_url: Optional[str]) -> Optional[str]:
+        if not image_url or not image_url.startswith(self.url_prefix):
+            return None
+        return image_url[len(self.url_prefix):]
+
+    def _cached(self, filename: str) -> Tuple[bool, Optional[Dict[str, str]]]:
+        with self._lock:
+            entry = self._srcsets.get(filename)
+            if entry is None:
+                return False, None
+            srcset, expires = entry
+            if srcset is None and expires <= time.monotonic():
+                del self._srcsets[filename]
+                return False, None
+            self._srcsets.move_to_end(filename)
+            return True, srcset
+
+    def _remember(self, filename: str, srcset: Optional[Dict[str, str]]) -> None:
+        with self._lock:
+            self._srcsets[filename] = (srcset, time.monotonic() + self.miss_ttl)
+            self._srcsets.move_to_end(filename)
+            while len(self._srcsets) > self.max_srcsets:
+                self._srcsets.popitem(last=False)
+
+    def _load(self, filename: str) -> Optional[Dict[str, str]]:
+        srcset = None
+        try:
+            with open(_manifest_path(self.upload_dir, os.path.splitext(filename)[0])) as f:
+                srcset = {key: self.url_prefix + name for key, name in json.load(f).items()}
+        except (OSError, ValueError):
+            pass
+        self._remember(filename, srcset)
+        return srcset
+
+    async def preload(self, image_urls: Iterable[Optional[str]]) -> None:
+        """Read the manifests `srcset` will be asked for, in a thread."""
+        missing = [
+            filename for filename in {self._filename(url) for url in image_urls}
+            if filename is not None and not self._cached(filename)[0]
+        ]
+        if missing:
+            await asyncio.to_thread(lambda: [self._load(filename) for filename in missing])
+
+    def srcset(self, image_url: Optional[str]) -> Optional[Dict[str, str]]:
+        """srcset map for a stored image URL, or None (external URL, no variants).
+
+        From memory after `preload`; otherwise the manifest is read here.
+        """
+        filename = self._filename(image_url)
+        if filename is None:
+            return None
+        found, srcset = self._cached(filename)
+        return srcset if found else self._load(filename)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
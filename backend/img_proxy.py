@@ -0,0 +1,273 @@
+"""Local mirror of external images (GET /api/img-proxy?url=...).
+
+Most seeded `image_url`s point at third-party hosts, so every page view
+depended on their latency and uptime. `ImageProxyCache` fetches each remote
+image once, keeps it in a size-bounded on-disk LRU and serves it locally:
+
+* only hosts in `allowed_hosts` are fetched (this is not an open proxy),
+  redirects included: each hop is checked before it is followed;
+* only raster images are kept. SVG is refused, since it would be served
+  from the app's own origin and can carry script;
+* entries are fresh for the upstream max-age (or `default_ttl`), then
+  revalidated with If-None-Match / If-Modified-Since; if the origin is down
+  the stale copy keeps being served;
+* concurrent requests for the same URL share one upstream fetch;
+* files are `<sha256(url)>.img` plus a `.json` sidecar with the metadata, and
+  their mtime records the last access, so the LRU order survives restarts
+  and is shared by all workers using the same directory.
+
+httpx is imported when the first upstream fetch needs a client, not at
+worker boot.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, NamedTuple, Optional
+from urllib.parse import quote, urljoin, urlsplit
+
+from starlette.concurrency import run_in_threadpool
+
+if TYPE_CHECKING:
+    import httpx
+
+PROXY_PATH = "/api/img-proxy"
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "image/avif"}
+MAX_REDIRECTS = 5
+
+
+class ProxyError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class CachedImage(NamedTuple):
+    path: str
+    content_type: str
+    etag: str
+    size: int
+
+
+def _key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+class ImageProxyCache:
+    def __init__(self, cache_dir: str, allowed_hosts: Iterable[str], max_bytes: int = 512 * 1024 * 1024,
+                 max_object_bytes: int = 15 * 1024 * 1024, default_ttl: int = 86400, timeout: float = 10.0,
+                 client_factory: Optional[Callable[[], "httpx.AsyncClient"]] = None):
+        self.cache_dir = cache_dir
+        self.allowed_hosts = {h.strip().lower() for h in allowed_hosts if h.strip()}
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self._client_factory = client_factory
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stale_served = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # --- URL handling ---
+
+    def allowed(self, url: Optional[str]) -> bool:
+        if not url:
+            return False
+        parts = urlsplit(url)
+        return parts.scheme in ("http", "https") and parts.netloc.lower() in self.allowed_hosts
+
+    def proxy_path(self, url: Optional[str]) -> Optional[str]:
+        """Local URL serving `url`, or None if it is not a proxied host."""
+        if not self.allowed(url):
+            return None
+        return f"{PROXY_PATH}?url={quote(url, safe='')}"
+
+    # --- cache entries ---
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.img", f"{base}.json"
+
+    def _load(self, key: str) -> Optional[dict]:
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("content_type") not in IMAGE_TYPES:
+                # Stored before SVG was refused: fetch again
+                return None
+            os.utime(data_path)  # LRU touch; raises if the data file was evicted
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key: str, meta: dict, tmp_path: Optional[str]) -> None:
+        data_path, meta_path = self._paths(key)
+        if tmp_path is not None:
+            os.replace(tmp_path, data_path)
+        with tempfile.NamedTemporaryFile("w", dir=self.cache_dir, suffix=".tmp", delete=False) as f:
+            json.dump(meta, f)
+        os.replace(f.name, meta_path)
+        os.utime(data_path)
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits `max_bytes`."""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".img"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.name[:-4]))
+                    total += st.st_size
+        entries.sort()
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+        self._bytes = total
+
+    # --- upstream ---
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            import httpx
+
+            self._client = self._client_factory() if self._client_factory else httpx.AsyncClient(
+                timeout=self.timeout, headers={"User-Agent": "spo-img-proxy/1.0"}
+            )
+        return self._client
+
+    def _ttl(self, response: "httpx.Response") -> int:
+        match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+        return int(match.group(1)) if match else self.default_ttl
+
+    async def _download(self, url: str, meta: Optional[dict]):
+        """Fetch `url`, conditionally if we hold a copy. Returns (meta, tmp_path|None)."""
+        headers = {}
+        if meta:
+            if meta.get("upstream_etag"):
+                headers["If-None-Match"] = meta["upstream_etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        target = url
+        for _ in range(MAX_REDIRECTS + 1):
+            # Redirects are followed here, so each hop goes through the allowlist
+            async with self.client.stream("GET", target, headers=headers, follow_redirects=False) as response:
+                if response.has_redirect_location:
+                    target = urljoin(target, response.headers["location"])
+                    if not self.allowed(target):
+                        raise ProxyError(502, "Upstream redirected to a host that is not allowed")
+                    continue
+                return await self._read(url, response, meta)
+        raise ProxyError(502, "Too many upstream redirects")
+
+    async def _read(self, url: str, response: "httpx.Response", meta: Optional[dict]):
+        """Turn the final upstream response into (meta, tmp_path|None)."""
+        if response.status_code == 304 and meta:
+            self.revalidations += 1
+            return dict(meta, fetched_at=time.time(), ttl=self._ttl(response)), None
+        if response.status_code != 200:
+            raise ProxyError(502, f"Upstream returned {response.status_code}")
+        content_type = response.headers.get("content-type", "").split(";")[0].strip()
+        if content_type not in IMAGE_TYPES:
+            raise ProxyError(502, "Upstream did not return a supported image")
+        digest = hashlib.sha256()
+        size = 0
+        tmp = await run_in_threadpool(tempfile.NamedTemporaryFile, dir=self.cache_dir, suffix=".tmp", delete=False)
+        try:
+            async for chunk in response.aiter_bytes(64 * 1024):
+                size += len(chunk)
+                if size > self.max_object_bytes:
+                    raise ProxyError(502, "Upstream image is too large")
+                digest.update(chunk)
+                await run_in_threadpool(tmp.write, chunk)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+        await run_in_threadpool(tmp.close)
+        return {
+            "url": url,
+            "content_type": content_type,
+            "etag": f'"{digest.hexdigest()[:32]}"',
+            "size": size,
+            "upstream_etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched_at": time.time(),
+            "ttl": self._ttl(response),
+        }, tmp.name
+
+    async def _refresh(self, url: str, key: str, meta: Optional[dict]) -> dict:
+        import httpx
+
+        try:
+            new_meta, tmp_path = await self._download(url, meta)
+        except (ProxyError, httpx.HTTPError) as exc:
+            if meta:
+                # Origin down or misbehaving: keep serving what we have
+                self.stale_served += 1
+                return meta
+            if isinstance(exc, ProxyError):
+                raise
+            raise ProxyError(502, "Could not fetch upstream image")
+        await run_in_threadpool(self._store, key, new_meta, tmp_path)
+        if tmp_path is not None:
+            if self._bytes is None:
+                # First write of this process: learn the directory size
+                await run_in_threadpool(self._evict)
+            else:
+                self._bytes += new_meta["size"]
+                if self._bytes > self.max_bytes:
+                    await run_in_threadpool(self._evict)
+        return new_meta
+
+    async def fetch(self, url: str) -> CachedImage:
+        if not self.allowed(url):
+            raise ProxyError(403, "Host not allowed")
+        key = _key(url)
+        meta = await run_in_threadpool(self._load, key)
+        if meta and time.time() - meta["fetched_at"] < meta["ttl"]:
+            self.hits += 1
+        else:
+            self.misses += 1
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = asyncio.ensure_future(self._refresh(url, key, meta))
+                self._inflight[key] = inflight
+                inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+            meta = await asyncio.shield(inflight)
+        return CachedImage(self._paths(key)[0], meta["content_type"], meta["etag"], meta["size"])
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "stale_served": self.stale_served,
+            "bytes": self._bytes or 0,
+            "max_bytes": self.max_bytes,
+        }
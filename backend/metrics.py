@@ -0,0 +1,401 @@
+"""Prometheus metrics for all gunicorn workers, without a client library.
+
+Each worker counts in plain dicts: the hot path of a request is two dict
+updates and a `bisect` into the histogram buckets, about 3 us in total
+(see scripts/bench_metrics.py). SQL statements are counted and timed from
+the engines' cursor events, labelled by operation. Once per `flush_interval` a background task
+writes the worker's totals to `<directory>/<pid>.json` (atomically, via
+os.replace) and measures event-loop lag as the oversleep of that same
+`asyncio.sleep`.
+
+`GET /metrics` renders the sum over every worker's file, so a scrape gives
+the same answer whichever worker serves it. Counters and histograms of
+workers that have exited are folded into `archive.json` under a lock, so
+totals never go backwards when gunicorn recycles a worker; gauges (requests
+in flight, loop lag) only count live workers. Cache hit/miss counts are
+sampled from the caches' `stats()` at flush time, and `cache_hit_ratio` is
+derived from the aggregated counts.
+
+Label values should come from a bounded set: routes are labelled with
+their template (`/api/doctors/{id}`), never the raw path.
+"""
+import asyncio
+import bisect
+import fcntl
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request latencies of this app range from ~100 us cache hits to image uploads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ARCHIVE = "archive.json"
+
+# (name, label values, value) triples reported by a collector at flush time
+Sample = Tuple[str, Tuple[str, ...], float]
+
+
+class Metrics:
+    """Per-process metric store; see the module docstring."""
+
+    def __init__(self, directory: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, flush_interval: float = 1.0):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.buckets = tuple(buckets)
+        self.flush_interval = flush_interval
+        # name -> (type, help, label names, gauge aggregation)
+        self.families: Dict[str, Tuple[str, str, Tuple[str, ...], str]] = {}
+        self.counters: Dict[Tuple[str, Tuple[str, ...]], float] = {}
+        # [count per bucket..., count above the last bucket, sum]
+        self.histograms: Dict[Tuple[str, Tuple[str, ...]], List[float]] = {}
+        self.gauges: Dict[Tuple[str, Tuple[str, ...]], float] = {}
+        self.collectors: List[Callable[[], Iterable[Sample]]] = []
+        self.in_flight = 0
+        self._task: Optional[asyncio.Task] = None
+
+    # --- registration and recording -------------------------------------
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> None:
+        self.families[name] = ("counter", help, labels, "")
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> None:
+        self.families[name] = ("histogram", help, labels, "")
+
+    def gauge(self, name: str, help: str, labels: Tuple[str, ...] = (), aggregate: str = "sum") -> None:
+        """`aggregate` combines live workers' values: "sum" or "max"."""
+        self.families[name] = ("gauge", help, labels, aggregate)
+
+    def inc(self, name: str, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, labels: Tuple[str, ...], value: float) -> None:
+        key = (name, labels)
+        entry = self.histograms.get(key)
+        if entry is None:
+            entry = self.histograms[key] = [0] * (len(self.buckets) + 2)
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def set(self, name: str, labels: Tuple[str, ...], value: float) -> None:
+        self.gauges[(name, labels)] = value
+
+    # --- per-worker files -----------------------------------------------
+
+    def _snapshot(self) -> dict:
+        counters = dict(self.counters)
+        for collect in self.collectors:
+            try:
+                for name, labels, value in collect():
+                    counters[(name, labels)] = value
+            except Exception:
+                logger.exception("Metrics collector failed")
+        return {
+            "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+            "histograms": [[name, list(labels), entry] for (name, labels), entry in self.histograms.items()],
+            "gauges": [[name, list(labels), value] for (name, labels), value in self.gauges.items()]
+            + [["http_requests_in_flight", [], self.in_flight]],
+        }
+
+    def flush(self) -> None:
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(self._snapshot(), fh, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _locked(self):
+        lock = open(os.path.join(self.directory, ".lock"), "a")
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    @staticmethod
+    def _read(path: str) -> Optional[dict]:
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _archive(self, snapshots: Iterable[dict]) -> None:
+        """Fold the counters and histograms of exited workers into archive.json."""
+        path = os.path.join(self.directory, ARCHIVE)
+        merged = _Aggregate(len(self.buckets))
+        merged.add(self._read(path) or {}, live=False)
+        for snapshot in snapshots:
+            merged.add(snapshot, live=False)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(merged.as_snapshot(), fh, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _aggregate(self) -> "_Aggregate":
+        self.flush()
+        total = _Aggregate(len(self.buckets))
+        with self._locked():
+            dead = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json") or not name[:-5].isdigit():
+                    continue
+                snapshot = self._read(os.path.join(self.directory, name))
+                if snapshot is None:
+                    continue
+                if _alive(int(name[:-5])):
+                    total.add(snapshot, live=True)
+                else:
+                    dead.append((name, snapshot))
+            if dead:
+                self._archive(snapshot for _, snapshot in dead)
+                for name, _ in dead:
+                    os.unlink(os.path.join(self.directory, name))
+            total.add(self._read(os.path.join(self.directory, ARCHIVE)) or {}, live=False)
+        return total
+
+    # --- exposition -----------------------------------------------------
+
+    def render(self) -> str:
+        """All workers' metrics in the Prometheus text format."""
+        total = self._aggregate()
+        lines: List[str] = []
+        for name, (kind, help, labelnames, aggregate) in self.families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for labels, value in sorted(total.counters.get(name, {}).items()):
+                    lines.append(f"{name}{_labels(labelnames, labels)} {_number(value)}")
+            elif kind == "gauge":
+                for labels, values in sorted(total.gauges.get(name, {}).items()):
+                    value = max(values) if aggregate == "max" else sum(values)
+                    lines.append(f"{name}{_labels(labelnames, labels)} {_number(value)}")
+            else:
+                for labels, entry in sorted(total.histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, entry):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labelnames, labels, le=_number(bound))} {_number(cumulative)}")
+                    count = cumulative + entry[-2]
+                    lines.append(f"{name}_bucket{_labels(labelnames, labels, le='+Inf')} {_number(count)}")
+                    lines.append(f"{name}_sum{_labels(labelnames, labels)} {entry[-1]!r}")
+                    lines.append(f"{name}_count{_labels(labelnames, labels)} {_number(count)}")
+        hits = total.counters.get("cache_hits_total", {})
+        misses = total.counters.get("cache_misses_total", {})
+        if hits or misses:
+            lines.append("# HELP cache_hit_ratio Hits over lookups since the workers started, all workers")
+            lines.append("# TYPE cache_hit_ratio gauge")
+            for labels in sorted(set(hits) | set(misses)):
+                lookups = hits.get(labels, 0) + misses.get(labels, 0)
+                ratio = hits.get(labels, 0) / lookups if lookups else 0.0
+                lines.append(f"cache_hit_ratio{_labels(('cache',), labels)} {ratio:.4f}")
+        return "\n".join(lines) + "\n"
+
+    # --- background flush and loop lag ----------------------------------
+
+    async def _run(self) -> None:
+        interval = self.flush_interval
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.perf_counter() - start - interval)
+            self.set("event_loop_lag_seconds", (), lag)
+            self.observe("event_loop_lag", (), lag)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Could not write metrics to %s", self.directory)
+
+    def start(self) -> None:
+        # A file left by an earlier process with our pid is not ours to overwrite
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with self._locked():
+            previous = self._read(path)
+            if previous is not None:
+                self._archive([previous])
+                os.unlink(path)
+        self.flush()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.gauges.clear()
+        self.flush()
+
+
+class _Aggregate:
+    """Sum of worker snapshots, keyed by metric name then label values."""
+
+    def __init__(self, buckets: int):
+        self.size = buckets + 2
+        self.counters: Dict[str, Dict[Tuple[str, ...], float]] = {}
+        self.histograms: Dict[str, Dict[Tuple[str, ...], List[float]]] = {}
+        self.gauges: Dict[str, Dict[Tuple[str, ...], List[float]]] = {}
+
+    def add(self, snapshot: dict, live: bool) -> None:
+        for name, labels, value in snapshot.get("counters", ()):
+            series = self.counters.setdefault(name, {})
+            series[tuple(labels)] = series.get(tuple(labels), 0) + value
+        for name, labels, entry in snapshot.get("histograms", ()):
+            if len(entry) != self.size:
+                continue  # written with other buckets
+            series = self.histograms.setdefault(name, {})
+            current = series.get(tuple(labels))
+            series[tuple(labels)] = entry if current is None else [a + b for a, b in zip(current, entry)]
+        if live:
+            for name, labels, value in snapshot.get("gauges", ()):
+                self.gauges.setdefault(name, {}).setdefault(tuple(labels), []).append(value)
+
+    def as_snapshot(self) -> dict:
+        return {
+            "counters": [[n, list(l), v] for n, series in self.counters.items() for l, v in series.items()],
+            "histograms": [[n, list(l), e] for n, series in self.histograms.items() for l, e in series.items()],
+        }
+
+
+def _alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], le: Optional[str] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# --- HTTP and database instrumentation -----------------------------------
+
+def register_defaults(metrics: Metrics) -> Metrics:
+    metrics.counter("http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+    metrics.histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+    metrics.gauge("http_requests_in_flight", "HTTP requests being served, all workers")
+    metrics.counter("db_queries_total", "SQL statements executed", ("engine", "operation"))
+    metrics.histogram("db_query_duration_seconds", "SQL statement latency", ("engine", "operation"))
+    metrics.counter("db_query_errors_total", "SQL statements that raised", ("engine",))
+    metrics.counter("cache_hits_total", "Cache hits", ("cache",))
+    metrics.counter("cache_misses_total", "Cache misses", ("cache",))
+    metrics.gauge("event_loop_lag_seconds", "Latest event loop lag, worst worker", aggregate="max")
+    metrics.histogram("event_loop_lag", "Event loop lag in seconds, sampled every flush interval")
+    return metrics
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware counting requests per route template."""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+        # Paths of parameterless routes seen so far: requests answered before
+        # routing (the response cache) still get their route label
+        self._plain_routes: set = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        metrics = self.metrics
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            if route is not None:
+                template = route.path
+                if "{" not in template:
+                    self._plain_routes.add(template)
+            elif scope["path"] in self._plain_routes:
+                template = scope["path"]
+            else:
+                # Mounts (/uploads) set root_path; anything else is one bucket
+                template = scope.get("root_path") or "other"
+            method = scope["method"]
+            metrics.inc("http_requests_total", (method, template, str(status)))
+            metrics.observe("http_request_duration_seconds", (method, template), elapsed)
+
+
+_OPERATIONS = {
+    "SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "SAVEPOINT", "RELEASE", "ROLLBACK", "PRAGMA", "CREATE",
+}
+
+
+def _operation(statement: str) -> str:
+    word = statement[:16].split(None, 1)
+    op = word[0].upper() if word else ""
+    return op if op in _OPERATIONS else "OTHER"
+
+
+def instrument_engine(metrics: Metrics, engine, name: str) -> None:
+    """Count and time every statement `engine` (async or sync) executes."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    operations: Dict[str, Tuple[str, str]] = {}
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        # Compiled statements are cached strings, so this is one dict hit
+        labels = operations.get(statement)
+        if labels is None:
+            if len(operations) > 10_000:
+                operations.clear()
+            labels = operations[statement] = (name, _operation(statement))
+        metrics.inc("db_queries_total", labels)
+        metrics.observe("db_query_duration_seconds", labels, time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        metrics.inc("db_query_errors_total", (name,))
+
+
+def cache_collector(name: str, stats: Callable[[], Dict[str, float]]) -> Callable[[], Iterable[Sample]]:
+    """Collector reporting the hits/misses of a cache with a `stats()` method."""
+    def collect() -> Iterable[Sample]:
+        values = stats()
+        return [("cache_hits_total", (name,), values["hits"]), ("cache_misses_total", (name,), values["misses"])]
+    return collect
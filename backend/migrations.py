@@ -0,0 +1,264 @@
+"""Tracked schema migrations with batched, resumable backfills.
+
+Additive changes that follow from the models (new tables, nullable columns,
+indexes) are applied in place by `server.ensure_schema`. A `Migration`
+records a named change on top of that, in the `schema_migrations` table:
+
+* its `statements` run once, in the bootstrap transaction. They should be
+  additive; `ALTER TABLE ... ADD COLUMN` is skipped when the column is
+  already there (the models may have created it). SQLite adds a column by
+  rewriting the table definition only, not the rows, so this is instant
+  even on a million-row table. A change SQLite cannot make in place (a new
+  primary key) is a callable statement, given the `execute` function, that
+  rebuilds the table, once, unless the models already created it that way;
+* its `backfill`, if any, then gives existing rows their values in small
+  batches: `(cursor, after_rowid, limit) -> (last rowid, rows changed)`.
+
+`Backfiller.run` works through pending backfills on its own connection,
+meant for a thread. Each batch is one short `BEGIN IMMEDIATE` transaction
+that also records how far it got, so a killed worker resumes where it
+stopped, and several workers share the work without repeating it. Between
+batches it sleeps `pause` seconds so live writes get the lock, and it
+halves the batch whenever one holds the lock longer than `target`.
+
+The database only gets its new schema version stamped (see schema.py)
+once every backfill has finished, so until then each starting worker
+checks again and resumes the work.
+"""
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+import event_dates
+import search
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+MIGRATIONS_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+        name TEXT PRIMARY KEY,
+        applied_at TEXT NOT NULL,
+        -- rowid the backfill has reached; NULL without a backfill or once it finished
+        backfill_after INTEGER,
+        rows_changed INTEGER NOT NULL DEFAULT 0,
+        finished_at TEXT
+    )
+    """,
+]
+
+# The current UTC time in the format SQLAlchemy stores DateTime in (microseconds, from milliseconds)
+_NOW_SQL = "strftime('%Y-%m-%d %H:%M:%S', 'now') || '.' || substr(strftime('%f', 'now'), 4) || '000'"
+
+BackfillFn = Callable[[Any, int, int], Tuple[Optional[int], int]]
+Statement = Union[str, Callable[[Callable], None]]
+
+
+class Migration(NamedTuple):
+    name: str
+    statements: Sequence[Statement] = ()
+    backfill: Optional[BackfillFn] = None
+    # What the backfill writes to, so cached responses can be dropped
+    table: Optional[str] = None
+
+
+def _key_doctors_on_seq(execute) -> None:
+    """Rebuild `doctors` with `seq`, an INTEGER PRIMARY KEY taking over the current rowids.
+
+    The table was keyed on its TEXT `id`, so its rows sat under an implicit
+    rowid, which VACUUM may renumber: the search index (external content,
+    joined on the rowid) and the listing cursors would then point at other
+    rows. An INTEGER PRIMARY KEY is the rowid itself and VACUUM keeps it.
+    The triggers go with the old table and the search index is dropped;
+    `server.ensure_schema` recreates and rebuilds both afterwards.
+    """
+    execute(f"DROP TABLE IF EXISTS {search.FTS_TABLE}")
+    columns = execute("PRAGMA table_info(doctors)").fetchall()
+    if any(row[1] == "seq" for row in columns):
+        return
+    indexes = [row[0] for row in execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'doctors' AND sql IS NOT NULL"
+    ).fetchall()]
+    # Same definition as the model's create_all() output
+    definitions = ["seq INTEGER NOT NULL"]
+    for _, name, declared, notnull, default, pk in columns:
+        definition = f"{name} {declared}"
+        if notnull or pk:
+            definition += " NOT NULL"
+        if default is not None:
+            definition += f" DEFAULT {default}"
+        definitions.append(definition)
+    definitions += ["PRIMARY KEY (seq)", "UNIQUE (id)"]
+    names = ", ".join(row[1] for row in columns)
+    execute(f"CREATE TABLE doctors_rekeyed ({', '.join(definitions)})")
+    execute(f"INSERT INTO doctors_rekeyed (seq, {names}) SELECT rowid, {names} FROM doctors")
+    execute("DROP TABLE doctors")
+    execute("ALTER TABLE doctors_rekeyed RENAME TO doctors")
+    for sql in indexes:
+        execute(sql)
+
+
+# In order; never rename or remove an applied one
+MIGRATIONS: List[Migration] = [
+    # starts_at/ends_at were added to `events` once it already had rows
+    Migration(
+        "0001_event_windows",
+        ("ALTER TABLE events ADD COLUMN starts_at DATETIME", "ALTER TABLE events ADD COLUMN ends_at DATETIME"),
+        event_dates.backfill_batch,
+        "events",
+    ),
+    # doctors gets a rowid VACUUM cannot renumber, for the search index and the cursors
+    Migration("0002_doctor_seq", (_key_doctors_on_seq,)),
+    # The events listing pages on (created_at, id): rows written by raw SQL
+    # without created_at get the time of the insert, older ones sort last
+    Migration(
+        "0003_event_created_at",
+        (
+            f"""
+            CREATE TRIGGER IF NOT EXISTS events_created_at_ai AFTER INSERT ON events
+            WHEN new.created_at IS NULL BEGIN
+                UPDATE events SET created_at = {_NOW_SQL} WHERE rowid = new.rowid;
+            END
+            """,
+            f"UPDATE events SET created_at = '{datetime(1970, 1, 1).strftime(event_dates.DB_FORMAT)}' "
+            f"WHERE created_at IS NULL",
+        ),
+    ),
+]
+
+_ADD_COLUMN_RE = re.compile(r"\s*ALTER\s+TABLE\s+(\w+)\s+ADD\s+(?:COLUMN\s+)?(\w+)", re.IGNORECASE)
+
+
+def _now() -> str:
+    return datetime.utcnow().strftime(event_dates.DB_FORMAT)
+
+
+def apply(conn, migrations: Sequence[Migration] = MIGRATIONS) -> List[str]:
+    """Run the statements of migrations not applied yet; returns the names with a backfill pending.
+
+    `conn` is a DB-API connection or a SQLAlchemy sync connection, inside a
+    write transaction.
+    """
+    execute = getattr(conn, "exec_driver_sql", None) or conn.execute
+    for ddl in MIGRATIONS_DDL:
+        execute(ddl)
+    applied = {row[0] for row in execute(f"SELECT name FROM {MIGRATIONS_TABLE}").fetchall()}
+    for migration in migrations:
+        if migration.name in applied:
+            continue
+        for statement in migration.statements:
+            if callable(statement):
+                statement(execute)
+                continue
+            match = _ADD_COLUMN_RE.match(statement)
+            if match:
+                table, column = match.groups()
+                if column in {row[1] for row in execute(f"PRAGMA table_info({table})").fetchall()}:
+                    continue
+            execute(statement)
+        now = _now()
+        execute(
+            f"INSERT INTO {MIGRATIONS_TABLE}(name, applied_at, backfill_after, finished_at) VALUES (?, ?, ?, ?)",
+            (migration.name, now, 0 if migration.backfill else None, None if migration.backfill else now),
+        )
+        logger.info("Applied migration %s", migration.name)
+    return pending(conn)
+
+
+def pending(conn) -> List[str]:
+    execute = getattr(conn, "exec_driver_sql", None) or conn.execute
+    return [row[0] for row in execute(
+        f"SELECT name FROM {MIGRATIONS_TABLE} WHERE finished_at IS NULL ORDER BY name"
+    ).fetchall()]
+
+
+def status(conn) -> List[Dict[str, Any]]:
+    execute = getattr(conn, "exec_driver_sql", None) or conn.execute
+    columns = ("name", "applied_at", "backfill_after", "rows_changed", "finished_at")
+    return [dict(zip(columns, row)) for row in execute(
+        f"SELECT {', '.join(columns)} FROM {MIGRATIONS_TABLE} ORDER BY name"
+    ).fetchall()]
+
+
+class Backfiller:
+    def __init__(self, db_path: str, migrations: Sequence[Migration] = MIGRATIONS, batch_size: int = 500,
+                 pause: float = 0.05, target: float = 0.05, busy_timeout: float = 30.0):
+        self.db_path = db_path
+        self.migrations = {migration.name: migration for migration in migrations}
+        self.batch_size = batch_size
+        self.pause = pause
+        self.target = target
+        self.busy_timeout = busy_timeout
+        self._stop = threading.Event()
+        # Tables some backfill changed rows of
+        self.changed: Set[str] = set()
+
+    def stop(self) -> None:
+        """Make `run` return after the batch in progress."""
+        self._stop.set()
+
+    def run(self, progress: Optional[Callable[[str, int, int], None]] = None) -> bool:
+        """Run pending backfills; True once none is left, False if stopped first.
+
+        `progress(name, rowid reached, rows changed so far)` is called after each batch.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for name in pending(conn):
+                migration = self.migrations.get(name)
+                if migration is None or migration.backfill is None:
+                    # Applied by a newer version of the code: leave it to that one
+                    logger.warning("Pending backfill %s is unknown to this version", name)
+                    return False
+                if not self._backfill(conn, migration, progress):
+                    return False
+            return True
+        finally:
+            conn.close()
+
+    def _backfill(self, conn: sqlite3.Connection, migration: Migration, progress) -> bool:
+        batch = self.batch_size
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                after, finished_at, total = conn.execute(
+                    f"SELECT backfill_after, finished_at, rows_changed FROM {MIGRATIONS_TABLE} WHERE name = ?",
+                    (migration.name,),
+                ).fetchone()
+                if finished_at is not None:
+                    # Another worker got to the end
+                    conn.execute("COMMIT")
+                    return True
+                last, changed = migration.backfill(conn.cursor(), after, batch)
+                conn.execute(
+                    f"UPDATE {MIGRATIONS_TABLE} SET backfill_after = ?, rows_changed = rows_changed + ?, "
+                    f"finished_at = ? WHERE name = ?",
+                    (last, changed, None if last is not None else _now(), migration.name),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            if changed and migration.table:
+                self.changed.add(migration.table)
+            if progress is not None:
+                progress(migration.name, last if last is not None else after, total + changed)
+            if last is None:
+                logger.info("Backfill %s finished (%d rows changed)", migration.name, total + changed)
+                return True
+            # Keep the write lock for short stretches only
+            elapsed = time.perf_counter() - started
+            if elapsed > self.target:
+                batch = max(10, batch // 2)
+            elif elapsed < self.target / 4:
+                batch = min(self.batch_size, batch * 2)
+            self._stop.wait(self.pause)
+        return False
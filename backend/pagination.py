@@ -0,0 +1,43 @@
+"""Opaque keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row on the previous page, wrapped as
+url-safe base64 JSON and tagged with the listing it belongs to, so clients
+treat it as an opaque token and cannot replay a doctors cursor on events.
+Each page is then a range scan starting at that key, so page N costs the
+same as page 1 no matter how deep the client goes.
+"""
+import base64
+import json
+from typing import Any, List, Optional
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(kind: str, key: List[Any]) -> str:
+    raw = json.dumps([kind, key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(kind: str, cursor: Optional[str], size: int) -> Optional[list]:
+    """Return the sort key stored in `cursor`, or None for the first page.
+
+    Raises InvalidCursor if the token is malformed, belongs to another
+    listing or does not carry a key of `size` values.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_kind, key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if cursor_kind != kind or not isinstance(key, list) or len(key) != size:
+        raise InvalidCursor("Cursor does not belong to this listing")
+    return key
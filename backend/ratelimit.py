@@ -0,0 +1,65 @@
+"""slowapi rate limits, imported on first use.
+
+slowapi and `limits` (with the sqlite:// storage of ratelimit_store.py) add
+~35 ms of imports to every worker boot, for a single limited endpoint.
+`LazyLimiter.limit()` decorates endpoints without importing any of it: the
+real `slowapi.Limiter` is built, and the endpoint wrapped by it, when the
+first request reaches a limited endpoint. `RateLimitExceeded` is turned
+into slowapi's usual 429 response right there, since an exception handler
+registered on the app would need the class at import time.
+
+There are no default limits, so SlowAPIMiddleware (which only applies
+those) is not installed: the decorator alone enforces each limit.
+"""
+import functools
+from typing import Any, Callable, Optional
+
+
+class LazyLimiter:
+    def __init__(self, storage_uri: str, key_func: Optional[Callable] = None):
+        self.storage_uri = storage_uri
+        self.key_func = key_func
+        # Mirrors slowapi's Limiter.enabled (benchmarks switch it off)
+        self.enabled = True
+        self._limiter: Any = None
+
+    @property
+    def limiter(self):
+        if self._limiter is None:
+            from slowapi import Limiter
+            from slowapi.util import get_remote_address
+
+            import ratelimit_store  # noqa: F401 (registers the sqlite:// limiter storage)
+
+            self._limiter = Limiter(key_func=self.key_func or get_remote_address, storage_uri=self.storage_uri)
+        self._limiter.enabled = self.enabled
+        return self._limiter
+
+    def limit(self, limit_value: str) -> Callable:
+        """Like `slowapi.Limiter.limit`; the endpoint must take `request: Request`."""
+
+        def decorator(func: Callable) -> Callable:
+            limited: Optional[Callable] = None
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                nonlocal limited
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                from slowapi import _rate_limit_exceeded_handler
+                from slowapi.errors import RateLimitExceeded
+
+                limiter = self.limiter
+                if limited is None:
+                    limited = limiter.limit(limit_value)(func)
+                request = kwargs["request"]
+                # slowapi's handler reads the limiter from the app
+                request.app.state.limiter = limiter
+                try:
+                    return await limited(*args, **kwargs)
+                except RateLimitExceeded as exc:
+                    return _rate_limit_exceeded_handler(request, exc)
+
+            return wrapper
+
+        return decorator
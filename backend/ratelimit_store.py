@@ -0,0 +1,107 @@
+"""Rate-limit counters shared by all workers, in a small SQLite file.
+
+slowapi keeps its counters in process memory by default, so with N gunicorn
+workers the `5/minute` login limit really allowed 5*N attempts, depending on
+which worker got each request. `SQLiteStorage` is a `limits` storage backend
+(registered for `sqlite:///path` URIs) that keeps the fixed-window counters
+in a WAL-mode SQLite database every worker opens:
+
+* a hit is one UPSERT ... RETURNING statement in autocommit mode, so the
+  read-modify-write is atomic across processes without any locking of our
+  own; an expired window restarts inside the same statement;
+* the file is separate from the application database, so rate limiting
+  never waits for the application's write lock and vice versa;
+* with WAL and synchronous=NORMAL a commit does not fsync, so a check costs
+  tens of microseconds (see scripts/bench_ratelimit.py);
+* expired counters are purged every `PURGE_EVERY` hits.
+
+Losing the most recent counters on a power failure only means a client
+gets a fresh window, which is acceptable for rate limiting.
+"""
+import sqlite3
+import threading
+import time
+from typing import Optional, Type
+
+from limits.storage import Storage
+
+PURGE_EVERY = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+INCR = """
+INSERT INTO rate_limits(key, value, expires_at) VALUES (:key, :amount, :expires)
+ON CONFLICT(key) DO UPDATE SET
+    value = CASE WHEN expires_at <= :now THEN :amount ELSE value + :amount END,
+    expires_at = CASE WHEN expires_at <= :now OR :elastic THEN :expires ELSE expires_at END
+RETURNING value
+"""
+
+
+class SQLiteStorage(Storage):
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, busy_timeout: float = 1.0, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        # sqlite:///abs/path.db -> /abs/path.db
+        self.path = uri.split("://", 1)[1]
+        self.busy_timeout = float(busy_timeout)
+        self._local = threading.local()
+        self._hits = 0
+        self._connection().execute(SCHEMA)
+
+    @property
+    def base_exceptions(self) -> Type[Exception]:
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def incr(self, key: str, expiry: float, elastic_expiry: bool = False, amount: int = 1) -> int:
+        now = time.time()
+        conn = self._connection()
+        value = conn.execute(
+            INCR, {"key": key, "amount": amount, "expires": now + expiry, "now": now, "elastic": elastic_expiry}
+        ).fetchone()[0]
+        self._hits += 1
+        if self._hits % PURGE_EVERY == 0:
+            conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+        return value
+
+    def get(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT value FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        return self._connection().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
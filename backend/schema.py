@@ -0,0 +1,50 @@
+"""Versioned schema bootstrap.
+
+Bringing the schema up to date (`create_all`, added columns and indexes,
+the FTS and facet tables with their triggers, the event-window backfill)
+costs dozens of catalog queries, and every gunicorn worker used to run it
+on every start. Instead, the database records which schema it has in
+`PRAGMA user_version`, a 32-bit integer in the file header:
+
+* `fingerprint()` hashes the DDL the application would create (tables and
+  indexes compiled from the models, plus the trigger and virtual-table
+  statements of search.py and facets.py), so any change to a model or a
+  trigger produces a new version without anyone having to bump a number;
+* at startup a worker reads `stored_version()` (one pragma, no lock) and
+  skips all DDL when it matches. Otherwise it takes the write lock,
+  checks again (another worker may have just done it), bootstraps, and
+  `stamp()`s the new version in the same transaction.
+
+Anything that changes the schema behind the application's back (dropping
+and recreating a table, dropping triggers) must stamp 0 or bootstrap
+again with `force`; `scripts/init_db.py --force` does the latter.
+"""
+import hashlib
+from typing import Iterable
+
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+
+def fingerprint(metadata, dialect, *ddl: Iterable[str]) -> int:
+    digest = hashlib.sha1()
+    for table in metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    for statements in ddl:
+        for statement in statements:
+            digest.update(" ".join(statement.split()).encode())
+    # A positive signed 32-bit value; 0 is what a new database starts with
+    return int.from_bytes(digest.digest()[:4], "big") & 0x7FFFFFFF or 1
+
+
+def stored_version(conn) -> int:
+    """`conn` is a DB-API connection or a SQLAlchemy sync connection."""
+    execute = getattr(conn, "exec_driver_sql", None) or conn.execute
+    return execute("PRAGMA user_version").fetchone()[0]
+
+
+def stamp(conn, version: int) -> None:
+    execute = getattr(conn, "exec_driver_sql", None) or conn.execute
+    # Part of the surrounding transaction, like any other header change
+    execute(f"PRAGMA user_version = {int(version)}")
@@ -0,0 +1,133 @@
+"""Full-text search over the doctor directory (SQLite FTS5).
+
+The `doctors_fts` virtual table is an external-content index on `doctors`:
+it stores only the inverted index and reads column values back from
+`doctors` by `seq`, the table's INTEGER PRIMARY KEY (its rowid, which
+VACUUM keeps; see the 0002_doctor_seq migration). Triggers keep it in sync
+with every write, so the API endpoints, the seed scripts and raw SQL all
+stay consistent.
+"""
+import re
+import unicodedata
+from typing import Optional
+
+FTS_TABLE = "doctors_fts"
+
+# Column weights for bm25(), in FTS column order (name, city, specialty).
+# A hit on the name outranks a hit on the specialty, which outranks the city.
+RANK_WEIGHTS = (10.0, 2.0, 5.0)
+
+SEARCH_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, city, specialty,
+        content='doctors', content_rowid='seq',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS doctors_fts_ai AFTER INSERT ON doctors BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, city, specialty)
+        VALUES (new.seq, new.name, new.city, new.specialty);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS doctors_fts_ad AFTER DELETE ON doctors BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, city, specialty)
+        VALUES ('delete', old.seq, old.name, old.city, old.specialty);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS doctors_fts_au AFTER UPDATE OF name, city, specialty ON doctors BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, city, specialty)
+        VALUES ('delete', old.seq, old.name, old.city, old.specialty);
+        INSERT INTO {FTS_TABLE}(rowid, name, city, specialty)
+        VALUES (new.seq, new.name, new.city, new.specialty);
+    END
+    """,
+]
+
+TRIGGERS = ("doctors_fts_ai", "doctors_fts_ad", "doctors_fts_au")
+
+# Portuguese function words that only add noise to a directory query
+# ("Maria de Souza", "Cirurgia da Retina").
+STOPWORDS = {"a", "o", "as", "os", "e", "de", "da", "do", "das", "dos", "em", "na", "no", "nas", "nos", "dr", "dra"}
+
+# Inflectional endings stripped before prefix matching, longest first.
+# This is deliberately light (plural + gender), not a full RSLP stemmer:
+# the stripped stem is matched as a prefix, so "cirurgias" -> "cirurgi*"
+# finds "Cirurgia" and "Cirurgião", "operações" -> "operac*" finds "Operação".
+_SUFFIXES = ("oes", "aes", "ns", "es", "s", "a", "o", "e")
+_MIN_STEM = 4
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fold(value: str) -> str:
+    """Lowercase and strip accents ("Belém" -> "belem")."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def stem(token: str) -> str:
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+            return token[: -len(suffix)]
+    return token
+
+
+def _terms(text: str) -> list:
+    tokens = [t for t in _TOKEN_RE.findall(fold(text)) if t not in STOPWORDS]
+    # Tokens are plain [a-z0-9_] after folding, so quoting them is enough to
+    # keep user input from being parsed as FTS5 query syntax.
+    return [f'"{stem(t)}"*' for t in tokens]
+
+
+def build_match(q: Optional[str] = None, city: Optional[str] = None, specialty: Optional[str] = None) -> Optional[str]:
+    """Build an FTS5 MATCH expression, or None if there is nothing to match.
+
+    `q` is matched against every column; `city` and `specialty` are scoped
+    to their own column. All terms are ANDed.
+    """
+    clauses = []
+    if q:
+        clauses.extend(_terms(q))
+    for column_name, value in (("city", city), ("specialty", specialty)):
+        if value:
+            terms = _terms(value)
+            if terms:
+                clauses.append(f"{{{column_name}}} : ({' AND '.join(terms)})")
+    if not clauses:
+        return None
+    return " AND ".join(clauses)
+
+
+def rank_expression() -> str:
+    """bm25() call with the directory's column weights (lower is better)."""
+    weights = ", ".join(str(w) for w in RANK_WEIGHTS)
+    return f"bm25({FTS_TABLE}, {weights})"
+
+
+def ensure_search_index(conn) -> None:
+    """Create the FTS table and triggers; rebuild the index if it may be stale.
+
+    `conn` is a DB-API connection (or SQLAlchemy sync connection via
+    `exec_driver_sql`). Safe to call on every startup. Missing triggers mean
+    the index is new or `doctors` was dropped and recreated behind its back
+    (as `scripts/seed_doctors.py` does), so either way it gets rebuilt.
+    """
+    execute = getattr(conn, "exec_driver_sql", None) or conn.execute
+    names = (FTS_TABLE, *TRIGGERS)
+    present = execute(
+        f"SELECT count(*) FROM sqlite_master WHERE name IN ({', '.join('?' * len(names))})", names
+    ).fetchone()[0]
+    for ddl in SEARCH_DDL:
+        execute(ddl)
+    if present < len(names):
+        rebuild_search_index(conn)
+
+
+def rebuild_search_index(conn) -> None:
+    """Repopulate the index from `doctors` (e.g. after writes with the triggers dropped)."""
+    execute = getattr(conn, "exec_driver_sql", None) or conn.execute
+    execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
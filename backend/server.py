@@ -1,30 +1,54 @@
+import asyncio
+import ipaddress
 import logging
 import os
-import shutil
+import secrets
+import sys
+import time
 import uuid
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Request
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from pydantic import BaseModel, ConfigDict
-from sqlalchemy import Column, String, Boolean, DateTime, select
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
-
-# Rate Limiting
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
+from pydantic import BaseModel, ConfigDict, computed_field
+from sqlalchemy import Column, String, Boolean, DateTime, Float, Index, Integer, and_, event, or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.schema import CreateColumn
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+# Backend modules are imported flat so this file works both as `backend.server`
+# (gunicorn) and as `server` (scripts append the backend dir to sys.path).
+sys.path.insert(0, str(Path(__file__).parent))
+import auth_cache  # noqa: E402
+import backups  # noqa: E402
+import bulk_import  # noqa: E402
+import cache  # noqa: E402
+import event_dates  # noqa: E402
+import facets  # noqa: E402
+import file_serving  # noqa: E402
+import hashing  # noqa: E402
+import http_encoding  # noqa: E402
+import images  # noqa: E402
+import img_proxy  # noqa: E402
+import metrics  # noqa: E402
+import migrations  # noqa: E402
+import pagination  # noqa: E402
+import ratelimit  # noqa: E402
+import schema  # noqa: E402
+import search  # noqa: E402
+import slow_queries  # noqa: E402
+import static_assets  # noqa: E402
+import storage  # noqa: E402
+import suggest  # noqa: E402
+import uploads  # noqa: E402
 
 # --- 1. CONFIGURATION ---
 ROOT_DIR = Path(__file__).parent
@@ -44,19 +68,113 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # File Storage
-UPLOAD_DIR = os.path.join(ROOT_DIR, "uploads")
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", os.path.join(ROOT_DIR, "uploads"))
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+# Uploads never change under their name: served as immutable, with 304s and
+# byte ranges. With UPLOADS_ACCEL_REDIRECT naming an nginx internal location,
+# nginx sends the bodies with sendfile (see file_serving.py)
+upload_files = file_serving.FileServer(
+    UPLOAD_DIR,
+    chunk_size=int(os.environ.get("UPLOADS_CHUNK_BYTES", str(256 * 1024))),
+    accel_redirect=os.environ.get("UPLOADS_ACCEL_REDIRECT") or None,
+)
+
+# Resized variants of uploaded photos, rendered in a process pool (see images.py)
+image_pipeline = images.ImagePipeline(
+    UPLOAD_DIR,
+    widths=[int(w) for w in os.environ.get("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",") if w.strip()],
+    fmt=os.environ.get("IMAGE_VARIANT_FORMAT", "webp"),
+    max_workers=int(os.environ.get("IMAGE_WORKERS", "1")),
+)
+
+# On-disk mirror of external images, served from /api/img-proxy (see img_proxy.py)
+image_proxy = img_proxy.ImageProxyCache(
+    os.environ.get("IMG_CACHE_DIR", os.path.join(ROOT_DIR, "img-cache")),
+    allowed_hosts=os.environ.get(
+        "IMG_PROXY_ALLOWED_HOSTS", "customer-assets.emergentagent.com,images.unsplash.com"
+    ).split(","),
+    max_bytes=int(os.environ.get("IMG_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+)
 
 # Database
 # In Docker, we might want to map this to a volume
-DB_PATH = os.path.join(ROOT_DIR, "medassoc.db")
+DB_PATH = os.environ.get("DB_PATH", os.path.join(ROOT_DIR, "medassoc.db"))
 DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# WAL + pragmas on every connection; `engine` is this process' single writer
+# connection, `read_engine` a pool of read-only connections (see storage.py)
+engine, read_engine = storage.create_engines(DB_PATH, read_pool_size=int(os.environ.get("DB_READ_POOL", "4")))
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False)
+# Request, query, cache and event-loop metrics, summed over all workers at
+# GET /metrics (see metrics.py)
+app_metrics = metrics.register_defaults(metrics.Metrics(
+    os.environ.get("METRICS_DIR", os.path.join(ROOT_DIR, ".metrics")),
+    flush_interval=float(os.environ.get("METRICS_FLUSH_SECONDS", "1")),
+))
+metrics.instrument_engine(app_metrics, engine, "write")
+metrics.instrument_engine(app_metrics, read_engine, "read")
+# Statements slower than SLOW_QUERY_MS, and every new statement whose plan
+# scans a whole table, go to a log file shared by all workers (see slow_queries.py)
+slow_query_log = slow_queries.SlowQueryLog(
+    os.environ.get("SLOW_QUERY_LOG", os.path.join(ROOT_DIR, "logs", "slow_queries.log")),
+    threshold=float(os.environ.get("SLOW_QUERY_MS", "100")) / 1000,
+    max_bytes=int(os.environ.get("SLOW_QUERY_LOG_BYTES", str(10 * 1024 * 1024))),
+    backups=int(os.environ.get("SLOW_QUERY_LOG_BACKUPS", "5")),
+)
+slow_query_log.instrument(engine, "write")
+slow_query_log.instrument(read_engine, "read")
+# Online snapshots through SQLite's backup API, taken by scripts/backup.py,
+# POST /api/admin/backups or every BACKUP_INTERVAL_HOURS (see backups.py)
+db_backups = backups.BackupManager(
+    DB_PATH,
+    os.environ.get("BACKUP_DIR", os.path.join(ROOT_DIR, "backups")),
+    keep=int(os.environ.get("BACKUP_KEEP", "7")),
+    compress=os.environ.get("BACKUP_COMPRESS", "1") != "0",
+    pages=int(os.environ.get("BACKUP_STEP_PAGES", "1024")),
+    pause=float(os.environ.get("BACKUP_STEP_PAUSE_MS", "5")) / 1000,
+    interval=float(os.environ.get("BACKUP_INTERVAL_HOURS", "0")) * 3600,
+)
+# Endpoints write through this queue, which batches concurrent writes into one commit
+db_writer = storage.SerializedWriter(AsyncSessionLocal)
 Base = declarative_base()
 
-limiter = Limiter(key_func=get_remote_address)
+# Counters live in a SQLite file shared by all workers (see ratelimit_store.py),
+# so "5/minute" means five per client, not five per client per worker.
+# slowapi itself is imported on the first limited request (see ratelimit.py)
+limiter = ratelimit.LazyLimiter(
+    storage_uri=os.environ.get("RATE_LIMIT_STORAGE", f"sqlite:///{ROOT_DIR / 'ratelimit.db'}"),
+)
+
+# Per-table data versions (see cache.py). They are stamp files so writes on
+# one gunicorn worker invalidate the caches of all of them.
+data_versions = cache.DataVersions(cache.default_version_dir())
+
+# Response cache for public listings
+response_cache = cache.ResponseCache(
+    data_versions,
+    max_entries=int(os.environ.get("RESPONSE_CACHE_ENTRIES", "512")),
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024))),
+)
+
+# Verified token -> user cache for get_current_user (see auth_cache.py)
+principal_cache = auth_cache.PrincipalCache(
+    data_versions,
+    ttl=float(os.environ.get("AUTH_CACHE_TTL", "300")),
+    trust_window=float(os.environ.get("AUTH_TRUST_WINDOW", "30")),
+)
+
+app_metrics.collectors.append(metrics.cache_collector("responses", response_cache.stats))
+app_metrics.collectors.append(metrics.cache_collector("auth", principal_cache.stats))
+app_metrics.collectors.append(metrics.cache_collector("img_proxy", image_proxy.stats))
+
+# Typeahead over accent-folded doctor fields, held in memory (see suggest.py)
+suggest_index = suggest.SuggestIndex(
+    DB_PATH,
+    data_versions,
+    fields=[f.strip() for f in os.environ.get("SUGGEST_FIELDS", "name,city,specialty").split(",") if f.strip()],
+)
 
 # --- 2. DATABASE MODELS ---
 class UserModel(Base):
@@ -69,7 +187,11 @@ class UserModel(Base):
 
 class DoctorModel(Base):
     __tablename__ = "doctors"
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    # The rowid, under a name VACUUM cannot renumber: the search index and the
+    # listing cursors are keyed on it (see search.py). The API keeps using `id`.
+    seq = Column(Integer, primary_key=True)
+    id = Column(String, unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    __mapper_args__ = {"primary_key": [id]}
     name = Column(String)
     city = Column(String)
     specialty = Column(String)
@@ -89,6 +211,39 @@ class EventModel(Base):
     external_link = Column(String, nullable=True)
     status = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Parsed from date/time, naive local time; NULL if not understood (see event_dates.py)
+    starts_at = Column(DateTime, nullable=True)
+    ends_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Sort key of GET /api/events (newest first, keyset paginated)
+        Index("ix_events_created_at_id", "created_at", "id"),
+        # Time-window listings: ordered by start, bounded by start and end
+        Index("ix_events_starts_at_id", "starts_at", "id"),
+        Index("ix_events_ends_at", "ends_at"),
+    )
+
+@event.listens_for(EventModel, "before_insert")
+@event.listens_for(EventModel, "before_update")
+def _fill_event_window(mapper, connection, target):
+    target.starts_at, target.ends_at = event_dates.parse_window(target.date, target.time)
+
+# Any committed change to a user invalidates cached principals
+@event.listens_for(UserModel, "after_update")
+@event.listens_for(UserModel, "after_delete")
+def _track_user_change(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_users", set()).add(target.username)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for username in session.info.pop("changed_users", ()):
+        principal_cache.invalidate_user(username)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop("changed_users", None)
 
 # --- 3. API SCHEMAS (Pydantic) ---
 class Token(BaseModel):
@@ -102,6 +257,10 @@ class DoctorCreate(BaseModel):
     contact_info: str
     image_url: Optional[str] = None
 
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
 class DoctorUpdate(BaseModel):
     name: Optional[str] = None
     city: Optional[str] = None
@@ -114,6 +273,16 @@ class DoctorResponse(DoctorCreate):
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def image_srcset(self) -> Optional[Dict[str, str]]:
+        return image_pipeline.srcset(self.image_url)
+
+    @computed_field
+    @property
+    def image_proxy_url(self) -> Optional[str]:
+        return image_proxy.proxy_path(self.image_url)
+
 class EventCreate(BaseModel):
     title: str
     date: str
@@ -137,26 +306,59 @@ class EventUpdate(BaseModel):
 class EventResponse(EventCreate):
     id: str
     created_at: datetime
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def image_srcset(self) -> Optional[Dict[str, str]]:
+        return image_pipeline.srcset(self.image_url)
+
+    @computed_field
+    @property
+    def image_proxy_url(self) -> Optional[str]:
+        return image_proxy.proxy_path(self.image_url)
+
 # --- 4. SECURITY & AUTH ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt runs in a bounded thread pool so a login burst cannot stall the loop;
+# passlib is imported on the first password check (see hashing.py)
+password_hasher = hashing.PasswordHasher(
+    ["bcrypt"],
+    max_workers=int(os.environ.get("HASH_WORKERS", "0")) or None,
+    max_pending=int(os.environ.get("HASH_MAX_PENDING", "32")),
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Blocking helpers kept for scripts; endpoints await password_hasher instead
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_hasher.context.hash(password)
+
+async def verify_password_async(plain_password, hashed_password):
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except hashing.HasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent logins, try again shortly",
+            headers={"Retry-After": "1"},
+        )
 
 def create_access_token(data: dict):
+    # jose (and cryptography) load on first use, not at worker boot
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 async def get_db():
-    async with AsyncSessionLocal() as session:
+    # Read-only session; writes go through db_writer.submit()
+    async with ReadSessionLocal() as session:
         yield session
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
@@ -165,28 +367,37 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    cached = principal_cache.get(token)
+    if cached is not None:
+        if principal_cache.trusted(cached):
+            return cached.principal
+        username, expires_at = cached.username, cached.expires_at
+    else:
+        from jose import JWTError, jwt
+
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            if username is None:
+                raise auth_exception
+        except JWTError:
             raise auth_exception
-    except JWTError:
-        raise auth_exception
+        expires_at = float(payload.get("exp") or time.time())
     
+    # Read the version first so a change committed during the lookup is caught
+    users_version = data_versions.current("users")
     result = await db.execute(select(UserModel).where(UserModel.username == username))
     user = result.scalars().first()
-    if user is None:
+    if user is None or user.disabled:
         raise auth_exception
+    principal_cache.put(token, user, username, expires_at, users_version)
     return user
 
 # --- 5. APPLICATION SETUP ---
-app = FastAPI(title="S.P.O. API", version="1.0.0")
+# Listings are validated by response_model as usual, then rendered with orjson
+app = FastAPI(title="S.P.O. API", version="1.0.0", default_response_class=http_encoding.FastJSONResponse)
 
 # Middleware Stack
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
-
 # Trusted Hosts
 # Allow all in production typically behind Nginx/Traefik, or specify exact domains
 app.add_middleware(
@@ -194,7 +405,59 @@ app.add_middleware(
     allowed_hosts=["*"] # Managed by Nginx/Firewall in prod usually
 )
 
-# CORS
+# Response Cache Middleware
+# Public listings -> table whose version keys their cache entries
+CACHED_LISTINGS = {"/api/doctors": "doctors", "/api/doctors/facets": "doctors", "/api/events": "events"}
+# Answers that change with the clock, not only with the table
+UNCACHED_PARAMS = {"upcoming"}
+
+# Pure ASGI, like the middlewares below: BaseHTTPMiddleware relays every
+# response body through a memory stream, uploads included
+class CachedListingsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        table = CACHED_LISTINGS.get(request.url.path)
+        if table is None or UNCACHED_PARAMS.intersection(request.query_params):
+            await self.app(scope, receive, send)
+            return
+
+        key = response_cache.key(table, request.url.path, request.url.query)
+        entry = response_cache.get(key)
+        if entry is None:
+            messages = []
+
+            async def collect(message):
+                messages.append(message)
+
+            await self.app(scope, receive, collect)
+            start = messages[0]
+            body = b"".join(message.get("body", b"") for message in messages[1:])
+            if start["status"] != 200:
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            entry = response_cache.put(key, start["status"], Headers(raw=start["headers"]).items(), body)
+
+        # Clients must revalidate, which is a 304 without touching the database
+        validators = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if cache.etag_matches(request.headers.get("if-none-match"), entry.etag):
+            response_cache.not_modified += 1
+            response = Response(status_code=304, headers=validators)
+        else:
+            response = Response(content=entry.body, status_code=entry.status_code, headers=dict(entry.headers))
+            response.headers.update(validators)
+        await response(scope, receive, send)
+
+app.add_middleware(CachedListingsMiddleware)
+
+# CORS (added after the response cache, so it wraps it: cached listings are
+# shared by every origin and get their CORS headers per request)
 origins_raw = os.environ.get("CORS_ORIGINS", "*")
 origins = origins_raw.split(",") if "," in origins_raw else [origins_raw]
 app.add_middleware(
@@ -203,18 +466,43 @@ app.add_middleware(
     allow_origins=origins,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER],
 )
 
 # Security Headers Middleware
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    # Security Headers - Relaxed for Preview/Frame
-    # response.headers["X-Frame-Options"] = "SAMEORIGIN" 
-    # Removed DENY to allow preview in iframe
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    return response
+class SecurityHeadersMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                # Security Headers - Relaxed for Preview/Frame
+                # headers["X-Frame-Options"] = "SAMEORIGIN"
+                # Removed DENY to allow preview in iframe
+                headers["X-Content-Type-Options"] = "nosniff"
+                headers["X-XSS-Protection"] = "1; mode=block"
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+app.add_middleware(SecurityHeadersMiddleware)
+
+# Compression (wraps the response cache, CORS and security headers, so cached
+# listings are compressed too)
+app.add_middleware(http_encoding.CompressionMiddleware, prefixes=("/api/",),
+                   min_size=int(os.environ.get("COMPRESS_MIN_BYTES", "1024")))
+
+# Request metrics (wraps every middleware above, so the latency includes them)
+app.add_middleware(metrics.MetricsMiddleware, metrics=app_metrics)
+# Outermost, as the last one added: lets the slow-query log attribute
+# statements to the endpoint that ran them
+app.add_middleware(slow_queries.RequestContextMiddleware)
 
 # API Router
 api_router = APIRouter(prefix="/api")
@@ -232,7 +520,7 @@ async def login(
     result = await db.execute(select(UserModel).where(UserModel.username == form_data.username))
     user = result.scalars().first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -242,148 +530,430 @@ async def login(
     return {"access_token": create_access_token({"sub": user.username}), "token_type": "bearer"}
 
 # File Upload
-@api_router.post("/upload")
+ALLOWED_UPLOAD_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+@api_router.post(
+    "/upload",
+    openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}},
+    }}}}},
+)
 async def upload_file(
-    file: UploadFile = File(...), 
+    request: Request,
     user: UserModel = Depends(get_current_user)
 ):
-    ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
-    ext = os.path.splitext(file.filename)[1].lower()
-    
-    if ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(400, "Invalid file type. Allowed: JPG, PNG, WEBP.")
-        
-    filename = f"{uuid.uuid4()}{ext}"
-    path = os.path.join(UPLOAD_DIR, filename)
-    
+    # Streamed to disk in chunks and stored under its SHA-256 (see uploads.py)
     try:
-        with open(path, "wb+") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        return {"url": f"/uploads/{filename}"}
+        stored = await uploads.receive_upload(
+            request, "file", UPLOAD_DIR, UPLOAD_MAX_BYTES, ALLOWED_UPLOAD_EXTENSIONS
+        )
+    except uploads.UploadRejected as e:
+        raise HTTPException(e.status_code, e.detail)
     except Exception:
+        logger.exception("Upload failed")
         raise HTTPException(500, "File upload failed.")
+    # Resized variants are rendered in a worker process, off this loop
+    srcset = await image_pipeline.derive(stored.filename)
+    return {
+        "url": f"/uploads/{stored.filename}",
+        "srcset": srcset,
+        "size": stored.size,
+        "deduplicated": stored.deduplicated,
+    }
+
+# External Image Mirror
+@api_router.get(img_proxy.PROXY_PATH[len("/api"):])
+async def proxy_image(url: str, request: Request):
+    try:
+        image = await image_proxy.fetch(url)
+    except img_proxy.ProxyError as e:
+        raise HTTPException(e.status_code, e.detail)
+    headers = {"ETag": image.etag, "Cache-Control": "public, max-age=31536000"}
+    if cache.etag_matches(request.headers.get("if-none-match"), image.etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(image.path, media_type=image.content_type, headers=headers)
+
+# Bulk Import
+IMPORT_CHUNK_ROWS = int(os.environ.get("IMPORT_CHUNK_ROWS", "1000"))
+IMPORT_OPENAPI = {"requestBody": {"required": True, "content": {
+    "text/csv": {"schema": {"type": "string"}},
+    "application/x-ndjson": {"schema": {"type": "string"}},
+}}}
+
+async def run_import(request: Request, requested_format: Optional[str], row_schema, model, table: str,
+                     prepare=None):
+    # Streamed, validated in chunks and written with executemany (see bulk_import.py).
+    # Chunks commit as they go, so a failed import still reports what went in.
+    report = bulk_import.ImportReport()
+    try:
+        fmt = bulk_import.detect_format(request.headers.get("content-type"), requested_format)
+        await bulk_import.import_rows(
+            request, fmt, row_schema, model.__table__, db_writer, report, chunk_size=IMPORT_CHUNK_ROWS,
+            prepare=prepare,
+        )
+    except bulk_import.ImportRejected as e:
+        return http_encoding.FastJSONResponse({**report.as_dict(), "error": e.detail}, status_code=e.status_code)
+    except Exception:
+        logger.exception("Import into %s failed after %d rows", table, report.inserted)
+        return http_encoding.FastJSONResponse(
+            {**report.as_dict(), "error": "Import failed; the rows counted in 'inserted' were written."},
+            status_code=500,
+        )
+    finally:
+        if report.inserted:
+            response_cache.bump(table)
+    return report.as_dict()
+
+@api_router.post("/doctors/import", openapi_extra=IMPORT_OPENAPI)
+async def import_doctors(
+    request: Request,
+    requested_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    user: UserModel = Depends(get_current_user)
+):
+    return await run_import(request, requested_format, DoctorCreate, DoctorModel, "doctors")
+
+@api_router.post("/events/import", openapi_extra=IMPORT_OPENAPI)
+async def import_events(
+    request: Request,
+    requested_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    user: UserModel = Depends(get_current_user)
+):
+    # Core INSERTs skip the ORM hooks, so the time window is filled in here
+    return await run_import(
+        request, requested_format, EventCreate, EventModel, "events", prepare=event_dates.with_window
+    )
 
 # Doctors CRUD
+def _decode_cursor(kind: str, cursor: Optional[str], size: int):
+    try:
+        return pagination.decode_cursor(kind, cursor, size)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(400, str(e))
+
 @api_router.get("/doctors", response_model=List[DoctorResponse])
 async def list_doctors(
+    response: Response,
+    q: Optional[str] = None,
     city: Optional[str] = None, 
     specialty: Optional[str] = None,
-    skip: int = 0, 
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
     db: AsyncSession = Depends(get_db)
 ):
+    # Pages are keyed on `seq`, the rowid: it is the table's own b-tree, and
+    # FTS5 returns hits in rowid order, so filtered pages are range scans too.
+    seq = DoctorModel.seq
     query = select(DoctorModel)
-    if city:
-        query = query.where(DoctorModel.city.ilike(f"%{city}%"))
-    if specialty:
-        query = query.where(DoctorModel.specialty.ilike(f"%{specialty}%"))
-    
-    result = await db.execute(query.offset(skip).limit(limit))
-    return result.scalars().all()
+    if q and search.build_match(q=q) is None:
+        # Only stopwords or punctuation ("dr", "*"): no text filter, as for
+        # a city or specialty that folds to nothing
+        q = None
+    match = search.build_match(q=q, city=city, specialty=specialty)
+    if q:
+        # Ranked, accent-insensitive search through the FTS5 index (see search.py)
+        after = _decode_cursor("doctors:q", cursor, 2)
+        hits = text(
+            f"SELECT rowid, {search.rank_expression()} AS rank "
+            f"FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH :match"
+        ).bindparams(match=match).columns(rowid=Integer, rank=Float).subquery("hits")
+        query = query.add_columns(hits.c.rank).join(hits, hits.c.rowid == seq).order_by(hits.c.rank, seq)
+        if after:
+            query = query.where(or_(hits.c.rank > after[0], and_(hits.c.rank == after[0], seq > after[1])))
+    else:
+        after = _decode_cursor("doctors", cursor, 1)
+        if match:
+            # Column-scoped city/specialty filters go through the same index,
+            # unranked so the range scan can stop after `limit` hits
+            hits = text(
+                f"SELECT rowid FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH :match"
+            ).bindparams(match=match).columns(rowid=Integer).subquery("hits")
+            query = query.join(hits, hits.c.rowid == seq)
+        if after:
+            query = query.where(seq > after[0])
+        query = query.order_by(seq)
+
+    result = await db.execute(query.offset(skip).limit(limit + 1))
+    rows = result.all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        key = [rows[-1].rank, rows[-1][0].seq] if q else [rows[-1][0].seq]
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor("doctors:q" if q else "doctors", key)
+    doctors = [row[0] for row in rows]
+    # Variant manifests are read in a thread, not while the rows serialize
+    await image_pipeline.preload(doctor.image_url for doctor in doctors)
+    return doctors
+
+@api_router.get("/doctors/facets", response_model=Dict[str, List[FacetCount]])
+async def doctor_facets(db: AsyncSession = Depends(get_db)):
+    # Counts are maintained by triggers on every write (see facets.py)
+    result = await db.execute(text(
+        f"SELECT field, value, count FROM {facets.FACET_TABLE} ORDER BY field, count DESC, value"
+    ))
+    return facets.group(result.all())
+
+@api_router.get("/doctors/suggest", response_model=List[FacetCount])
+async def suggest_doctors(
+    field: Literal["name", "city", "specialty"],
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+):
+    # Answered from memory: no database access
+    return [{"value": value, "count": count} for value, count in suggest_index.suggest(field, prefix, limit)]
+
+def _suggest_row(doctor: DoctorModel) -> Dict[str, Optional[str]]:
+    return {field: getattr(doctor, field) for field in suggest.SUGGEST_FIELDS}
+
+def _doctors_written(before: Optional[Dict[str, Optional[str]]] = None,
+                     after: Optional[Dict[str, Optional[str]]] = None):
+    # Drops cached listings everywhere; this worker's suggest index takes
+    # the change directly instead of rebuilding for its own write. The
+    # version replaced comes from the bump itself: one read before it could
+    # miss another worker's bump in between, and the index would skip that write.
+    previous, version = data_versions.advance("doctors")
+    if before:
+        suggest_index.remove(before)
+    if after:
+        suggest_index.add(after)
+    suggest_index.note_local_write(previous, version)
 
 @api_router.post("/doctors", response_model=DoctorResponse, status_code=201)
 async def create_doctor(
     doc: DoctorCreate, 
-    user: UserModel = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    user: UserModel = Depends(get_current_user)
 ):
-    new_doc = DoctorModel(**doc.model_dump())
-    db.add(new_doc)
-    await db.commit()
-    await db.refresh(new_doc)
-    return new_doc
+    async def write(session: AsyncSession):
+        new_doctor = DoctorModel(**doc.model_dump())
+        session.add(new_doctor)
+        await session.flush()
+        return new_doctor
+
+    created = await db_writer.submit(write)
+    _doctors_written(after=_suggest_row(created))
+    await image_pipeline.preload([created.image_url])
+    return created
 
 @api_router.put("/doctors/{id}", response_model=DoctorResponse)
 async def update_doctor(
     id: str, 
     doc: DoctorUpdate, 
-    user: UserModel = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    user: UserModel = Depends(get_current_user)
 ):
-    result = await db.execute(select(DoctorModel).where(DoctorModel.id == id))
-    existing = result.scalars().first()
-    if not existing:
-        raise HTTPException(404, "Doctor not found")
-        
-    for k, v in doc.model_dump(exclude_unset=True).items():
-        setattr(existing, k, v)
-        
-    await db.commit()
-    await db.refresh(existing)
-    return existing
+    async def write(session: AsyncSession):
+        result = await session.execute(select(DoctorModel).where(DoctorModel.id == id))
+        existing = result.scalars().first()
+        if not existing:
+            raise HTTPException(404, "Doctor not found")
+        before.update(_suggest_row(existing))
+            
+        for k, v in doc.model_dump(exclude_unset=True).items():
+            setattr(existing, k, v)
+        await session.flush()
+        return existing
+
+    before: Dict[str, Optional[str]] = {}
+    updated = await db_writer.submit(write)
+    _doctors_written(before, _suggest_row(updated))
+    await image_pipeline.preload([updated.image_url])
+    return updated
 
 @api_router.delete("/doctors/{id}")
 async def delete_doctor(
     id: str, 
-    user: UserModel = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    user: UserModel = Depends(get_current_user)
 ):
-    result = await db.execute(select(DoctorModel).where(DoctorModel.id == id))
-    existing = result.scalars().first()
-    if not existing:
-        raise HTTPException(404, "Doctor not found")
-    
-    await db.delete(existing)
-    await db.commit()
+    async def write(session: AsyncSession):
+        result = await session.execute(select(DoctorModel).where(DoctorModel.id == id))
+        existing = result.scalars().first()
+        if not existing:
+            raise HTTPException(404, "Doctor not found")
+        before.update(_suggest_row(existing))
+        await session.delete(existing)
+
+    before: Dict[str, Optional[str]] = {}
+    await db_writer.submit(write)
+    _doctors_written(before)
     return {"message": "Deleted"}
 
 # Events CRUD
 @api_router.get("/events", response_model=List[EventResponse])
-async def list_events(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(EventModel).order_by(EventModel.created_at.desc()))
-    return result.scalars().all()
+async def list_events(
+    response: Response,
+    from_: Optional[datetime] = Query(None, alias="from", description="Events still running at or after this time"),
+    to: Optional[datetime] = Query(None, description="Events starting at or before this time"),
+    upcoming: bool = Query(False, description="Only events that have not ended yet"),
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    if from_ is None and to is None and not upcoming:
+        return await _list_events_by_creation(response, cursor, limit, db)
+
+    # Time window: chronological, served by the starts_at/ends_at indexes.
+    # Events whose date could not be parsed have NULL bounds and never match.
+    query = select(EventModel).order_by(EventModel.starts_at, EventModel.id)
+    if upcoming:
+        query = query.where(EventModel.ends_at >= event_dates.local_now())
+    if from_ is not None:
+        query = query.where(EventModel.ends_at >= event_dates.to_local(from_))
+    if to is not None:
+        query = query.where(EventModel.starts_at <= event_dates.to_local(to))
+    after = _decode_cursor("events:window", cursor, 2)
+    if after:
+        try:
+            starts_at = datetime.fromisoformat(after[0])
+        except (TypeError, ValueError):
+            raise HTTPException(400, "Malformed cursor")
+        query = query.where(tuple_(EventModel.starts_at, EventModel.id) > tuple_(starts_at, after[1]))
+
+    result = await db.execute(query.limit(limit + 1))
+    events = result.scalars().all()
+    if len(events) > limit:
+        events = events[:limit]
+        last = events[-1]
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor(
+            "events:window", [last.starts_at.isoformat(), last.id]
+        )
+    await image_pipeline.preload(event.image_url for event in events)
+    return events
+
+async def _list_events_by_creation(response: Response, cursor: Optional[str], limit: int, db: AsyncSession):
+    query = select(EventModel).order_by(EventModel.created_at.desc(), EventModel.id.desc())
+    after = _decode_cursor("events", cursor, 2)
+    if after:
+        try:
+            created_at = datetime.fromisoformat(after[0])
+        except (TypeError, ValueError):
+            raise HTTPException(400, "Malformed cursor")
+        query = query.where(tuple_(EventModel.created_at, EventModel.id) < tuple_(created_at, after[1]))
+
+    result = await db.execute(query.limit(limit + 1))
+    events = result.scalars().all()
+    if len(events) > limit:
+        events = events[:limit]
+        last = events[-1]
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor(
+            "events", [last.created_at.isoformat(), last.id]
+        )
+    await image_pipeline.preload(event.image_url for event in events)
+    return events
 
 @api_router.post("/events", response_model=EventResponse, status_code=201)
 async def create_event(
     evt: EventCreate, 
-    user: UserModel = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    user: UserModel = Depends(get_current_user)
 ):
-    new_evt = EventModel(**evt.model_dump())
-    db.add(new_evt)
-    await db.commit()
-    await db.refresh(new_evt)
-    return new_evt
+    async def write(session: AsyncSession):
+        new_event = EventModel(**evt.model_dump())
+        session.add(new_event)
+        await session.flush()
+        return new_event
+
+    created = await db_writer.submit(write)
+    response_cache.bump("events")
+    await image_pipeline.preload([created.image_url])
+    return created
 
 @api_router.put("/events/{id}", response_model=EventResponse)
 async def update_event(
     id: str, 
     evt: EventUpdate, 
-    user: UserModel = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    user: UserModel = Depends(get_current_user)
 ):
-    result = await db.execute(select(EventModel).where(EventModel.id == id))
-    existing = result.scalars().first()
-    if not existing:
-        raise HTTPException(404, "Event not found")
-        
-    for k, v in evt.model_dump(exclude_unset=True).items():
-        setattr(existing, k, v)
-        
-    await db.commit()
-    await db.refresh(existing)
-    return existing
+    async def write(session: AsyncSession):
+        result = await session.execute(select(EventModel).where(EventModel.id == id))
+        existing = result.scalars().first()
+        if not existing:
+            raise HTTPException(404, "Event not found")
+            
+        for k, v in evt.model_dump(exclude_unset=True).items():
+            setattr(existing, k, v)
+        await session.flush()
+        return existing
+
+    updated = await db_writer.submit(write)
+    response_cache.bump("events")
+    await image_pipeline.preload([updated.image_url])
+    return updated
 
 @api_router.delete("/events/{id}")
 async def delete_event(
     id: str, 
-    user: UserModel = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    user: UserModel = Depends(get_current_user)
 ):
-    result = await db.execute(select(EventModel).where(EventModel.id == id))
-    existing = result.scalars().first()
-    if not existing:
-        raise HTTPException(404, "Event not found")
-    
-    await db.delete(existing)
-    await db.commit()
+    async def write(session: AsyncSession):
+        result = await session.execute(select(EventModel).where(EventModel.id == id))
+        existing = result.scalars().first()
+        if not existing:
+            raise HTTPException(404, "Event not found")
+        await session.delete(existing)
+
+    await db_writer.submit(write)
+    response_cache.bump("events")
     return {"message": "Deleted"}
 
+# Cache Introspection
+@api_router.get("/cache/stats")
+async def cache_stats(user: UserModel = Depends(get_current_user)):
+    return {
+        "responses": response_cache.stats(), "auth": principal_cache.stats(), "img_proxy": image_proxy.stats(),
+        "uploads": upload_files.stats(),
+    }
+
+# Slow statements from all workers, and this worker's totals and query plans
+@api_router.get("/admin/slow-queries")
+async def slow_query_report(
+    limit: int = Query(100, ge=1, le=1000),
+    user: UserModel = Depends(get_current_user),
+):
+    return slow_query_log.report(limit)
+
+# Database snapshots, newest first
+@api_router.get("/admin/backups")
+async def list_backups(user: UserModel = Depends(get_current_user)):
+    return [snapshot.as_dict() for snapshot in db_backups.list()]
+
+@api_router.post("/admin/backups", status_code=201)
+async def create_backup(user: UserModel = Depends(get_current_user)):
+    # Copied in small steps in a thread; the event loop keeps serving meanwhile
+    try:
+        snapshot = await asyncio.to_thread(db_backups.snapshot)
+    except backups.BackupBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return snapshot.as_dict()
+
 # Include API Router
 app.include_router(api_router)
 
-# Mount Uploads (Before catch-all)
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+# Prometheus scrape endpoint. Set METRICS_TOKEN to require "Authorization: Bearer <token>";
+# without it only a scraper on this host may read it (not requests a local proxy forwards).
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+def _is_local(request: Request) -> bool:
+    if request.client is None or "x-forwarded-for" in request.headers or "forwarded" in request.headers:
+        return False
+    try:
+        return ipaddress.ip_address(request.client.host).is_loopback
+    except ValueError:
+        return False
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    if METRICS_TOKEN:
+        if not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    elif not _is_local(request):
+        raise HTTPException(status_code=403, detail="Set METRICS_TOKEN to scrape metrics from another host")
+    # Reads and sums every worker's file: not on the event loop
+    return Response(await run_in_threadpool(app_metrics.render), media_type=metrics.CONTENT_TYPE)
+
+# Uploaded files, before the catch-all (see file_serving.py)
+@app.api_route("/uploads/{name}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_upload(name: str, request: Request):
+    response = upload_files.response(name, request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return response
 
 # --- 7. STATIC FILES (Frontend Serving) ---
 # IMPORTANT: This allows us to serve the React app from FastAPI directly
@@ -395,39 +965,143 @@ LOCAL_BUILD_DIR = ROOT_DIR.parent / "frontend" / "build" # Local path
 # Determine which build dir exists
 BUILD_DIR = FRONTEND_BUILD_DIR if FRONTEND_BUILD_DIR.exists() else LOCAL_BUILD_DIR
 
-if BUILD_DIR.exists():
-    app.mount("/static", StaticFiles(directory=BUILD_DIR / "static"), name="static")
-    
+# Scanned once at startup into an in-memory manifest with precompressed
+# variants (see static_assets.py); requests never touch the filesystem layout
+static_manifest = static_assets.StaticManifest(str(BUILD_DIR)) if BUILD_DIR.exists() else None
+
+if static_manifest is not None:
     # Catch-all route for SPA (React Router)
     @app.get("/{full_path:path}")
-    async def serve_react_app(full_path: str):
+    async def serve_react_app(full_path: str, request: Request):
         # Allow API calls to pass through
         if full_path.startswith("api/") or full_path.startswith("uploads/"):
             raise HTTPException(status_code=404, detail="Not Found")
-            
-        file_path = BUILD_DIR / full_path
-        if file_path.exists() and file_path.is_file():
-            return FileResponse(file_path)
-            
+
+        asset = static_manifest.lookup(full_path)
+        if asset is not None:
+            return asset.response(request)
+        # Missing hashed assets are real 404s, not client-side routes
+        if full_path.startswith("static/") or static_manifest.index is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+
         # Default to index.html for SPA routing
-        return FileResponse(BUILD_DIR / "index.html")
+        return static_manifest.index.response(request)
 else:
     logger.warning("⚠️ Frontend build directory not found. Run 'yarn build' in frontend.")
 
 # Startup
+def ensure_columns(conn):
+    # create_all() never alters existing tables, so nullable columns added
+    # to a model later are added here.
+    for table in Base.metadata.sorted_tables:
+        existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+        for column in table.columns:
+            # A new primary key needs the table rebuilt: a migration does that
+            if column.name not in existing and not column.primary_key:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                logger.info("Added column %s.%s", table.name, column.name)
+
+def backfill_event_windows(conn):
+    # In one go, for the few rows a seed script writes; migrations backfill in batches
+    changed = event_dates.backfill(conn.connection.cursor())
+    if changed:
+        logger.info("Backfilled starts_at/ends_at of %d events", changed)
+
+def ensure_indexes(conn):
+    # create_all() only creates indexes together with new tables, so indexes
+    # added to existing models have to be created explicitly.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+def ensure_schema(conn, force=False):
+    """Bootstrap the schema unless the database already has this version (see schema.py).
+
+    Returns whether anything was run. Needs the write lock: call it in a
+    write transaction (`engine.begin()` takes it with BEGIN IMMEDIATE).
+    """
+    version = schema_version()
+    if not force and schema.stored_version(conn) == version:
+        return False
+    Base.metadata.create_all(conn)
+    ensure_columns(conn)
+    ensure_indexes(conn)
+    # Before the triggers: a migration may rebuild the tables they are on
+    backfills = migrations.apply(conn)
+    search.ensure_search_index(conn)
+    facets.ensure_facets(conn)
+    # With backfills left, the version is stamped by run_backfills() once they finish
+    if not backfills:
+        schema.stamp(conn, version)
+    logger.info("Schema bootstrapped (version %d)%s", version, f", backfills pending: {backfills}" if backfills else "")
+    return True
+
+_schema_version = None
+
+def schema_version():
+    global _schema_version
+    if _schema_version is None:
+        _schema_version = schema.fingerprint(
+            Base.metadata, engine.dialect, search.SEARCH_DDL, facets.FACET_DDL, migrations.MIGRATIONS_DDL,
+            [migration.name for migration in migrations.MIGRATIONS],
+        )
+    return _schema_version
+
+def make_backfiller():
+    return migrations.Backfiller(
+        DB_PATH,
+        batch_size=int(os.environ.get("MIGRATION_BATCH_SIZE", "500")),
+        pause=float(os.environ.get("MIGRATION_PAUSE_MS", "50")) / 1000,
+    )
+
+async def run_backfills(backfiller, progress=None):
+    """Finish the pending backfills in a thread; stamps the schema version once none is left."""
+    finished = await asyncio.to_thread(backfiller.run, progress)
+    for table in backfiller.changed:
+        response_cache.bump(table)
+    if finished:
+        async with engine.begin() as conn:
+            await conn.run_sync(schema.stamp, schema_version())
+    return finished
+
+# (backfiller, task) while this worker takes part in a migration's backfill
+backfill_job = None
+
 @app.on_event("startup")
 async def on_startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(select(UserModel).where(UserModel.username == "admin@medassoc.com"))
-        if not result.scalars().first():
-            admin = UserModel(
-                username="admin@medassoc.com",
-                full_name="Admin",
-                hashed_password=get_password_hash("admin123")
-            )
-            session.add(admin)
-            await session.commit()
-            logger.info("Admin user created")
+    # A current schema costs one pragma read, without the write lock; the
+    # admin account is created once by scripts/init_db.py, not here
+    async with read_engine.connect() as conn:
+        current = await conn.run_sync(schema.stored_version) == schema_version()
+    if not current:
+        async with engine.begin() as conn:
+            await conn.run_sync(ensure_schema)
+        # Backfills run next to live traffic, in small transactions (see migrations.py)
+        global backfill_job
+        backfiller = make_backfiller()
+        backfill_job = (backfiller, asyncio.create_task(run_backfills(backfiller)))
+
+    if static_manifest is not None:
+        static_manifest.scan()
+    await suggest_index.load()
+    app_metrics.start()
+    db_backups.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    global backfill_job
+    if backfill_job is not None:
+        backfiller, task = backfill_job
+        backfiller.stop()
+        await asyncio.gather(task, return_exceptions=True)
+        backfill_job = None
+    await db_backups.close()
+    await db_writer.close()
+    password_hasher.shutdown()
+    image_pipeline.shutdown()
+    await image_proxy.close()
+    await suggest_index.close()
+    await app_metrics.close()
+    await engine.dispose()
+    await read_engine.dispose()
@@ -0,0 +1,258 @@
+"""Slow-query log with the query plan of every statement shape.
+
+`SlowQueryLog.instrument(engine)` hooks the engine's cursor events:
+
+* every statement is normalized (literals become `?`, `IN (?, ?, ...)`
+  collapses to `IN (...)`, whitespace is squeezed) and, the first time a
+  normalized statement is seen, its `EXPLAIN QUERY PLAN` is captured on the
+  same connection. A plan with a full table scan (`SCAN <table>` without an
+  index) is logged at once, however fast the statement was, so new scans
+  show up before the table is large enough to make them slow;
+* statements slower than `threshold` are recorded with their normalized
+  SQL, the shape of their parameters (types, never values: they include
+  e-mails and password hashes), the duration, the engine and the endpoint
+  that issued them, and appended as one JSON line to the log file.
+
+The endpoint comes from a context variable set by `RequestContextMiddleware`
+and follows the request into the `SerializedWriter` (see storage.py), so
+writes are attributed to the request that submitted them.
+
+The log file is shared by all workers: each entry is appended under an
+flock and the worker that pushes the file past `max_bytes` rotates it
+(`slow_queries.log.1` ... `.N`). `GET /api/admin/slow-queries` returns the
+tail of that file plus this worker's per-statement totals and plans.
+"""
+import fcntl
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# The ASGI scope of the request being served, if any
+current_request: ContextVar[Optional[dict]] = ContextVar("current_request", default=None)
+
+# Statements whose plan is worth capturing
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+# Bounds the per-statement tables if something generates SQL with inlined values
+MAX_STATEMENTS = 5000
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+# "SCAN doctors", but not index scans, virtual tables (FTS) or subquery results
+_FULL_SCAN_RE = re.compile(r"^SCAN (?!CONSTANT ROW|\()(?!.*\b(?:USING|VIRTUAL TABLE)\b)")
+
+
+def normalize(statement: str) -> str:
+    statement = _STRING_RE.sub("?", statement)
+    statement = _NUMBER_RE.sub("?", statement)
+    statement = _IN_LIST_RE.sub("IN (...)", statement)
+    return " ".join(statement.split())
+
+
+def _shape(params: Any) -> str:
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items()) + "}"
+    if isinstance(params, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+    return type(params).__name__
+
+
+def parameter_shape(parameters: Any, executemany: bool) -> str:
+    if executemany:
+        rows = list(parameters)
+        return f"{len(rows)} x {_shape(rows[0])}" if rows else "0 rows"
+    return _shape(parameters) if parameters else "()"
+
+
+def endpoint() -> str:
+    scope = current_request.get()
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    return f"{scope['method']} {route.path if route is not None else scope['path']}"
+
+
+class RequestContextMiddleware:
+    """Pure ASGI middleware exposing the request scope to the query hooks."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_request.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request.reset(token)
+
+
+class SlowQueryLog:
+    def __init__(self, path: str, threshold: float = 0.1, max_bytes: int = 10 * 1024 * 1024,
+                 backups: int = 5, recent: int = 200):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=recent)
+        self._normalized: Dict[str, str] = {}
+        # normalized SQL -> EXPLAIN QUERY PLAN lines
+        self.plans: Dict[str, List[str]] = {}
+        # normalized SQL -> [slow count, total seconds, max seconds]
+        self.totals: Dict[str, List[float]] = {}
+
+    # --- hooks ----------------------------------------------------------
+
+    def instrument(self, engine, name: str) -> None:
+        sync_engine = getattr(engine, "sync_engine", engine)
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            if statement not in self._normalized:
+                self._first_sight(conn, statement, parameters, executemany, name)
+            if context is not None:
+                context._slowlog_started = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, "_slowlog_started", None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold:
+                self._record(name, statement, parameters, executemany, elapsed)
+
+    def _first_sight(self, conn, statement: str, parameters, executemany: bool, engine: str) -> None:
+        if len(self._normalized) >= MAX_STATEMENTS:
+            self._normalized.clear()
+        normalized = self._normalized[statement] = normalize(statement)
+        if normalized in self.plans or len(self.plans) >= MAX_STATEMENTS:
+            return
+        if normalized.split(None, 1)[0].upper() not in EXPLAINABLE:
+            return
+        self.plans[normalized] = plan = self._explain(conn, statement, parameters, executemany)
+        scans = [line for line in plan if _FULL_SCAN_RE.match(line.lstrip())]
+        if scans:
+            self._write({
+                "at": time.time(), "kind": "full_scan", "engine": engine, "endpoint": endpoint(),
+                "sql": normalized, "plan": plan,
+            })
+
+    @staticmethod
+    def _explain(conn, statement: str, parameters, executemany: bool) -> List[str]:
+        if executemany:
+            parameters = next(iter(parameters), ())
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            rows = cursor.fetchall()
+        except Exception as exc:
+            return [f"(no plan: {exc})"]
+        finally:
+            cursor.close()
+        # (id, parent, notused, detail): indent children under their parent
+        depth = {0: -1}
+        lines = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node] + detail)
+        return lines
+
+    def _record(self, engine: str, statement: str, parameters, executemany: bool, elapsed: float) -> None:
+        normalized = self._normalized.get(statement) or normalize(statement)
+        totals = self.totals.get(normalized)
+        if totals is None:
+            if len(self.totals) >= MAX_STATEMENTS:
+                return
+            totals = self.totals[normalized] = [0, 0.0, 0.0]
+        totals[0] += 1
+        totals[1] += elapsed
+        totals[2] = max(totals[2], elapsed)
+        entry = {
+            "at": time.time(),
+            "kind": "slow",
+            "engine": engine,
+            "endpoint": endpoint(),
+            "duration_ms": round(elapsed * 1000, 3),
+            "sql": normalized,
+            "params": parameter_shape(parameters, executemany),
+        }
+        self.recent.append(entry)
+        self._write(entry)
+
+    # --- shared log file ------------------------------------------------
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        try:
+            with open(self.path, "a") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                fh.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                fh.flush()
+                if fh.tell() >= self.max_bytes:
+                    self._rotate()
+        except OSError:
+            logger.exception("Could not write the slow-query log %s", self.path)
+
+    def _rotate(self) -> None:
+        for i in range(self.backups - 1, 0, -1):
+            try:
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            except FileNotFoundError:
+                pass
+        os.replace(self.path, f"{self.path}.1")
+
+    def tail(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """The last `limit` entries of the current log file, from every worker."""
+        try:
+            with open(self.path, "rb") as fh:
+                fh.seek(0, os.SEEK_END)
+                fh.seek(max(0, fh.tell() - 512 * 1024))
+                lines = fh.read().splitlines()[-limit:]
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # the first line of the window may be cut
+        return entries
+
+    def report(self, limit: int = 100) -> Dict[str, Any]:
+        top: List[Tuple[str, List[float]]] = sorted(self.totals.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "log_file": self.path,
+            "entries": self.tail(limit),
+            "worker": {
+                "pid": os.getpid(),
+                "statements_seen": len(self.plans),
+                "top": [
+                    {
+                        "sql": sql,
+                        "count": int(count),
+                        "total_ms": round(total * 1000, 3),
+                        "max_ms": round(worst * 1000, 3),
+                        "plan": self.plans.get(sql),
+                    }
+                    for sql, (count, total, worst) in top[:limit]
+                ],
+                "full_scans": {
+                    sql: plan for sql, plan in self.plans.items()
+                    if any(_FULL_SCAN_RE.match(line.lstrip()) for line in plan)
+                },
+            },
+        }
@@ -0,0 +1,189 @@
+"""Manifest-backed serving of the React build (frontend/build).
+
+The single-container deployment serves the SPA from FastAPI, so every page
+view goes through here. `StaticManifest.scan()` walks the build directory
+once at startup and records, per file, its media type, a content ETag, its
+Cache-Control policy and its precompressed siblings:
+
+    static/js/main.3f2a1b9c.js         the original
+    static/js/main.3f2a1b9c.js.br      brotli, if the `brotli` module is installed
+    static/js/main.3f2a1b9c.js.gz      gzip
+
+Siblings are (re)generated when missing or older than their source, and kept
+only when they are actually smaller. Requests are then answered from the
+manifest alone: no per-request stat() or path resolution, the encoding is
+picked from Accept-Encoding, and If-None-Match gets a 304.
+
+Files with a content hash in their name (everything CRA emits under
+static/) never change, so they are served as immutable. Everything else,
+index.html in particular, is revalidated on each use; index.html and its
+compressed forms are held in memory.
+
+The manifest is built once per process: restart the app after rebuilding
+the frontend. `python backend/static_assets.py <build dir>` precompresses a
+build ahead of time (e.g. in the Docker image) so startup only scans.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import re
+import sys
+import tempfile
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from starlette.responses import FileResponse, Response
+
+import cache
+from http_encoding import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Below this, compression saves less than the headers cost
+MIN_COMPRESS_BYTES = 1024
+
+# CRA output names: main.3f2a1b9c.js, 787.1e2f3a4b.chunk.css, logo.9b8c7d6e.svg
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{8,}\.(?:chunk\.)?[A-Za-z0-9]+$")
+
+EXTRA_TYPES = {".map": "application/json", ".webmanifest": "application/manifest+json"}
+COMPRESSIBLE_TYPES = {
+    "application/javascript", "application/json", "application/manifest+json", "application/xml",
+    "image/svg+xml", "image/x-icon", "image/vnd.microsoft.icon",
+}
+
+# Preference order when the client accepts several
+ENCODINGS = (("br", ".br"), ("gzip", ".gz")) if brotli is not None else (("gzip", ".gz"),)
+ENCODED_SUFFIXES = {".br", ".gz"}
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class Variant(NamedTuple):
+    path: str
+    etag: str
+    stat: os.stat_result
+    body: Optional[bytes]  # in memory (index.html), else served from `path`
+
+
+class Asset(NamedTuple):
+    media_type: str
+    cache_control: str
+    # "identity" plus whichever encodings are worth serving
+    variants: Dict[str, Variant]
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Tuple[str, Variant]:
+        if len(self.variants) > 1:
+            accepted = accepted_encodings(accept_encoding)
+            for encoding, _ in ENCODINGS:
+                if encoding in self.variants and encoding in accepted:
+                    return encoding, self.variants[encoding]
+        return "identity", self.variants["identity"]
+
+    def response(self, request) -> Response:
+        encoding, variant = self.negotiate(request.headers.get("accept-encoding"))
+        headers = {"ETag": variant.etag, "Cache-Control": self.cache_control}
+        if len(self.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if cache.etag_matches(request.headers.get("if-none-match"), variant.etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if variant.body is not None:
+            return Response(variant.body, media_type=self.media_type, headers=headers)
+        return FileResponse(variant.path, media_type=self.media_type, headers=headers, stat_result=variant.stat)
+
+
+class StaticManifest:
+    def __init__(self, build_dir: str, index: str = "index.html", precompress: bool = True):
+        self.build_dir = os.path.abspath(build_dir)
+        self.index_name = index
+        self.precompress = precompress
+        self.assets: Dict[str, Asset] = {}
+        self.index: Optional[Asset] = None
+        self.compressed = 0
+
+    @staticmethod
+    def media_type(path: str) -> str:
+        ext = os.path.splitext(path)[1].lower()
+        return EXTRA_TYPES.get(ext) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    @staticmethod
+    def compressible(media_type: str) -> bool:
+        return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+    def _sibling(self, path: str, suffix: str, encoding: str, data: bytes, source: os.stat_result) -> Optional[str]:
+        """Path of an up-to-date compressed copy of `path`, or None if it does not pay off."""
+        sibling = path + suffix
+        try:
+            st = os.stat(sibling)
+            if st.st_mtime_ns >= source.st_mtime_ns:
+                return sibling if st.st_size < source.st_size else None
+        except FileNotFoundError:
+            pass
+        encoded = _compress(data, encoding)
+        # Several workers may scan at once: write a temp file and rename it
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+            f.write(encoded)
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, sibling)
+        self.compressed += 1
+        return sibling if len(encoded) < source.st_size else None
+
+    def _asset(self, path: str, rel: str, in_memory: bool) -> Asset:
+        media_type = self.media_type(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        st = os.stat(path)
+        etag = cache.make_etag(data)
+        variants = {"identity": Variant(path, etag, st, data if in_memory else None)}
+        if self.compressible(media_type) and st.st_size >= MIN_COMPRESS_BYTES:
+            for encoding, suffix in ENCODINGS:
+                if in_memory:
+                    encoded = _compress(data, encoding)
+                    if len(encoded) < len(data):
+                        variants[encoding] = Variant(path, f'{etag[:-1]}-{encoding}"', st, encoded)
+                elif self.precompress:
+                    sibling = self._sibling(path, suffix, encoding, data, st)
+                    if sibling is not None:
+                        variants[encoding] = Variant(sibling, f'{etag[:-1]}-{encoding}"', os.stat(sibling), None)
+        cache_control = IMMUTABLE if HASHED_NAME_RE.search(rel) else REVALIDATE
+        return Asset(media_type, cache_control, variants)
+
+    def scan(self) -> "StaticManifest":
+        assets = {}
+        for root, _, files in os.walk(self.build_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                base, ext = os.path.splitext(path)
+                # Compressed siblings are variants of their source, not assets
+                if ext in ENCODED_SUFFIXES and os.path.exists(base) or name.endswith(".tmp"):
+                    continue
+                rel = os.path.relpath(path, self.build_dir).replace(os.sep, "/")
+                assets[rel] = self._asset(path, rel, in_memory=rel == self.index_name)
+        self.assets = assets
+        self.index = assets.get(self.index_name)
+        logger.info("Static manifest: %d files from %s (%d compressed copies written)",
+                    len(assets), self.build_dir, self.compressed)
+        return self
+
+    def lookup(self, path: str) -> Optional[Asset]:
+        return self.assets.get(path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 2:
+        sys.exit("usage: python backend/static_assets.py <build dir>")
+    StaticManifest(sys.argv[1]).scan()
@@ -0,0 +1,185 @@
+"""In-memory typeahead index for the doctor directory.
+
+`GET /api/doctors/suggest?field=city&prefix=bel` must answer as the user
+types, and "Belem" has to find "Belém". Each suggestable field gets a
+`PrefixIndex`: a sorted Python list of `folded + "\\0" + original` strings,
+where `folded` is the accent- and case-folded value (names also lose a
+leading "Dr."/"Dra."). A prefix query is a `bisect` to the first key
+starting with the folded prefix plus a walk of at most `limit` entries, so
+a lookup is O(log n + limit): a few microseconds at 1M entries. Results
+come back in folded alphabetical order.
+
+Memory budget: one str per distinct value (49 bytes of header plus the
+folded and original text) and an 8-byte list slot, about 140 bytes for a
+typical name; repeated values only add a counter entry. With the default
+fields that is roughly 140 MB per worker for 1M doctors with distinct
+names (see scripts/bench_suggest.py), and a few KB for cities and
+specialties. `SUGGEST_FIELDS` can drop `name` where that is too much.
+
+Writes made by this process are applied immediately (`add` / `remove`),
+and `note_local_write` records the version they bumped the table to, so
+they do not also trigger a rebuild. Writes from other workers, the bulk
+import or the seed scripts show up as a new `doctors` data version (see
+cache.py); the next lookup then schedules
+a rebuild in a thread (about 7 s of CPU at 1M names) and keeps answering
+from the current index until the new one is swapped in.
+"""
+import asyncio
+import bisect
+import logging
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from search import fold
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_FIELDS = ("name", "city", "specialty")
+
+_HONORIFIC_RE = re.compile(r"^(?:dra?|prof[a]?)\.?\s+")
+
+
+def _fold_key(field: str, value: str) -> str:
+    # ASCII needs no accent stripping; most names and every prefix typed without accents
+    folded = " ".join((value.casefold() if value.isascii() else fold(value)).split())
+    if field == "name" and folded[:1] in ("d", "p"):
+        folded = _HONORIFIC_RE.sub("", folded)
+    return folded
+
+
+class PrefixIndex:
+    """Sorted keys with multiplicities; see the module docstring for the layout."""
+
+    __slots__ = ("field", "keys", "counts")
+
+    def __init__(self, field: str, values: Iterable[str] = ()):
+        self.field = field
+        counts: Dict[str, int] = {}
+        memo: Dict[str, str] = {}
+        for value in values:
+            if not value:
+                continue
+            key = memo.get(value)
+            if key is None:
+                key = memo[value] = f"{_fold_key(field, value)}\0{value}"
+            counts[key] = counts.get(key, 0) + 1
+        self.keys: List[str] = sorted(counts)
+        # Only repeated values take a counter; a key missing here counts once
+        self.counts: Dict[str, int] = {key: n for key, n in counts.items() if n > 1}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, value: Optional[str]) -> None:
+        if not value:
+            return
+        key = f"{_fold_key(self.field, value)}\0{value}"
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            self.counts[key] = self.counts.get(key, 1) + 1
+        else:
+            self.keys.insert(i, key)
+
+    def remove(self, value: Optional[str]) -> None:
+        if not value:
+            return
+        key = f"{_fold_key(self.field, value)}\0{value}"
+        i = bisect.bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return
+        count = self.counts.get(key, 1)
+        if count > 2:
+            self.counts[key] = count - 1
+        elif count == 2:
+            del self.counts[key]
+        else:
+            del self.keys[i]
+
+    def search(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        folded = _fold_key(self.field, prefix)
+        if not folded:
+            return []
+        keys = self.keys
+        results = []
+        i = bisect.bisect_left(keys, folded)
+        while i < len(keys) and len(results) < limit and keys[i].startswith(folded):
+            key = keys[i]
+            results.append((key[key.index("\0") + 1:], self.counts.get(key, 1)))
+            i += 1
+        return results
+
+
+class SuggestIndex:
+    def __init__(self, db_path: str, versions, fields: Sequence[str] = SUGGEST_FIELDS, table: str = "doctors"):
+        unknown = set(fields) - set(SUGGEST_FIELDS)
+        if unknown:
+            raise ValueError(f"Unsupported suggest fields {sorted(unknown)}; expected some of {SUGGEST_FIELDS}")
+        self.db_path = db_path
+        self.versions = versions
+        self.fields = tuple(fields)
+        self.table = table
+        self.indexes: Dict[str, PrefixIndex] = {field: PrefixIndex(field) for field in self.fields}
+        self.version: Optional[int] = None
+        self._rebuild: Optional[asyncio.Task] = None
+        self.rebuilds = 0
+
+    def _build(self) -> Tuple[int, Dict[str, PrefixIndex]]:
+        # Read the version first: a write during the scan forces another rebuild
+        version = self.versions.current(self.table)
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(f"SELECT {', '.join(self.fields)} FROM {self.table}").fetchall()
+        finally:
+            conn.close()
+        indexes = {field: PrefixIndex(field, (row[i] for row in rows)) for i, field in enumerate(self.fields)}
+        return version, indexes
+
+    async def load(self) -> None:
+        version, indexes = await run_in_threadpool(self._build)
+        self.indexes, self.version = indexes, version
+        self.rebuilds += 1
+        logger.info("Suggest index: %s", ", ".join(f"{f}={len(i)}" for f, i in indexes.items()))
+
+    def refresh_if_stale(self) -> None:
+        """Schedule a background rebuild if another writer changed the table."""
+        if self.version == self.versions.current(self.table):
+            return
+        if self._rebuild is None or self._rebuild.done():
+            self._rebuild = asyncio.get_running_loop().create_task(self._safe_load())
+
+    async def _safe_load(self) -> None:
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Could not rebuild the suggest index")
+
+    def suggest(self, field: str, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        self.refresh_if_stale()
+        index = self.indexes.get(field)
+        return index.search(prefix, limit) if index is not None else []
+
+    def add(self, row: Dict[str, Optional[str]]) -> None:
+        for field, index in self.indexes.items():
+            index.add(row.get(field))
+
+    def remove(self, row: Dict[str, Optional[str]]) -> None:
+        for field, index in self.indexes.items():
+            index.remove(row.get(field))
+
+    def note_local_write(self, previous: int, version: int) -> None:
+        """Take `version` as current after this process applied its own write with add/remove.
+
+        `previous` is the table's version read just before the write's bump:
+        if the index was not current then, other writers' changes are still
+        missing and the rebuild has to happen anyway.
+        """
+        if self.version == previous:
+            self.version = version
+
+    async def close(self) -> None:
+        if self._rebuild is not None:
+            self._rebuild.cancel()
+            self._rebuild = None
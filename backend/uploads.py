@@ -0,0 +1,185 @@
+"""Streaming, size-limited, content-addressed file uploads.
+
+`receive_upload` parses the multipart request body as it arrives instead of
+letting the framework spool the whole thing first. Part data is hashed and
+written to a temporary file in a worker thread, so the event loop never
+blocks on disk, and the size limit is enforced while streaming: an
+oversized upload is cut off as soon as it crosses the limit.
+
+Files are stored as `<sha256><ext>`. Uploading identical bytes twice
+resolves to the same name, so the second upload just discards its
+temporary copy and reuses the existing file.
+"""
+import hashlib
+import os
+import tempfile
+from typing import Iterable, NamedTuple, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+try:
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Room for boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Spellings of the same format share one content-addressed name
+CANONICAL_EXTENSIONS = {".jpeg": ".jpg"}
+
+
+class UploadRejected(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class StoredUpload(NamedTuple):
+    filename: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+def too_large_message(max_bytes: int) -> str:
+    if max_bytes >= 1024 * 1024:
+        return f"File too large. Maximum size is {max_bytes / (1024 * 1024):g} MB."
+    return f"File too large. Maximum size is {max_bytes / 1024:g} KB."
+
+
+class _FilePart:
+    """Multipart parser callbacks that collect the data of one file field."""
+
+    def __init__(self, field: str, allowed_extensions: Iterable[str], max_bytes: int):
+        self.field = field.encode()
+        self.allowed_extensions = set(allowed_extensions)
+        self.max_bytes = max_bytes
+        self.extension: Optional[str] = None
+        self.capturing = False
+        self.done = False
+        self.size = 0
+        self.pending = []
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._disposition = b""
+
+    def on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if self.done or options.get(b"name") != self.field:
+            return
+        filename = options.get(b"filename", b"").decode("utf-8", "replace")
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in self.allowed_extensions:
+            allowed = sorted({CANONICAL_EXTENSIONS.get(e, e).lstrip(".").upper() for e in self.allowed_extensions})
+            raise UploadRejected(400, f"Invalid file type. Allowed: {', '.join(allowed)}.")
+        self.extension = CANONICAL_EXTENSIONS.get(ext, ext)
+        self.capturing = True
+
+    def on_part_data(self, data, start, end):
+        if not self.capturing:
+            return
+        self.size += end - start
+        if self.size > self.max_bytes:
+            raise UploadRejected(413, too_large_message(self.max_bytes))
+        self.pending.append(data[start:end])
+
+    def on_part_end(self):
+        if self.capturing:
+            self.capturing = False
+            self.done = True
+
+
+def _write(handle, digest, chunk: bytes) -> None:
+    # hashlib releases the GIL for large buffers, so this runs in parallel too
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+def _commit(tmp_path: str, final_path: str) -> bool:
+    """Move the upload into place; True if an identical file already existed."""
+    if os.path.exists(final_path):
+        os.unlink(tmp_path)
+        return True
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, final_path)
+    return False
+
+
+async def receive_upload(request, field: str, upload_dir: str, max_bytes: int,
+                         allowed_extensions: Iterable[str]) -> StoredUpload:
+    """Stream the `field` file of a multipart request into `upload_dir`."""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadRejected(400, "Expected a multipart/form-data upload.")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + MULTIPART_OVERHEAD:
+        raise UploadRejected(413, too_large_message(max_bytes))
+
+    part = _FilePart(field, allowed_extensions, max_bytes)
+    parser = MultipartParser(params[b"boundary"], part.callbacks())
+    digest = hashlib.sha256()
+    # Same directory as the final file, so the rename is atomic
+    handle = await run_in_threadpool(
+        tempfile.NamedTemporaryFile, dir=upload_dir, prefix=".upload-", delete=False
+    )
+    try:
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if part.pending:
+                    data = b"".join(part.pending)
+                    part.pending.clear()
+                    await run_in_threadpool(_write, handle, digest, data)
+                if part.done:
+                    break
+            else:
+                parser.finalize()
+        # The client's fault, not ours: a 400 rather than a 500
+        except MultipartParseError as exc:
+            raise UploadRejected(400, f"Malformed multipart body: {exc}")
+        except ClientDisconnect:
+            raise UploadRejected(400, "The client disconnected during the upload.")
+        finally:
+            await run_in_threadpool(handle.close)
+        if part.extension is None or not part.done:
+            raise UploadRejected(400, f"No '{field}' file in the upload.")
+
+        sha256 = digest.hexdigest()
+        filename = f"{sha256}{part.extension}"
+        deduplicated = await run_in_threadpool(_commit, handle.name, os.path.join(upload_dir, filename))
+        return StoredUpload(filename, sha256, part.size, deduplicated)
+    except BaseException:
+        if os.path.exists(handle.name):
+            os.unlink(handle.name)
+        raise
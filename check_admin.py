@@ -10,7 +10,7 @@ sys.path.append('/app/backend')
 
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy import select
-from server import UserModel, get_password_hash, verify_password
+from server import UserModel, password_hasher
 
 async def check_admin():
     # Database setup
@@ -33,7 +33,7 @@ async def check_admin():
             
             # Test password verification
             test_password = "admin123"
-            if verify_password(test_password, admin_user.hashed_password):
+            if await password_hasher.verify(test_password, admin_user.hashed_password):
                 print(f"✅ Password verification successful")
             else:
                 print(f"❌ Password verification failed")
@@ -46,7 +46,7 @@ async def check_admin():
             admin = UserModel(
                 username="admin@medassoc.com",
                 full_name="Admin",
-                hashed_password=get_password_hash("admin123")
+                hashed_password=await password_hasher.hash("admin123")
             )
             session.add(admin)
             await session.commit()
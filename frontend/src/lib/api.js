@@ -0,0 +1,9 @@
+import axios from "axios";
+
+// List endpoints answer one page at a time and put the cursor of the next
+// page in the X-Next-Cursor header. Filters go to the server with each page;
+// `next` is undefined on the last page.
+export async function getPage(url, params = {}, cursor) {
+  const response = await axios.get(url, { params: cursor ? { ...params, cursor } : params });
+  return { items: response.data, next: response.headers["x-next-cursor"] };
+}
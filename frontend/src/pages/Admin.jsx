@@ -1,8 +1,9 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import { useNavigate } from "react-router-dom";
 import { toast } from "sonner";
-import { Plus, Trash2, Edit2, LogOut, Upload, Link as LinkIcon, Image as ImageIcon, Calendar, User, MapPin, Clock, FileText, AlertCircle } from "lucide-react";
+import { getPage } from "@/lib/api";
+import { Plus, Trash2, Edit2, LogOut, Search, Upload, Link as LinkIcon, Image as ImageIcon, Calendar, User, MapPin, Clock, FileText, AlertCircle } from "lucide-react";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
@@ -10,6 +11,13 @@ export default function Admin() {
   const [activeTab, setActiveTab] = useState("doctors"); // 'doctors' | 'events'
   const [loading, setLoading] = useState(true);
   const [items, setItems] = useState([]);
+  const [nextCursor, setNextCursor] = useState();
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Doctors only: sent to the server as `q`
+  const [search, setSearch] = useState("");
+  // The search of the list on screen: further pages and reloads use the same one
+  const shownSearch = useRef("");
+  const latestRequest = useRef(0);
   const [showModal, setShowModal] = useState(false);
   const [editingItem, setEditingItem] = useState(null);
   const navigate = useNavigate();
@@ -29,22 +37,36 @@ export default function Admin() {
       navigate("/login");
       return;
     }
-    fetchItems();
+    setSearch("");
+    fetchItems(undefined, "");
   }, [token, navigate, activeTab]);
 
-  const fetchItems = async () => {
-    setLoading(true);
+  const fetchItems = async (cursor, q = shownSearch.current) => {
+    const request = ++latestRequest.current;
+    if (cursor) setLoadingMore(true);
+    else setLoading(true);
     try {
       const endpoint = activeTab === "doctors" ? "/api/doctors" : "/api/events";
-      const response = await axios.get(`${BACKEND_URL}${endpoint}`);
-      setItems(response.data);
+      const page = await getPage(`${BACKEND_URL}${endpoint}`, q ? { q } : {}, cursor);
+      if (request !== latestRequest.current) return; // another tab or search replaced this one
+      shownSearch.current = q;
+      setItems((shown) => (cursor ? [...shown, ...page.items] : page.items));
+      setNextCursor(page.next);
     } catch (error) {
       toast.error(`Falha ao buscar ${activeTab === "doctors" ? "médicos" : "eventos"}`);
     } finally {
-      setLoading(false);
+      if (request === latestRequest.current) {
+        setLoading(false);
+        setLoadingMore(false);
+      }
     }
   };
 
+  const handleSearch = (e) => {
+    e.preventDefault();
+    fetchItems(undefined, search.trim());
+  };
+
   const handleLogout = () => {
     localStorage.removeItem("token");
     navigate("/login");
@@ -184,6 +206,19 @@ export default function Admin() {
         </div>
       </div>
 
+      {activeTab === "doctors" && (
+        <form onSubmit={handleSearch} className="relative mb-6 max-w-md">
+          <Search className="absolute left-3 top-1/2 -translate-y-1/2 w-4 h-4 text-stone-400 pointer-events-none" />
+          <input
+            type="text"
+            placeholder="Buscar por nome, cidade ou especialidade"
+            className="w-full pl-9 pr-4 py-2 bg-white border border-stone-200 rounded-full outline-none focus:ring-2 focus:ring-primary/20"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+          />
+        </form>
+      )}
+
       <div className="bg-white border border-stone-100 rounded-2xl shadow-sm overflow-hidden">
         <div className="overflow-x-auto">
           <table className="w-full text-left">
@@ -264,6 +299,17 @@ export default function Admin() {
             </tbody>
           </table>
         </div>
+        {nextCursor && !loading && (
+          <div className="border-t border-stone-100 p-4 text-center">
+            <button
+              onClick={() => fetchItems(nextCursor)}
+              disabled={loadingMore}
+              className="text-primary font-medium hover:underline disabled:opacity-60"
+            >
+              {loadingMore ? "Carregando..." : "Carregar mais"}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Modal */}
@@ -1,28 +1,39 @@
-import { useState, useEffect } from "react";
-import axios from "axios";
+import { useState, useEffect, useRef } from "react";
 import { Search, MapPin, Stethoscope, Phone, MessageCircle } from "lucide-react";
 import { toast } from "sonner";
+import { getPage } from "@/lib/api";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
 export default function Directory() {
   const [doctors, setDoctors] = useState([]);
+  const [query, setQuery] = useState("");
   const [cityFilter, setCityFilter] = useState("");
+  const [nextCursor, setNextCursor] = useState();
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Filters of the list on screen: the next page is asked for with the same ones
+  const shownFilters = useRef({});
+  const latestRequest = useRef(0);
 
-  const fetchDoctors = async (city = "") => {
-    setLoading(true);
+  const fetchDoctors = async (params = {}, cursor) => {
+    const request = ++latestRequest.current;
+    if (cursor) setLoadingMore(true);
+    else setLoading(true);
     try {
-      const params = {};
-      if (city) params.city = city;
-      
-      const response = await axios.get(`${BACKEND_URL}/api/doctors`, { params });
-      setDoctors(response.data);
+      const page = await getPage(`${BACKEND_URL}/api/doctors`, params, cursor);
+      if (request !== latestRequest.current) return; // a newer search replaced this one
+      shownFilters.current = params;
+      setDoctors((shown) => (cursor ? [...shown, ...page.items] : page.items));
+      setNextCursor(page.next);
     } catch (error) {
       console.error("Error fetching doctors:", error);
       toast.error("Erro ao carregar diretório");
     } finally {
-      setLoading(false);
+      if (request === latestRequest.current) {
+        setLoading(false);
+        setLoadingMore(false);
+      }
     }
   };
 
@@ -32,7 +43,16 @@ export default function Directory() {
 
   const handleSearch = (e) => {
     e.preventDefault();
-    fetchDoctors(cityFilter);
+    const params = {};
+    if (query.trim()) params.q = query.trim();
+    if (cityFilter.trim()) params.city = cityFilter.trim();
+    fetchDoctors(params);
+  };
+
+  const clearFilters = () => {
+    setQuery("");
+    setCityFilter("");
+    fetchDoctors();
   };
 
   return (
@@ -46,21 +66,36 @@ export default function Directory() {
 
       {/* Search Bar */}
       <div className="max-w-2xl mx-auto mb-16">
-        <form onSubmit={handleSearch} className="relative group">
-          <div className="absolute inset-y-0 left-0 pl-4 flex items-center pointer-events-none">
-            <Search className="h-5 w-5 text-stone-400 group-focus-within:text-primary transition-colors" />
+        <form onSubmit={handleSearch} className="flex flex-col md:flex-row gap-3">
+          <div className="relative group flex-grow">
+            <div className="absolute inset-y-0 left-0 pl-4 flex items-center pointer-events-none">
+              <Search className="h-5 w-5 text-stone-400 group-focus-within:text-primary transition-colors" />
+            </div>
+            <input
+              type="text"
+              placeholder="Nome ou especialidade"
+              className="block w-full pl-12 pr-4 py-4 bg-white border border-stone-200 rounded-full text-lg shadow-sm focus:ring-2 focus:ring-primary/20 focus:border-primary transition-all placeholder:text-stone-400"
+              value={query}
+              onChange={(e) => setQuery(e.target.value)}
+              data-testid="doctor-search-input"
+            />
+          </div>
+          <div className="relative group md:w-56">
+            <div className="absolute inset-y-0 left-0 pl-4 flex items-center pointer-events-none">
+              <MapPin className="h-5 w-5 text-stone-400 group-focus-within:text-primary transition-colors" />
+            </div>
+            <input
+              type="text"
+              placeholder="Cidade (ex: Belém)"
+              className="block w-full pl-12 pr-4 py-4 bg-white border border-stone-200 rounded-full text-lg shadow-sm focus:ring-2 focus:ring-primary/20 focus:border-primary transition-all placeholder:text-stone-400"
+              value={cityFilter}
+              onChange={(e) => setCityFilter(e.target.value)}
+              data-testid="city-search-input"
+            />
           </div>
-          <input
-            type="text"
-            placeholder="Buscar por cidade (ex: Belém)"
-            className="block w-full pl-12 pr-32 py-4 bg-white border border-stone-200 rounded-full text-lg shadow-sm focus:ring-2 focus:ring-primary/20 focus:border-primary transition-all placeholder:text-stone-400"
-            value={cityFilter}
-            onChange={(e) => setCityFilter(e.target.value)}
-            data-testid="city-search-input"
-          />
           <button 
             type="submit"
-            className="absolute right-2 top-2 bottom-2 bg-primary text-white px-6 rounded-full font-medium hover:bg-primary-800 transition-colors"
+            className="bg-primary text-white px-6 py-4 rounded-full font-medium hover:bg-primary-800 transition-colors"
             data-testid="search-button"
           >
             Buscar
@@ -79,18 +114,32 @@ export default function Directory() {
         <div className="text-center py-20 bg-stone-50 rounded-3xl border border-stone-100">
           <p className="text-stone-500 text-lg">Nenhum médico encontrado com estes critérios.</p>
           <button 
-            onClick={() => {setCityFilter(""); fetchDoctors("");}}
+            onClick={clearFilters}
             className="mt-4 text-primary font-medium hover:underline"
           >
             Limpar filtros
           </button>
         </div>
       ) : (
-        <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8">
-          {doctors.map((doctor) => (
-            <DoctorCard key={doctor.id} doctor={doctor} />
-          ))}
-        </div>
+        <>
+          <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8">
+            {doctors.map((doctor) => (
+              <DoctorCard key={doctor.id} doctor={doctor} />
+            ))}
+          </div>
+          {nextCursor && (
+            <div className="text-center mt-12">
+              <button
+                onClick={() => fetchDoctors(shownFilters.current, nextCursor)}
+                disabled={loadingMore}
+                className="bg-stone-100 text-primary px-8 py-3 rounded-full font-medium hover:bg-stone-200 transition-colors disabled:opacity-60"
+                data-testid="load-more-button"
+              >
+                {loadingMore ? "Carregando..." : "Carregar mais"}
+              </button>
+            </div>
+          )}
+        </>
       )}
     </div>
   );
@@ -100,6 +149,10 @@ function DoctorCard({ doctor }) {
   // Extract only numbers from contact info for WhatsApp link
   const cleanPhone = doctor.contact_info?.replace(/\D/g, "");
   const hasValidPhone = cleanPhone && cleanPhone.length >= 10; // Basic validation
+  // Resized variants of uploaded photos, e.g. { "320w": "/uploads/...-320w.webp" }
+  const srcSet = doctor.image_srcset
+    ? Object.entries(doctor.image_srcset).map(([width, url]) => `${url} ${width}`).join(", ")
+    : undefined;
 
   return (
     <div className="group bg-white border border-stone-100 rounded-3xl p-4 shadow-sm hover:shadow-xl hover:-translate-y-1 transition-all duration-300 flex flex-col h-full" data-testid={`doctor-card-${doctor.id}`}>
@@ -107,7 +160,10 @@ function DoctorCard({ doctor }) {
       <div className="relative aspect-[4/3] rounded-2xl overflow-hidden mb-5 bg-stone-100">
         {doctor.image_url ? (
           <img 
-            src={doctor.image_url} 
+            src={doctor.image_proxy_url || doctor.image_url} 
+            srcSet={srcSet}
+            sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+            loading="lazy"
             alt={doctor.name}
             className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
           />
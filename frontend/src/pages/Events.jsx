@@ -1,29 +1,39 @@
 import { Calendar, MapPin, Clock, ArrowRight } from "lucide-react";
 import { useEffect, useState } from "react";
-import axios from "axios";
 import { toast } from "sonner";
+import { getPage } from "@/lib/api";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
 export default function Events() {
   const [events, setEvents] = useState([]);
+  const [nextCursor, setNextCursor] = useState();
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const fetchEvents = async (cursor) => {
+    try {
+      const page = await getPage(`${BACKEND_URL}/api/events`, {}, cursor);
+      setEvents((shown) => (cursor ? [...shown, ...page.items] : page.items));
+      setNextCursor(page.next);
+    } catch (error) {
+      console.error("Error fetching events", error);
+      toast.error("Erro ao carregar eventos");
+    } finally {
+      setLoading(false);
+      setLoadingMore(false);
+    }
+  };
 
   useEffect(() => {
-    const fetchEvents = async () => {
-      try {
-        const response = await axios.get(`${BACKEND_URL}/api/events`);
-        setEvents(response.data);
-      } catch (error) {
-        console.error("Error fetching events", error);
-        toast.error("Erro ao carregar eventos");
-      } finally {
-        setLoading(false);
-      }
-    };
     fetchEvents();
   }, []);
 
+  const loadMore = () => {
+    setLoadingMore(true);
+    fetchEvents(nextCursor);
+  };
+
   return (
     <div className="max-w-7xl mx-auto space-y-16">
       {/* Header */}
@@ -55,6 +65,19 @@ export default function Events() {
           ))
         )}
       </div>
+
+      {!loading && nextCursor && (
+        <div className="text-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="bg-stone-100 text-primary px-8 py-3 rounded-full font-medium hover:bg-stone-200 transition-colors disabled:opacity-60"
+            data-testid="load-more-button"
+          >
+            {loadingMore ? "Carregando..." : "Carregar mais"}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -75,7 +98,7 @@ function EventCard({ event }) {
       {/* Image */}
       <div className="md:w-2/5 relative overflow-hidden h-48 md:h-auto bg-stone-200">
         <img 
-          src={event.image_url} 
+          src={event.image_proxy_url || event.image_url} 
           alt={event.title} 
           className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-700"
           onError={(e) => e.target.style.display = 'none'} 
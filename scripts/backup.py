@@ -0,0 +1,75 @@
+"""Take, list and restore online snapshots of the database.
+
+Snapshots are taken with SQLite's backup API while the site keeps running
+(see backend/backups.py) and go to BACKUP_DIR (default backend/backups),
+keeping the newest BACKUP_KEEP. Restoring replaces the database with a
+snapshot: stop the app first. By default the current database is
+snapshotted before it is overwritten, so a restore can be undone.
+
+    python scripts/backup.py create
+    python scripts/backup.py list
+    python scripts/backup.py restore medassoc-20240101T030000Z.db.gz
+
+Cron, e.g. nightly (or set BACKUP_INTERVAL_HOURS and let the app do it):
+
+    0 3 * * *  cd /app && python scripts/backup.py create
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="take a snapshot now and prune old ones")
+    create.add_argument("--no-compress", action="store_true", help="keep the snapshot as a plain .db file")
+    create.add_argument("--keep", type=int, default=None, help="snapshots to keep (default BACKUP_KEEP or 7)")
+    commands.add_parser("list", help="list snapshots, newest first")
+    restore = commands.add_parser("restore", help="replace the database with a snapshot (stop the app first)")
+    restore.add_argument("snapshot", help="file name in the backup directory, or a path")
+    restore.add_argument("--no-safety-copy", action="store_true",
+                         help="do not snapshot the current database before overwriting it")
+    args = parser.parse_args()
+
+    import backups
+    import server
+
+    manager = server.db_backups
+    if args.command == "list":
+        for snapshot in manager.list():
+            print(f"{Path(snapshot.path).name:<40} {snapshot.size / 1e6:10.1f} MB")
+        return
+
+    if args.command == "create":
+        if args.no_compress:
+            manager.compress = False
+        if args.keep is not None:
+            manager.keep = max(1, args.keep)
+        try:
+            snapshot = manager.snapshot()
+        except backups.BackupBusy as e:
+            sys.exit(f"{e}; try again later")
+        print(f"Created {snapshot.path} ({snapshot.size / 1e6:.1f} MB)")
+        return
+
+    path = Path(args.snapshot)
+    if not path.is_file():
+        try:
+            path = Path(manager.find(args.snapshot).path)
+        except FileNotFoundError as e:
+            sys.exit(str(e))
+    if not args.no_safety_copy and Path(server.DB_PATH).exists():
+        # One more than usual, so the snapshot being restored is not pruned by this one
+        manager.keep += 1
+        print(f"Current database saved to {manager.snapshot().path}")
+    started = time.perf_counter()
+    backups.restore(str(path), server.DB_PATH)
+    print(f"Restored {server.DB_PATH} from {path} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Benchmark: online backups while writers keep committing.
+
+Builds a database with scripts/generate_dataset.py, then starts --writers
+processes that each commit --rate small write transactions per second, the
+way the app's writer does (BEGIN IMMEDIATE with the pragmas of storage.py).
+Each transaction appends a row with a 1 KB payload to a ledger table and
+bumps a counter row. After a baseline of --duration seconds it takes
+--snapshots snapshots back to back with backups.BackupManager, then runs
+the writers for another --duration seconds.
+
+Reports the writers' commit latency before, during and after the backups,
+each snapshot's duration and size, and checks every snapshot: it must pass
+`PRAGMA integrity_check` and have exactly as many ledger rows as the
+counter says (a torn copy would not). The newest one is also restored
+into a scratch file with backups.restore and checked again.
+
+    python scripts/bench_backup.py
+    python scripts/bench_backup.py --doctors 500000 --writers 4 --pages 256 --pause-ms 10 --no-compress
+"""
+import argparse
+import gzip
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO / "backend"))
+
+LEDGER_DDL = [
+    "CREATE TABLE IF NOT EXISTS bench_ledger (id INTEGER PRIMARY KEY, writer INTEGER, payload BLOB)",
+    "CREATE TABLE IF NOT EXISTS bench_total (id INTEGER PRIMARY KEY, n INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO bench_total VALUES (1, 0)",
+]
+
+
+def writer(db_path, number, rate, stop, samples):
+    import storage
+
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    for name, value in storage.PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    interval = 1 / rate
+    local = []
+    next_at = time.monotonic()
+    while not stop.is_set():
+        started = time.monotonic()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT INTO bench_ledger(writer, payload) VALUES (?, randomblob(1024))", (number,))
+        conn.execute("UPDATE bench_total SET n = n + 1 WHERE id = 1")
+        conn.execute("COMMIT")
+        local.append((started, time.monotonic() - started))
+        next_at += interval
+        time.sleep(max(0.0, next_at - time.monotonic()))
+    conn.close()
+    samples.put(local)
+
+
+def check(path):
+    """Integrity and ledger consistency of a database file or .gz snapshot; returns the ledger size."""
+    plain = path
+    if path.endswith(".gz"):
+        plain = path[:-3] + ".check"
+        with gzip.open(path, "rb") as src, open(plain, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    try:
+        conn = sqlite3.connect(plain)
+        try:
+            assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok", f"{path}: integrity_check failed"
+            rows = conn.execute("SELECT count(*) FROM bench_ledger").fetchone()[0]
+            total = conn.execute("SELECT n FROM bench_total").fetchone()[0]
+            assert rows == total, f"{path}: {rows} ledger rows, counter says {total}"
+            return rows
+        finally:
+            conn.close()
+    finally:
+        if plain != path:
+            os.unlink(plain)
+
+
+def latency(label, samples):
+    if not samples:
+        print(f"  {label:<7} no commits")
+        return
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {label:<7} commits={len(ordered):6d}  p50={statistics.median(ordered) * 1000:6.2f}ms  "
+          f"p99={p99 * 1000:6.2f}ms  max={ordered[-1] * 1000:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=100_000)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=50.0, help="transactions per second per writer")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of writes before and after the backups")
+    parser.add_argument("--snapshots", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=1024, help="pages copied per backup step")
+    parser.add_argument("--pause-ms", type=float, default=5.0, help="sleep between backup steps")
+    parser.add_argument("--no-compress", action="store_true")
+    args = parser.parse_args()
+
+    import backups
+
+    tmp = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(tmp, "bench.db")
+        env = dict(os.environ, DB_PATH=db_path, CACHE_VERSION_DIR=os.path.join(tmp, "versions"),
+                   METRICS_DIR=os.path.join(tmp, "metrics"), UPLOAD_DIR=os.path.join(tmp, "uploads"))
+        subprocess.run([sys.executable, str(REPO / "scripts" / "generate_dataset.py"), "--db", db_path,
+                        "--doctors", str(args.doctors)], env=env, check=True, stdout=subprocess.DEVNULL)
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        for ddl in LEDGER_DDL:
+            conn.execute(ddl)
+        conn.close()
+        print(f"Database: {os.path.getsize(db_path) / 1e6:.1f} MB, {args.doctors} doctors")
+
+        manager = backups.BackupManager(db_path, os.path.join(tmp, "backups"), keep=args.snapshots,
+                                        compress=not args.no_compress, pages=args.pages, pause=args.pause_ms / 1000)
+        stop = multiprocessing.Event()
+        samples = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=writer, args=(db_path, n, args.rate, stop, samples))
+                     for n in range(args.writers)]
+        for process in processes:
+            process.start()
+
+        time.sleep(args.duration)
+        backup_started = time.monotonic()
+        snapshots = []
+        for _ in range(args.snapshots):
+            started = time.perf_counter()
+            snapshot = manager.snapshot()
+            snapshots.append((snapshot, time.perf_counter() - started))
+        backup_finished = time.monotonic()
+        time.sleep(args.duration)
+
+        stop.set()
+        commits = [sample for _ in processes for sample in samples.get()]
+        for process in processes:
+            process.join()
+
+        print(f"Writers: {args.writers} x {args.rate:g}/s")
+        latency("before", [d for t, d in commits if t < backup_started])
+        latency("during", [d for t, d in commits if backup_started <= t < backup_finished])
+        latency("after", [d for t, d in commits if t >= backup_finished])
+        print(f"Snapshots ({args.pages} pages/step, {args.pause_ms:g}ms pause, "
+              f"{'plain' if args.no_compress else 'gzip'}):")
+        for snapshot, seconds in snapshots:
+            rows = check(snapshot.path)
+            print(f"  {Path(snapshot.path).name:<34} {seconds:6.2f}s  {snapshot.size / 1e6:7.1f} MB  "
+                  f"consistent, {rows} ledger rows")
+
+        scratch = os.path.join(tmp, "restored.db")
+        started = time.perf_counter()
+        backups.restore(snapshots[-1][0].path, scratch)
+        print(f"Restore: {time.perf_counter() - started:.2f}s, {check(scratch)} ledger rows, consistent")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
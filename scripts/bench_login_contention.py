@@ -0,0 +1,113 @@
+"""Benchmark: public GET latency while logins run concurrently.
+
+Runs the FastAPI app in-process (httpx ASGI transport) against a throwaway
+database, measures GET /api/doctors latency on its own, then again while
+several clients hammer POST /api/auth/login. `--inline` swaps in the old
+behaviour (bcrypt on the event loop) for comparison.
+
+    python scripts/bench_login_contention.py
+    python scripts/bench_login_contention.py --inline --logins 8
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+class InlineHasher:
+    """The pre-executor behaviour: hash right on the event loop."""
+
+    def __init__(self, context):
+        self.context = context
+
+    async def verify(self, plain_password, hashed_password):
+        return self.context.verify(plain_password, hashed_password)
+
+    async def hash(self, password):
+        return self.context.hash(password)
+
+    def shutdown(self):
+        pass
+
+
+def summarize(label, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<28} n={len(samples):<5} p50={statistics.median(samples):7.2f}ms "
+          f"p99={p99:7.2f}ms max={samples[-1]:7.2f}ms")
+
+
+async def get_loop(client, duration, samples):
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        r = await client.get("/api/doctors", params={"limit": 20})
+        assert r.status_code == 200, r.text
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def login_loop(client, duration, counts):
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        r = await client.post("/api/auth/login", data={"username": "bench@medassoc.com", "password": "bench"})
+        counts[r.status_code] = counts.get(r.status_code, 0) + 1
+
+
+async def run(args):
+    import httpx
+    import server
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    server.limiter.enabled = False
+    if args.inline:
+        server.password_hasher = InlineHasher(server.password_hasher.context)
+    await server.on_startup()
+
+    async with server.AsyncSessionLocal() as session:
+        session.add(server.UserModel(
+            username="bench@medassoc.com", full_name="Bench",
+            hashed_password=await server.password_hasher.hash("bench"),
+        ))
+        await session.commit()
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        idle = []
+        await get_loop(client, args.duration, idle)
+        summarize("GET alone", idle)
+
+        busy, counts = [], {}
+        await asyncio.gather(
+            get_loop(client, args.duration, busy),
+            *(login_loop(client, args.duration, counts) for _ in range(args.logins)),
+        )
+        mode = "inline bcrypt" if args.inline else "executor bcrypt"
+        summarize(f"GET + {args.logins} logins ({mode})", busy)
+        print(f"login responses: {dict(sorted(counts.items()))}")
+    server.password_hasher.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=4, help="concurrent login clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per phase")
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop (old behaviour)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ["CACHE_VERSION_DIR"] = os.path.join(tmp, "versions")
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
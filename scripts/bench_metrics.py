@@ -0,0 +1,102 @@
+"""Benchmark: per-request and per-query cost of the metrics instrumentation.
+
+Measures, each as the difference between an instrumented and a bare run:
+
+* MetricsMiddleware around a bare ASGI endpoint, called directly (no
+  HTTP client, no framework) so that only the middleware is measured;
+* the engine hooks around `SELECT 1` on an in-memory SQLite engine, next
+  to empty hooks: most of the per-query cost is SQLAlchemy's event
+  dispatch itself, which the slow-query log needs anyway;
+* `Metrics.render()` for the resulting series.
+
+    python scripts/bench_metrics.py
+    python scripts/bench_metrics.py --requests 50000
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+import metrics  # noqa: E402
+from sqlalchemy import create_engine, event, text  # noqa: E402
+
+
+class Route:
+    path = "/api/items/{id}"
+
+
+async def endpoint(scope, receive, send):
+    # What a routed FastAPI endpoint leaves behind, minus the framework
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"id": "1"}'})
+
+
+async def drive(app, count):
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/api/items/1", "root_path": ""}
+    start = time.perf_counter()
+    for _ in range(count):
+        await app(dict(scope), None, send)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def time_queries(engine, count):
+    with engine.connect() as conn:
+        statement = text("SELECT 1")
+        for _ in range(200):
+            conn.execute(statement)
+        start = time.perf_counter()
+        for _ in range(count):
+            conn.execute(statement)
+        return (time.perf_counter() - start) / count * 1e6
+
+
+def empty_hooks(engine):
+    # SQLAlchemy's own cost of having cursor events at all
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, parameters, context, executemany: None)
+    event.listen(engine, "after_cursor_execute", lambda conn, cursor, statement, parameters, context, executemany: None)
+    return engine
+
+
+def best(rounds, run):
+    return min(run() for _ in range(rounds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5, help="best of N, to drop scheduler noise")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = metrics.register_defaults(metrics.Metrics(tmp))
+
+        instrumented_app = metrics.MetricsMiddleware(endpoint, registry)
+        bare = best(args.rounds, lambda: asyncio.run(drive(endpoint, args.requests)))
+        instrumented = best(args.rounds, lambda: asyncio.run(drive(instrumented_app, args.requests)))
+        print(f"request   bare {bare:7.2f}us  instrumented {instrumented:7.2f}us  overhead {instrumented - bare:5.2f}us")
+
+        bare_engine, hooked_engine = create_engine("sqlite://"), empty_hooks(create_engine("sqlite://"))
+        engine = create_engine("sqlite://")
+        metrics.instrument_engine(registry, engine, "bench")
+        bare = best(args.rounds, lambda: time_queries(bare_engine, args.queries))
+        hooked = best(args.rounds, lambda: time_queries(hooked_engine, args.queries))
+        instrumented = best(args.rounds, lambda: time_queries(engine, args.queries))
+        print(f"query     bare {bare:7.2f}us  empty hooks {hooked:7.2f}us  instrumented {instrumented:7.2f}us  "
+              f"overhead {instrumented - bare:5.2f}us ({instrumented - hooked:.2f}us in metrics.py)")
+
+        start = time.perf_counter()
+        body = registry.render()
+        print(f"render    {(time.perf_counter() - start) * 1e3:.2f}ms for {body.count(chr(10))} lines")
+
+
+if __name__ == "__main__":
+    main()
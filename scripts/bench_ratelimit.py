@@ -0,0 +1,88 @@
+"""Benchmark: per-request cost of a rate-limit check, per storage backend.
+
+Times `FixedWindowRateLimiter.hit` (what slowapi calls once per limited
+request) against the in-process `memory://` storage and the shared
+`sqlite://` storage from ratelimit_store.py, first from one process, then
+with several processes hitting the same keys at once. The multi-process
+run also checks that the shared counter admits exactly the configured
+number of hits across all processes.
+
+    python scripts/bench_ratelimit.py
+    python scripts/bench_ratelimit.py --hits 20000 --procs 8
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+import ratelimit_store  # noqa: E402,F401
+from limits import parse  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from limits.strategies import FixedWindowRateLimiter  # noqa: E402
+
+
+def run_hits(uri, hits, keys, limit):
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = parse(limit)
+    samples = []
+    allowed = 0
+    for i in range(hits):
+        client = i % keys
+        key = f"10.0.{client // 256}.{client % 256}"
+        t = time.perf_counter()
+        allowed += limiter.hit(item, "login", key)
+        samples.append((time.perf_counter() - t) * 1e6)
+    return samples, allowed
+
+
+def _worker(args):
+    return run_hits(*args)
+
+
+def report(label, samples, elapsed=None):
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    rate = f"  {len(samples) / elapsed:9,.0f} hits/s" if elapsed else ""
+    print(f"  {label:<28} p50={statistics.median(samples):7.1f}us  p99={p99:7.1f}us{rate}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hits", type=int, default=10_000, help="hits per process")
+    parser.add_argument("--keys", type=int, default=1000, help="distinct client addresses")
+    parser.add_argument("--procs", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_uri = f"sqlite:///{os.path.join(tmp, 'ratelimit.db')}"
+
+        print(f"Single process, {args.hits:,} hits over {args.keys:,} keys:")
+        for label, uri in (("memory://", "memory://"), ("sqlite:// (shared)", sqlite_uri)):
+            start = time.perf_counter()
+            samples, _ = run_hits(uri, args.hits, args.keys, "1000000/minute")
+            report(label, samples, time.perf_counter() - start)
+
+        print(f"\n{args.procs} processes, {args.hits:,} hits each, sqlite://:")
+        with multiprocessing.Pool(args.procs) as pool:
+            start = time.perf_counter()
+            results = pool.map(_worker, [(sqlite_uri, args.hits, args.keys, "1000000/minute")] * args.procs)
+            elapsed = time.perf_counter() - start
+        report("contended", [s for samples, _ in results for s in samples], elapsed)
+
+        # Correctness: one key, limit 5, every process racing for it
+        limit = 5
+        with multiprocessing.Pool(args.procs) as pool:
+            results = pool.map(_worker, [(sqlite_uri, 50, 1, f"{limit}/hour")] * args.procs)
+        admitted = sum(allowed for _, allowed in results)
+        print(f"\n  {args.procs} processes x 50 hits against '{limit}/hour': {admitted} admitted "
+              f"({'ok' if admitted == limit else 'WRONG'})")
+
+
+if __name__ == "__main__":
+    main()
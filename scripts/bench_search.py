@@ -0,0 +1,144 @@
+"""Benchmark: FTS5 directory search vs. the old ilike('%x%') filters.
+
+Builds a throwaway SQLite database per size with synthetic doctors, then
+times the same lookups through both paths and prints p50/p99 latencies.
+
+    python scripts/bench_search.py                 # 10k, 100k, 1M rows
+    python scripts/bench_search.py --sizes 10000 --repeat 50
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+import search  # noqa: E402
+
+FIRST = ["Ana", "Carlos", "João", "Maria", "Márcia", "Roberto", "Thaís", "Filipe", "José", "Etiene", "Augusto", "Fernanda"]
+LAST = ["Silva", "Souza", "Araújo", "Mendes", "Oliveira", "Ferreira", "Costa", "Rosa", "Koyama", "Almeida", "França"]
+CITIES = ["Belém", "Ananindeua", "Santarém", "Marabá", "Castanhal", "Parauapebas", "Altamira", "Abaetetuba", "Bragança", "Tucuruí"]
+SPECIALTIES = ["Catarata", "Glaucoma", "Retina e Vítreo", "Córnea e Lentes de Contato", "Oftalmopediatria", "Plástica Ocular", "Estrabismo", "Uveíte"]
+
+# (label, city, specialty) as the API would receive them
+QUERIES = [
+    ("city", "Belém", None),
+    ("city-unaccented", "belem", None),
+    ("specialty", None, "Glaucoma"),
+    ("city+specialty", "Santarém", "Retina"),
+    ("rare", "Tucuruí", "Uveíte"),
+]
+NAME_QUERIES = ["Araújo", "maria souza", "joao"]
+
+SCHEMA = """
+CREATE TABLE doctors (
+    seq INTEGER NOT NULL PRIMARY KEY,
+    id VARCHAR NOT NULL UNIQUE,
+    name VARCHAR, city VARCHAR, specialty VARCHAR, contact_info VARCHAR,
+    image_url VARCHAR, created_at DATETIME
+)
+"""
+INSERT = ("INSERT INTO doctors(id, name, city, specialty, contact_info, image_url, created_at) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+
+def populate(conn, rows, seed=42):
+    rnd = random.Random(seed)
+    conn.execute(SCHEMA)
+    batch = []
+    for _ in range(rows):
+        batch.append((
+            str(uuid.UUID(int=rnd.getrandbits(128))),
+            f"Dr. {rnd.choice(FIRST)} {rnd.choice(LAST)} {rnd.choice(LAST)}",
+            rnd.choice(CITIES),
+            rnd.choice(SPECIALTIES),
+            f"(91) 9{rnd.randrange(10**7, 10**8)}",
+            None,
+            "2025-01-01 00:00:00",
+        ))
+        if len(batch) == 10000:
+            conn.executemany(INSERT, batch)
+            batch.clear()
+    conn.executemany(INSERT, batch)
+    conn.commit()
+
+
+def ilike_query(conn, city, specialty, limit):
+    # Mirrors what SQLAlchemy emits for Column.ilike() on SQLite
+    sql = "SELECT * FROM doctors WHERE 1"
+    params = []
+    if city:
+        sql += " AND lower(city) LIKE lower(?)"
+        params.append(f"%{city}%")
+    if specialty:
+        sql += " AND lower(specialty) LIKE lower(?)"
+        params.append(f"%{specialty}%")
+    return conn.execute(sql + " LIMIT ?", (*params, limit)).fetchall()
+
+
+def fts_query(conn, match, limit, ranked):
+    # Same shape as list_doctors: only free-text (q=) searches are ranked
+    rank = search.rank_expression() if ranked else "0"
+    order = "ORDER BY hits.rank " if ranked else ""
+    return conn.execute(
+        f"SELECT doctors.* FROM doctors JOIN ("
+        f"  SELECT rowid, {rank} AS rank"
+        f"  FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH ?"
+        f") AS hits ON hits.rowid = doctors.seq {order}LIMIT ?",
+        (match, limit),
+    ).fetchall()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return statistics.median(samples), p99
+
+
+def run(rows, repeat, limit):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        populate(conn, rows)
+
+        start = time.perf_counter()
+        search.ensure_search_index(conn)
+        conn.commit()
+        build_s = time.perf_counter() - start
+
+        print(f"\n== {rows:,} doctors (FTS build {build_s:.2f}s) ==")
+        print(f"{'query':<18} {'ilike p50':>10} {'ilike p99':>10} {'fts p50':>10} {'fts p99':>10}")
+        for label, city, specialty in QUERIES:
+            match = search.build_match(city=city, specialty=specialty)
+            il = timed(lambda: ilike_query(conn, city, specialty, limit), repeat)
+            ft = timed(lambda: fts_query(conn, match, limit, ranked=False), repeat)
+            print(f"{label:<18} {il[0]:>9.2f}ms {il[1]:>9.2f}ms {ft[0]:>9.2f}ms {ft[1]:>9.2f}ms")
+        for q in NAME_QUERIES:
+            # The ilike path cannot search names at all; FTS only.
+            ft = timed(lambda: fts_query(conn, search.build_match(q=q), limit, ranked=True), repeat)
+            print(f"{'q=' + q:<18} {'-':>10} {'-':>10} {ft[0]:>9.2f}ms {ft[1]:>9.2f}ms")
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    for rows in args.sizes:
+        run(rows, args.repeat, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark: serialization cost and bytes on the wire per 1k listing rows.
+
+Builds synthetic doctor and event ORM objects (events carry paragraph-long
+descriptions) and times each stage of the response path separately:
+response_model validation + conversion to JSON-ready data (unchanged by the
+fast path), rendering with the stdlib `json` module (FastAPI's default
+JSONResponse) and with `FastJSONResponse` (orjson), then the body size
+uncompressed, with gzip and with brotli at the levels CompressionMiddleware
+uses.
+
+    python scripts/bench_serialization.py
+    python scripts/bench_serialization.py --rows 5000 --repeat 20
+"""
+import argparse
+import gzip
+import logging
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+logging.disable(logging.WARNING)
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import http_encoding  # noqa: E402
+import server  # noqa: E402
+
+CITIES = ["Belém", "Ananindeua", "Santarém", "Marabá", "Castanhal", "Parauapebas", "Altamira"]
+SPECIALTIES = ["Catarata", "Glaucoma", "Retina e Vítreo", "Córnea e Lentes de Contato", "Oftalmopediatria"]
+WORDS = ("oftalmologia congresso palestra atualização catarata glaucoma retina cirurgia jornada "
+         "científica associação paraense médicos residentes inscrições abertas programação").split()
+
+
+def make_doctors(rows, rnd):
+    return [
+        server.DoctorModel(
+            id=str(uuid.UUID(int=rnd.getrandbits(128))),
+            name=f"Dr. {rnd.choice(WORDS).title()} {rnd.choice(WORDS).title()}",
+            city=rnd.choice(CITIES),
+            specialty=rnd.choice(SPECIALTIES),
+            contact_info=f"(91) 9{rnd.randrange(10**7, 10**8)}",
+            image_url=f"https://images.unsplash.com/photo-{rnd.randrange(10**9)}" if rnd.random() < 0.5 else None,
+            created_at=datetime(2025, 1, 1) + timedelta(minutes=rnd.randrange(10**6)),
+        )
+        for _ in range(rows)
+    ]
+
+
+def make_events(rows, rnd):
+    return [
+        server.EventModel(
+            id=str(uuid.UUID(int=rnd.getrandbits(128))),
+            title=" ".join(rnd.choices(WORDS, k=5)).capitalize(),
+            date=f"{rnd.randrange(1, 29)} de maio de 2025",
+            time="14h",
+            location=rnd.choice(CITIES),
+            description=" ".join(rnd.choices(WORDS, k=rnd.randrange(80, 200))).capitalize() + ".",
+            image_url=None,
+            external_link="https://example.org/inscricao",
+            status="upcoming",
+            created_at=datetime(2025, 1, 1) + timedelta(minutes=rnd.randrange(10**6)),
+        )
+        for _ in range(rows)
+    ]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def bench(label, schema, objects, repeat):
+    adapter = TypeAdapter(List[schema])
+    per_k = 1000 / len(objects)
+
+    def validate():
+        # What FastAPI's serialize_response does with a response_model
+        return adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+
+    validate_ms, content = timed(validate, repeat)
+    stdlib_ms, body = timed(lambda: JSONResponse(content).body, repeat)
+    fast_ms, fast_body = timed(lambda: http_encoding.FastJSONResponse(content).body, repeat)
+    gzip_ms, gz = timed(lambda: gzip.compress(fast_body, compresslevel=http_encoding.GZIP_LEVEL), repeat)
+
+    print(f"\n{label}: {len(objects)} rows, per 1k rows (median of {repeat})")
+    print(f"  validate + to JSON data  {validate_ms * per_k:8.2f} ms")
+    print(f"  render, stdlib json      {stdlib_ms * per_k:8.2f} ms")
+    print(f"  render, orjson           {fast_ms * per_k:8.2f} ms"
+          f"{'' if http_encoding.orjson else '  (orjson not installed: stdlib fallback)'}")
+    print(f"  body, uncompressed       {len(body) * per_k / 1024:8.1f} KiB")
+    print(f"  body, gzip               {len(gz) * per_k / 1024:8.1f} KiB  ({gzip_ms * per_k:.2f} ms)")
+    if http_encoding.brotli is not None:
+        br_ms, br = timed(lambda: http_encoding.compress(fast_body, "br"), repeat)
+        print(f"  body, brotli             {len(br) * per_k / 1024:8.1f} KiB  ({br_ms * per_k:.2f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    bench("doctors", server.DoctorResponse, make_doctors(args.rows, rnd), args.repeat)
+    bench("events", server.EventResponse, make_events(args.rows, rnd), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark: worker boot to first served request.
+
+Starts the app in a fresh process (uvicorn, or gunicorn with one
+UvicornWorker as the Dockerfile runs it) on a free port, polls
+GET /api/doctors?limit=1 every few milliseconds and records the time from
+spawning the process to the first 200 response. Scenarios:
+
+    current   the database was initialized before (scripts/init_db.py): a
+              restart or a scale-out, the case that has to be fast
+    fresh     an empty database: the worker bootstraps the schema itself
+
+Also reported: `import server` alone, in a fresh interpreter, which is
+most of the first number. Every run uses its own throwaway directories;
+`--doctors` seeds the database with scripts/generate_dataset.py, which
+shows what the per-worker startup loads (the typeahead index) cost.
+
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --runs 10 --doctors 100000 --gunicorn
+"""
+import argparse
+import http.client
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+BACKEND = REPO / "backend"
+IMPORT_ONLY = "import time; t = time.perf_counter(); import server; print(time.perf_counter() - t)"
+
+
+def environment(tmp):
+    env = dict(os.environ)
+    env.update({
+        "DB_PATH": os.path.join(tmp, "bench.db"),
+        "CACHE_VERSION_DIR": os.path.join(tmp, "versions"),
+        "METRICS_DIR": os.path.join(tmp, "metrics"),
+        "SLOW_QUERY_LOG": os.path.join(tmp, "slow_queries.log"),
+        "RATE_LIMIT_STORAGE": f"sqlite:///{os.path.join(tmp, 'ratelimit.db')}",
+        "UPLOAD_DIR": os.path.join(tmp, "uploads"),
+        "IMG_CACHE_DIR": os.path.join(tmp, "img-cache"),
+        "SECRET_KEY": "bench-" + uuid.uuid4().hex,
+    })
+    return env
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(port, gunicorn):
+    if gunicorn:
+        return [sys.executable, "-m", "gunicorn", "server:app", "-k", "uvicorn.workers.UvicornWorker",
+                "--workers", "1", "--bind", f"127.0.0.1:{port}", "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"]
+
+
+def first_response(port, started, timeout):
+    while time.perf_counter() - started < timeout:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+            conn.request("GET", "/api/doctors?limit=1")
+            status = conn.getresponse().status
+            conn.close()
+            if status == 200:
+                return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(0.002)
+    raise RuntimeError(f"no response within {timeout}s")
+
+
+def boot(env, gunicorn, timeout):
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(server_command(port, gunicorn), cwd=BACKEND, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        return first_response(port, started, timeout)
+    except RuntimeError:
+        process.kill()
+        print(process.communicate()[1].decode(errors="replace")[-2000:], file=sys.stderr)
+        raise
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def prepare(tmp, doctors):
+    env = environment(tmp)
+    subprocess.run([sys.executable, str(REPO / "scripts" / "init_db.py")], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if doctors:
+        subprocess.run([sys.executable, str(REPO / "scripts" / "generate_dataset.py"), "--db", env["DB_PATH"],
+                        "--doctors", str(doctors)], env=env, check=True, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+    return env
+
+
+def report(label, samples):
+    print(f"{label:<10} median={statistics.median(samples) * 1000:7.1f}ms  min={min(samples) * 1000:7.1f}ms  "
+          f"max={max(samples) * 1000:7.1f}ms  (n={len(samples)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--doctors", type=int, default=0, help="seed the 'current' database with this many doctors")
+    parser.add_argument("--gunicorn", action="store_true", help="boot through gunicorn, as the Dockerfile does")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        imports = [
+            float(subprocess.run([sys.executable, "-c", IMPORT_ONLY], cwd=BACKEND, env=environment(tmp), check=True,
+                                 capture_output=True, text=True).stdout.split()[-1])
+            for _ in range(args.runs)
+        ]
+    report("import", imports)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = prepare(tmp, args.doctors)
+        report("current", [boot(env, args.gunicorn, args.timeout) for _ in range(args.runs)])
+
+    fresh = []
+    for _ in range(args.runs):
+        tmp = tempfile.mkdtemp()
+        try:
+            fresh.append(boot(environment(tmp), args.gunicorn, args.timeout))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    report("fresh", fresh)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Benchmark: concurrent reads and writes from several worker processes.
+
+Spawns --workers processes that each import the app (like gunicorn
+workers sharing one SQLite file) and drive it in-process through the
+httpx ASGI transport: --readers clients loop on GET /api/doctors with
+uncached filters, --writers clients loop on POST /api/doctors. Reports
+per-operation latency, throughput, errors, and the writer batch sizes.
+
+    python scripts/bench_storage.py
+    python scripts/bench_storage.py --legacy-pragmas   # rollback journal, no busy timeout
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = str(Path(__file__).resolve().parent.parent / "backend")
+
+LEGACY_PRAGMAS = {
+    "SQLITE_JOURNAL_MODE": "DELETE",
+    "SQLITE_SYNCHRONOUS": "FULL",
+    "SQLITE_BUSY_TIMEOUT": "0",
+    "SQLITE_MMAP_SIZE": "0",
+    "SQLITE_CACHE_SIZE": "-2000",
+}
+
+
+def _import_server():
+    sys.path.append(BACKEND_DIR)
+    logging.disable(logging.WARNING)
+    import server
+    server.limiter.enabled = False
+    return server
+
+
+def init_db():
+    server = _import_server()
+
+    async def setup():
+        await server.on_startup()
+        async with server.AsyncSessionLocal() as session:
+            session.add(server.UserModel(username="bench@medassoc.com", full_name="Bench", hashed_password="-"))
+            await session.commit()
+        await server.on_shutdown()
+
+    asyncio.run(setup())
+
+
+async def _reader(client, deadline, samples, errors):
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        start = time.perf_counter()
+        # A unique query string every time so the response cache cannot answer it
+        r = await client.get("/api/doctors", params={"limit": 20, "specialty": "retina", "nonce": n})
+        if r.status_code == 200:
+            samples.append((time.perf_counter() - start) * 1000)
+        else:
+            errors[r.status_code] = errors.get(r.status_code, 0) + 1
+
+
+async def _writer(client, headers, deadline, samples, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        payload = {"name": f"Dr. {uuid.uuid4().hex[:8]}", "city": "Belém", "specialty": "Retina", "contact_info": ""}
+        try:
+            r = await client.post("/api/doctors", json=payload, headers=headers)
+            status = r.status_code
+        except Exception:
+            status = "exception"
+        if status == 201:
+            samples.append((time.perf_counter() - start) * 1000)
+        else:
+            errors[status] = errors.get(status, 0) + 1
+
+
+def worker(args, results):
+    import httpx
+    server = _import_server()
+
+    async def run():
+        await server.on_startup()
+        headers = {"Authorization": f"Bearer {server.create_access_token({'sub': 'bench@medassoc.com'})}"}
+        reads, writes, errors = [], [], {}
+        transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            deadline = time.perf_counter() + args.duration
+            await asyncio.gather(
+                *(_reader(client, deadline, reads, errors) for _ in range(args.readers)),
+                *(_writer(client, headers, deadline, writes, errors) for _ in range(args.writers)),
+            )
+        stats = server.db_writer.stats()
+        await server.on_shutdown()
+        return reads, writes, errors, stats
+
+    try:
+        results.put(asyncio.run(run()))
+    except Exception as exc:
+        # e.g. `database is locked` during startup DDL with the legacy pragmas
+        results.put(([], [], {f"worker crashed: {exc}": 1}, {"jobs": 0, "batches": 0, "largest_batch": 0}))
+
+
+def summarize(label, samples, duration):
+    if not samples:
+        print(f"{label:<7} no successful operations")
+        return
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<7} {len(samples) / duration:8.0f} ops/s  p50={statistics.median(samples):7.2f}ms  "
+          f"p99={p99:7.2f}ms  max={samples[-1]:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8, help="reader clients per worker")
+    parser.add_argument("--writers", type=int, default=4, help="writer clients per worker")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--legacy-pragmas", action="store_true", help="pre-WAL SQLite settings for comparison")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ["CACHE_VERSION_DIR"] = os.path.join(tmp, "versions")
+        if args.legacy_pragmas:
+            os.environ.update(LEGACY_PRAGMAS)
+
+        init = ctx.Process(target=init_db)
+        init.start()
+        init.join()
+
+        results = ctx.Queue()
+        procs = [ctx.Process(target=worker, args=(args, results)) for _ in range(args.workers)]
+        for p in procs:
+            p.start()
+        outcomes = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    reads = [s for o in outcomes for s in o[0]]
+    writes = [s for o in outcomes for s in o[1]]
+    errors = {}
+    for o in outcomes:
+        for status, count in o[2].items():
+            errors[status] = errors.get(status, 0) + count
+    mode = "legacy pragmas" if args.legacy_pragmas else "WAL + serialized writer"
+    print(f"{args.workers} workers x ({args.readers} readers + {args.writers} writers), {args.duration:.0f}s, {mode}")
+    summarize("reads", reads, args.duration)
+    summarize("writes", writes, args.duration)
+    print(f"errors  {errors or 'none'}")
+    batches = sum(o[3]["batches"] for o in outcomes)
+    jobs = sum(o[3]["jobs"] for o in outcomes)
+    if batches:
+        print(f"writer  {jobs} jobs in {batches} commits (avg batch {jobs / batches:.1f}, "
+              f"largest {max(o[3]['largest_batch'] for o in outcomes)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: typeahead lookups in the in-memory prefix index.
+
+Builds a `suggest.PrefixIndex` over synthetic doctor names per size and
+reports build time, memory (tracemalloc) and lookup latency for typical
+prefixes, from one letter ("a") to nearly complete names.
+
+    python scripts/bench_suggest.py                 # 10k, 100k, 1M names
+    python scripts/bench_suggest.py --sizes 1000000 --repeat 2000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+import suggest  # noqa: E402
+
+FIRST = ["Ana", "Carlos", "João", "Maria", "Márcia", "Roberto", "Thaís", "Filipe", "José", "Etiene", "Augusto", "Fernanda"]
+LAST = ["Silva", "Souza", "Araújo", "Mendes", "Oliveira", "Ferreira", "Costa", "Rosa", "Koyama", "Almeida", "França"]
+PREFIXES = ["a", "jo", "Maria", "marcia s", "Dr. Roberto Costa", "thais mendes ara", "zzz"]
+
+
+def names(count, seed=42):
+    rnd = random.Random(seed)
+    for i in range(count):
+        title = rnd.choice(("Dr.", "Dra."))
+        yield f"{title} {rnd.choice(FIRST)} {rnd.choice(LAST)} {rnd.choice(LAST)} {rnd.choice(LAST)} {i:x}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        values = list(names(size))
+        tracemalloc.start()
+        start = time.perf_counter()
+        index = suggest.PrefixIndex("name", values)
+        build = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"\n{size:,} names: built in {build:.2f}s, {memory / 2**20:.1f} MiB "
+              f"({memory / size:.0f} B/entry)")
+        for prefix in PREFIXES:
+            samples = []
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                found = index.search(prefix, args.limit)
+                samples.append((time.perf_counter() - t) * 1e6)
+            samples.sort()
+            p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+            print(f"  {prefix!r:<22} {len(found):3d} hits  p50={statistics.median(samples):6.1f}us  p99={p99:6.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""Benchmark suite: the backend hot paths, in-process, at several data sizes.
+
+For each `--sizes` value a fresh process creates a throwaway SQLite file,
+seeds that many doctors (and a tenth as many events), boots the FastAPI app
+and drives it through httpx's ASGI transport, so the numbers cover routing,
+dependencies, the database and serialization, but no network. Cases:
+
+    doctors           GET /api/doctors, response cache cleared before each call
+    doctors_cached    the same, answered by the response cache
+    doctors_city      GET /api/doctors?city=...
+    doctors_search    GET /api/doctors?q=...
+    events            GET /api/events
+    events_upcoming   GET /api/events?upcoming=true
+    login             POST /api/auth/login (bcrypt)
+    current_user      an authenticated GET with the principal cache cleared
+    current_user_warm the same with the principal cache warm
+    upload            POST /api/upload of a small PNG (and its resized variants)
+    serialize_doctors validate + render 100 DoctorResponse rows, no HTTP
+    serialize_events  validate + render 100 EventResponse rows, no HTTP
+
+Results (median, p95, mean in ms) go to `--output` as JSON. `--compare
+BASELINE.json` prints the change against a stored run and exits with
+status 1 if any case's median got slower than `--threshold` percent.
+
+    python scripts/bench_suite.py --sizes 1000 100000 --output bench.json
+    python scripts/bench_suite.py --compare bench.json --threshold 15
+    python scripts/bench_suite.py --cases doctors doctors_search --iterations 500
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+CITIES = ["Belém", "Ananindeua", "Santarém", "Marabá", "Castanhal", "Parauapebas", "Abaetetuba", "Altamira"]
+SPECIALTIES = ["Retina", "Glaucoma", "Catarata", "Córnea", "Oftalmopediatria", "Plástica Ocular", "Estrabismo"]
+FIRST = ["Ana", "Carlos", "João", "Maria", "Márcia", "Roberto", "Thaís", "Filipe", "José", "Fernanda"]
+LAST = ["Silva", "Souza", "Araújo", "Mendes", "Oliveira", "Ferreira", "Costa", "Rosa", "Almeida", "França"]
+MONTHS = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+          "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+
+CASES = [
+    "doctors", "doctors_cached", "doctors_city", "doctors_search", "events", "events_upcoming",
+    "login", "current_user", "current_user_warm", "upload", "serialize_doctors", "serialize_events",
+]
+# bcrypt and image resizing take milliseconds; fewer runs keep the suite short
+SLOW_CASES = {"login": 0.1, "upload": 0.2}
+
+
+def seed(db_path, size, seed_value=42):
+    import event_dates
+
+    rnd = random.Random(seed_value)
+    now = datetime.utcnow()
+    doctors = [
+        (str(uuid.uuid4()), f"Dr. {rnd.choice(FIRST)} {rnd.choice(LAST)} {rnd.choice(LAST)}", rnd.choice(CITIES),
+         rnd.choice(SPECIALTIES), f"(91) 9{rnd.randrange(10**7, 10**8)}", None,
+         (now - timedelta(seconds=i)).strftime(event_dates.DB_FORMAT))
+        for i in range(size)
+    ]
+    events = []
+    for i in range(max(1, size // 10)):
+        day = now.date() + timedelta(days=rnd.randrange(-365, 365))
+        date_text = f"{day.day} de {MONTHS[day.month - 1]}, {day.year}"
+        starts_at, ends_at = event_dates.parse_window(date_text, "08:00 - 18:00")
+        events.append((
+            str(uuid.uuid4()), f"Simpósio {i}", date_text, "08:00 - 18:00", rnd.choice(CITIES), "Programação científica",
+            None, None, "upcoming", (now - timedelta(seconds=i)).strftime(event_dates.DB_FORMAT),
+            starts_at.strftime(event_dates.DB_FORMAT), ends_at.strftime(event_dates.DB_FORMAT),
+        ))
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO doctors(id, name, city, specialty, contact_info, image_url, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", doctors)
+        conn.executemany(
+            "INSERT INTO events(id, title, date, time, location, description, image_url, external_link, status, "
+            "created_at, starts_at, ends_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", events)
+    conn.close()
+
+
+def png_bytes(salt):
+    # A new image per call: uploads are deduplicated by content
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (salt % 256, salt // 256 % 256, 90)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+    }
+
+
+async def run_cases(size, cases, iterations, warmup):
+    import httpx
+    import server
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    server.limiter.enabled = False
+    await server.on_startup()
+    seed(server.DB_PATH, size)
+    server.response_cache.bump("doctors")
+    server.response_cache.bump("events")
+    async with server.AsyncSessionLocal() as session:
+        session.add(server.UserModel(username="bench@medassoc.com", full_name="Bench",
+                                     hashed_password=await server.password_hasher.hash("bench")))
+        await session.commit()
+
+    async with server.ReadSessionLocal() as session:
+        doctor_rows = (await session.execute(select(server.DoctorModel).limit(100))).scalars().all()
+        event_rows = (await session.execute(select(server.EventModel).limit(100))).scalars().all()
+    doctor_list = TypeAdapter(list[server.DoctorResponse])
+    event_list = TypeAdapter(list[server.EventResponse])
+    uploads = iter(range(10**9))
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/api/auth/login", data={"username": "bench@medassoc.com", "password": "bench"})
+        auth = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        async def get(path, **params):
+            r = await client.get(path, params=params, headers=auth if path.startswith("/api/cache") else None)
+            assert r.status_code == 200, r.text
+
+        def clear_responses():
+            server.response_cache.clear()
+
+        async def upload():
+            data = png_bytes(next(uploads))
+            r = await client.post("/api/upload", files={"file": ("bench.png", data, "image/png")}, headers=auth)
+            assert r.status_code == 200, r.text
+
+        async def login():
+            r = await client.post("/api/auth/login", data={"username": "bench@medassoc.com", "password": "bench"})
+            assert r.status_code == 200, r.text
+
+        async def serialize(adapter, rows):
+            server.http_encoding.FastJSONResponse(adapter.dump_python(adapter.validate_python(rows), mode="json"))
+
+        # name -> (setup run untimed before each call, timed call)
+        table = {
+            "doctors": (clear_responses, lambda: get("/api/doctors")),
+            "doctors_cached": (None, lambda: get("/api/doctors")),
+            "doctors_city": (clear_responses, lambda: get("/api/doctors", city="Santarém")),
+            "doctors_search": (clear_responses, lambda: get("/api/doctors", q="silva")),
+            "events": (clear_responses, lambda: get("/api/events")),
+            "events_upcoming": (None, lambda: get("/api/events", upcoming="true")),
+            "login": (None, login),
+            "current_user": (server.principal_cache.clear, lambda: get("/api/cache/stats")),
+            "current_user_warm": (None, lambda: get("/api/cache/stats")),
+            "upload": (None, upload),
+            "serialize_doctors": (None, lambda: serialize(doctor_list, doctor_rows)),
+            "serialize_events": (None, lambda: serialize(event_list, event_rows)),
+        }
+        if png_bytes(0) is None:
+            cases = [case for case in cases if case != "upload"]
+
+        results = {}
+        for case in cases:
+            setup, call = table[case]
+            scale = SLOW_CASES.get(case, 1)
+            samples = []
+            for i in range(max(1, int(warmup * scale)) + max(3, int(iterations * scale))):
+                if setup is not None:
+                    setup()
+                start = time.perf_counter()
+                await call()
+                if i >= max(1, int(warmup * scale)):
+                    samples.append((time.perf_counter() - start) * 1000)
+            results[case] = summarize(samples)
+            print(f"  {size:>9,} {case:<18} median={results[case]['median_ms']:8.3f}ms  "
+                  f"p95={results[case]['p95_ms']:8.3f}ms", flush=True)
+    await server.on_shutdown()
+    return results
+
+
+def run_size(size, cases, iterations, warmup):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "DB_PATH": os.path.join(tmp, "bench.db"),
+            "CACHE_VERSION_DIR": os.path.join(tmp, "versions"),
+            "METRICS_DIR": os.path.join(tmp, "metrics"),
+            "SLOW_QUERY_LOG": os.path.join(tmp, "slow_queries.log"),
+            "RATE_LIMIT_STORAGE": "memory://",
+            "UPLOAD_DIR": os.path.join(tmp, "uploads"),
+            "IMG_CACHE_DIR": os.path.join(tmp, "img-cache"),
+            "SECRET_KEY": "bench-" + uuid.uuid4().hex,
+        })
+        logging.disable(logging.WARNING)
+        return asyncio.run(run_cases(size, cases, iterations, warmup))
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'case':<28} {'baseline':>10} {'now':>10} {'change':>8}")
+    for key, now in sorted(results.items()):
+        before = baseline.get(key)
+        if before is None:
+            print(f"{key:<28} {'-':>10} {now['median_ms']:>9.3f}ms {'new':>8}")
+            continue
+        change = (now["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{key:<28} {before['median_ms']:>8.3f}ms {now['median_ms']:>8.3f}ms {change:>+7.1f}%{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="doctors per run")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON from an earlier --output run")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed median slowdown, percent")
+    args = parser.parse_args()
+
+    results = {}
+    # One process per size: the server module binds its database at import
+    # (not a multiprocessing.Pool: its daemon workers cannot start the image pool)
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            summaries = pool.submit(run_size, size, args.cases, args.iterations, args.warmup).result()
+        for case, summary in summaries.items():
+            results[f"{size}/{case}"] = summary
+
+    report = {
+        "meta": {
+            "created": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.platform(),
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nwrote {args.output}")
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
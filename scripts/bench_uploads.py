@@ -0,0 +1,162 @@
+"""Benchmark: serving large uploaded images under concurrency.
+
+Fills a throwaway UPLOAD_DIR with --files random "photos" of --size-mb
+each, named like real uploads (`<sha256>.jpg`), starts the app on a free
+port (uvicorn, or gunicorn with --workers UvicornWorkers) and drives
+GET /uploads/<name> from --concurrency keep-alive connections in a
+separate client process. The client is a minimal HTTP/1.1 reader on
+asyncio streams, so its own overhead stays small next to the server's.
+Scenarios:
+
+    full      whole files
+    range     a 256 KB byte range at a random offset (seeking in a video,
+              resuming a download)
+    304       revalidation with If-None-Match
+
+Reports requests/s, MB/s of body and latency percentiles per scenario.
+The client and server share the machine: on few cores they compete for it.
+
+    python scripts/bench_uploads.py
+    python scripts/bench_uploads.py --size-mb 8 --concurrency 64 --gunicorn --workers 4
+"""
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from bench_startup import environment, first_response, free_port, server_command  # noqa: E402
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+RANGE_BYTES = 256 * 1024
+SCENARIOS = ("full", "range", "304")
+
+
+async def fetch(reader, writer, path, headers):
+    lines = [f"GET {path} HTTP/1.1", "Host: bench"] + [f"{k}: {v}" for k, v in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    etag = None
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            length = int(value)
+        elif name == b"etag":
+            etag = value.strip().decode()
+    if length:
+        await reader.readexactly(length)
+    return status, length, etag
+
+
+async def client(port, names, sizes, etags, scenario, deadline, samples, statuses):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    rng = random.Random()
+    try:
+        while time.perf_counter() < deadline:
+            name = rng.choice(names)
+            headers = {}
+            if scenario == "range":
+                start = rng.randrange(0, sizes[name] - RANGE_BYTES)
+                headers["Range"] = f"bytes={start}-{start + RANGE_BYTES - 1}"
+            elif scenario == "304":
+                headers["If-None-Match"] = etags[name]
+            started = time.perf_counter()
+            status, length, _ = await fetch(reader, writer, f"/uploads/{name}", headers)
+            samples.append((time.perf_counter() - started, length))
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def drive(port, names, sizes, scenario, concurrency, duration):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    etags = {}
+    for name in names:
+        _, _, etags[name] = await fetch(reader, writer, f"/uploads/{name}", {})
+    writer.close()
+    samples, statuses = [], {}
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, names, sizes, etags, scenario, deadline, samples, statuses)
+                           for _ in range(concurrency)))
+    return samples, statuses
+
+
+def run_client(port, names, sizes, scenario, concurrency, duration, results):
+    results.put(asyncio.run(drive(port, names, sizes, scenario, concurrency, duration)))
+
+
+def report(scenario, samples, statuses, duration):
+    latencies = sorted(seconds for seconds, _ in samples)
+    body = sum(length for _, length in samples)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    codes = " ".join(f"{code}x{count}" for code, count in sorted(statuses.items()))
+    print(f"{scenario:<6} {len(samples) / duration:8.0f} req/s  {body / duration / 1e6:8.1f} MB/s  "
+          f"p50={statistics.median(latencies) * 1000:7.2f}ms  p99={p99 * 1000:7.2f}ms  [{codes}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--gunicorn", action="store_true", help="serve through gunicorn, as the Dockerfile does")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    process = None
+    try:
+        env = environment(tmp)
+        os.makedirs(env["UPLOAD_DIR"])
+        names, sizes = [], {}
+        for _ in range(args.files):
+            data = os.urandom(int(args.size_mb * 1024 * 1024))
+            name = hashlib.sha256(data).hexdigest() + ".jpg"
+            with open(os.path.join(env["UPLOAD_DIR"], name), "wb") as f:
+                f.write(data)
+            names.append(name)
+            sizes[name] = len(data)
+
+        port = free_port()
+        command = server_command(port, args.gunicorn)
+        if args.gunicorn:
+            command[command.index("--workers") + 1] = str(args.workers)
+        started = time.perf_counter()
+        process = subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL)
+        first_response(port, started, 60)
+        print(f"{args.files} files x {args.size_mb:g} MB, {args.concurrency} connections, "
+              f"{'gunicorn x' + str(args.workers) if args.gunicorn else 'uvicorn'}")
+
+        for scenario in args.scenarios:
+            results = multiprocessing.Queue()
+            worker = multiprocessing.Process(target=run_client, args=(
+                port, names, sizes, scenario, args.concurrency, args.duration, results))
+            worker.start()
+            samples, statuses = results.get()
+            worker.join()
+            report(scenario, samples, statuses, args.duration)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
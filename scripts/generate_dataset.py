@@ -0,0 +1,348 @@
+"""Generate a large, realistic, reproducible directory for scale testing.
+
+Writes synthetic doctors (Brazilian names with Dr./Dra., Pará cities with
+their area codes, ophthalmology subspecialties, landline/mobile/e-mail
+contacts) and events (titles, venues and hand-written date/time text in
+the forms event_dates.py understands, spread over two years around
+`--anchor`) into the SQLite database. The same `--seed` and `--anchor`
+always produce the same rows, ids included.
+
+Speed: rows are built in chunks of CHUNK by `--workers` processes while
+this one inserts them with executemany, all in one transaction. Each
+column of a chunk is drawn with one `randbytes` call indexed into a
+65536-entry lookup table (several times cheaper than `random.choices`),
+and each chunk is sorted by id so the primary-key index fills page by
+page. The search-index and facet triggers are dropped inside the
+transaction and recreated at the end, which rebuilds both indexes in one
+pass each instead of updating them row by row. Other connections keep
+reading the previous snapshot (WAL) until the commit. With a few cores
+inserting is the bound, at 150-200k rows per second; on a single core
+building and inserting add up to about 50k.
+
+    python scripts/generate_dataset.py --doctors 1000000 --events 100000
+    python scripts/generate_dataset.py --db /tmp/big.db --doctors 200000 --replace --seed 7
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Deque, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+import cache  # noqa: E402
+import event_dates  # noqa: E402
+import facets  # noqa: E402
+import search  # noqa: E402
+
+DEFAULT_DB = str(Path(__file__).resolve().parent.parent / "backend" / "medassoc.db")
+CHUNK = 50_000
+
+FIRST_MALE = ["Carlos", "João", "Roberto", "Pedro", "José", "Paulo", "Lucas", "Marcos", "Rafael", "Felipe",
+              "André", "Thiago", "Gabriel", "Ricardo", "Eduardo", "Fernando", "Antônio", "Luiz", "Márcio", "Sérgio"]
+FIRST_FEMALE = ["Ana", "Maria", "Fernanda", "Juliana", "Patrícia", "Camila", "Mariana", "Aline", "Beatriz", "Luciana",
+                "Renata", "Carla", "Adriana", "Thaís", "Débora", "Márcia", "Cláudia", "Letícia", "Vanessa", "Raquel"]
+MIDDLE = ["", "", "", " Paula", " Luiza", " Henrique", " Augusto", " Cristina", " Eduarda", " Vinícius", " Helena", " Miguel"]
+SURNAMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Ferreira", "Costa", "Rodrigues", "Almeida",
+            "Nascimento", "Carvalho", "Araújo", "Ribeiro", "Gomes", "Barbosa", "Monteiro", "Mendes", "Cardoso",
+            "Rocha", "Dias", "Moraes", "Cunha", "Pinheiro", "Batista", "Farias", "Sarmento", "Brito", "Coelho",
+            "Tavares", "Quaresma", "Maués", "Baía", "Guimarães", "Koyama", "Nakamura", "Bentes", "Lobato"]
+
+# (city, area code, relative weight): most of the directory practises in the metropolitan area
+CITIES = [
+    ("Belém", "91", 40), ("Ananindeua", "91", 10), ("Marituba", "91", 3), ("Castanhal", "91", 4),
+    ("Abaetetuba", "91", 2), ("Barcarena", "91", 2), ("Bragança", "91", 2), ("Capanema", "91", 2),
+    ("Cametá", "91", 1), ("Salinópolis", "91", 1), ("Santarém", "93", 8), ("Altamira", "93", 3),
+    ("Itaituba", "93", 2), ("Óbidos", "93", 1), ("Oriximiná", "93", 1), ("Marabá", "94", 6),
+    ("Parauapebas", "94", 5), ("Redenção", "94", 2), ("Tucuruí", "94", 2), ("Canaã dos Carajás", "94", 1),
+    ("Xinguara", "94", 1), ("Paragominas", "91", 2),
+]
+SPECIALTIES = [
+    "Cirurgia de Catarata", "Retina e Vítreo", "Glaucoma", "Oftalmopediatria", "Córnea e Doenças Externas",
+    "Plástica Ocular", "Estrabismo", "Cirurgia Refrativa", "Lentes de Contato", "Uveíte", "Neuro-oftalmologia",
+    "Visão Subnormal", "Oncologia Ocular", "Oftalmologia Geral",
+]
+SPECIALTY_WEIGHTS = [14, 10, 10, 7, 6, 4, 4, 8, 3, 2, 2, 1, 1, 28]
+IMAGES = [
+    "https://images.unsplash.com/photo-1612349317150-e413f6a5b16d?auto=format&fit=crop&q=80&w=800",
+    "https://images.unsplash.com/photo-1594824476967-48c8b964273f?auto=format&fit=crop&q=80&w=800",
+    "https://images.unsplash.com/photo-1537368910025-700350fe46c7?auto=format&fit=crop&q=80&w=800",
+    "https://images.unsplash.com/photo-1559839734-2b71ea197ec2?auto=format&fit=crop&q=80&w=800",
+]
+
+EVENT_KINDS = ["Simpósio", "Jornada", "Curso", "Congresso", "Workshop", "Encontro", "Mutirão", "Webinar"]
+EVENT_TOPICS = ["de Retina", "de Glaucoma", "de Catarata", "de Oftalmopediatria", "de Córnea", "de Cirurgia Refrativa",
+                "Paraense de Oftalmologia", "Amazônico de Oftalmologia", "de Plástica Ocular", "de Prevenção à Cegueira"]
+VENUES = ["Hangar Centro de Convenções", "Auditório da S.P.O.", "Centro de Eventos Benedito Nunes",
+          "Hotel Princesa Louçã", "Praça da República", "Teatro da Paz", "Auditório do Hospital Universitário"]
+STATUSES = ["Inscrições Abertas", "Poucas Vagas", "Gratuito", "Esgotado", "Encerrado"]
+TIMES = [("08:00 - 18:00", 8, 18), ("09:00 - 17:00", 9, 17), ("08:00 - 14:00", 8, 14), ("14h às 18h", 14, 18),
+         ("19h", 19, None), ("8h30 às 12h", 8.5, 12)]
+MONTHS = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+          "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+
+DOCTOR_COLUMNS = ("id", "name", "city", "specialty", "contact_info", "image_url", "created_at")
+EVENT_COLUMNS = ("id", "title", "date", "time", "location", "description", "image_url", "external_link", "status",
+                 "created_at", "starts_at", "ends_at")
+
+
+_CLOCK = [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)]
+_VARIANT = {digit: "89ab"[int(digit, 16) & 3] for digit in "0123456789abcdef"}
+
+
+def _table(values: Sequence, weights: Optional[Sequence[float]] = None) -> List:
+    """65536-entry lookup table: indexing it with a random uint16 draws from `values`.
+
+    `random.choices` costs ~0.2 us per element and column; a table lookup
+    driven by one `randbytes` call per column is several times cheaper.
+    """
+    weights = weights or [1] * len(values)
+    total = sum(weights)
+    table: List = []
+    cumulative = 0.0
+    for value, weight in zip(values, weights):
+        cumulative += weight
+        table.extend([value] * (round(65536 * cumulative / total) - len(table)))
+    return table
+
+
+def _draw(rnd: random.Random, table: List, count: int) -> List:
+    return [table[i] for i in memoryview(rnd.randbytes(2 * count)).cast("H")]
+
+
+def _numbers(rnd: random.Random, count: int) -> List[int]:
+    """`count` random 32-bit integers."""
+    return memoryview(rnd.randbytes(4 * count)).cast("I").tolist()
+
+
+def _ids(rnd: random.Random, count: int) -> List[str]:
+    # uuid4 text from one randbytes() call: uuid.UUID() per row costs more than the rest of the row
+    digits = rnd.randbytes(16 * count).hex()
+    return [
+        f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{_VARIANT[h[16]]}{h[17:20]}-{h[20:]}"
+        for h in (digits[i:i + 32] for i in range(0, 32 * count, 32))
+    ]
+
+
+def _timestamps(rnd: random.Random, count: int, anchor: datetime, span_days: int) -> List[str]:
+    """`count` times in the `span_days` before `anchor`, in the DB_FORMAT text SQLAlchemy stores."""
+    days = _table([f"{anchor - timedelta(days=d):%Y-%m-%d}" for d in range(1, span_days + 1)])
+    return [
+        f"{day} {_CLOCK[s % 86400]}.{us % 1_000_000:06d}"
+        for day, s, us in zip(_draw(rnd, days, count), _numbers(rnd, count), _numbers(rnd, count))
+    ]
+
+
+def doctor_chunk(start: int, n: int, seed: int, anchor: datetime) -> List[Tuple]:
+    """Doctor rows `start` to `start + n` in DOCTOR_COLUMNS order, sorted by id."""
+    rnd = random.Random(f"doctors:{seed}:{start}")
+    area_codes = {city: code for city, code, _ in CITIES}
+    handles = {name: search.fold(name).replace(" ", "") for name in (*FIRST_MALE, *FIRST_FEMALE, *SURNAMES)}
+    cities = _table([city for city, _, _ in CITIES], [weight for _, _, weight in CITIES])
+    specialties = _table(SPECIALTIES, SPECIALTY_WEIGHTS)
+    images = _table((None, *IMAGES), (9 * len(IMAGES), *[1] * len(IMAGES)))
+    female, first_female, first_male = _table((True, False)), _table(FIRST_FEMALE), _table(FIRST_MALE)
+    middle, surnames, contact_kinds = _table(MIDDLE), _table(SURNAMES), _table((0, 1, 2), (2, 3, 1))
+    names, contacts = [], []
+    row_cities = _draw(rnd, cities, n)
+    for is_female, fm, mm, mid, s1, s2, city, kind, number in zip(
+        _draw(rnd, female, n), _draw(rnd, first_female, n), _draw(rnd, first_male, n), _draw(rnd, middle, n),
+        _draw(rnd, surnames, n), _draw(rnd, surnames, n), row_cities, _draw(rnd, contact_kinds, n),
+        _numbers(rnd, n),
+    ):
+        first = fm if is_female else mm
+        names.append(f"{'Dra.' if is_female else 'Dr.'} {first}{mid} {s1} {s2}")
+        code = area_codes[city]
+        if kind == 0:
+            contacts.append(f"({code}) 3{number // 10**4 % 1000:03d}-{number % 10**4:04d}")
+        elif kind == 1:
+            contacts.append(f"({code}) 9{number // 10**4 % 10**4:04d}-{number % 10**4:04d}")
+        else:
+            contacts.append(f"({code}) 9{number // 10**4 % 10**4:04d}-{number % 10**4:04d} / "
+                            f"{handles[first]}.{handles[s2]}@oftalmo.med.br")
+    rows = list(zip(
+        _ids(rnd, n), names, row_cities, _draw(rnd, specialties, n), contacts, _draw(rnd, images, n),
+        _timestamps(rnd, n, anchor, 3 * 365),
+    ))
+    # Ordered by id, the primary-key index is filled page by page, not at random
+    rows.sort()
+    return rows
+
+
+def _date_text(style: int, first: date, last: date) -> str:
+    if style == 0 or first == last:
+        return f"{first.day:02d} de {MONTHS[first.month - 1]}, {first.year}"
+    if style == 1 and first.month == last.month:
+        return f"{first.day}-{last.day} de {MONTHS[first.month - 1]}, {first.year}"
+    if style == 2:
+        return f"{first:%d/%m/%Y} - {last:%d/%m/%Y}"
+    return f"{first.day} de {MONTHS[first.month - 1].lower()} a {last.day} de {MONTHS[last.month - 1].lower()} de {last.year}"
+
+
+def event_chunk(start: int, n: int, seed: int, anchor: datetime) -> List[Tuple]:
+    """Event rows `start` to `start + n` in EVENT_COLUMNS order, dated within a year of `anchor`, sorted by id."""
+    rnd = random.Random(f"events:{seed}:{start}")
+    first_days = _table([anchor.date() + timedelta(days=offset) for offset in range(-365, 366)])
+    kinds, topics, venues = _table(EVENT_KINDS), _table(EVENT_TOPICS), _table(VENUES)
+    cities = _table([city for city, _, _ in CITIES], [weight for _, _, weight in CITIES])
+    statuses, lengths, times = _table(STATUSES), _table((1, 2, 3), (3, 1, 1)), _table(TIMES)
+    styles = _table(range(4))
+    images, links = _table((None, *IMAGES), (7 * len(IMAGES), *[3] * len(IMAGES))), _table((False, True))
+    rows = []
+    for i, event_id, kind, topic, venue, city, status, first, days, (time_text, begin, end), style, image, \
+            link, created in zip(
+                range(start, start + n), _ids(rnd, n), _draw(rnd, kinds, n), _draw(rnd, topics, n),
+                _draw(rnd, venues, n), _draw(rnd, cities, n), _draw(rnd, statuses, n), _draw(rnd, first_days, n),
+                _draw(rnd, lengths, n), _draw(rnd, times, n), _draw(rnd, styles, n), _draw(rnd, images, n),
+                _draw(rnd, links, n), _timestamps(rnd, n, anchor, 2 * 365)):
+        # A single date in the text means a one-day event, whatever was drawn
+        last = first + timedelta(days=days - 1) if style else first
+        # What event_dates.parse_window() derives from the date and time text
+        ends_at = f"{last} {end:02d}:00:00.000000" if end is not None else f"{last} 23:59:59.000000"
+        rows.append((
+            event_id,
+            f"{i % 40 + 1}º {kind} {topic}",
+            _date_text(style, first, last),
+            time_text,
+            f"{venue}, {city}",
+            f"{kind} {topic.split(' ', 1)[-1]} com palestras, discussão de casos e atividades práticas.",
+            image,
+            f"https://spo.org.br/eventos/{i}" if link else None,
+            status,
+            created,
+            f"{first} {int(begin):02d}:{int(begin % 1 * 60):02d}:00.000000",
+            ends_at,
+        ))
+    rows.sort()
+    return rows
+
+
+def _chunks(make: Callable[..., List[Tuple]], count: int, seed: int, anchor: Optional[datetime], chunk: int,
+            workers: int) -> Iterator[List[Tuple]]:
+    anchor = anchor or datetime(2026, 1, 1)
+    starts = range(0, count, chunk)
+    if workers <= 1:
+        for start in starts:
+            yield make(start, min(chunk, count - start), seed, anchor)
+        return
+    # Each chunk has its own seed, so the rows do not depend on how many workers built them
+    with ProcessPoolExecutor(workers) as pool:
+        pending: Deque[Future] = deque()
+        for start in starts:
+            pending.append(pool.submit(make, start, min(chunk, count - start), seed, anchor))
+            if len(pending) > 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def doctor_rows(count: int, seed: int = 42, anchor: Optional[datetime] = None, chunk: int = CHUNK,
+                workers: int = 1) -> Iterator[List[Tuple]]:
+    """Chunks of doctor rows, each sorted by id."""
+    return _chunks(doctor_chunk, count, seed, anchor, chunk, workers)
+
+
+def event_rows(count: int, seed: int = 42, anchor: Optional[datetime] = None, chunk: int = CHUNK,
+               workers: int = 1) -> Iterator[List[Tuple]]:
+    """Chunks of event rows, each sorted by id."""
+    return _chunks(event_chunk, count, seed, anchor, chunk, workers)
+
+
+def _ensure_schema(db_path: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        present = conn.execute("SELECT count(*) FROM sqlite_master WHERE name IN ('doctors', 'events')").fetchone()[0]
+        keyed = any(row[1] == "seq" for row in conn.execute("PRAGMA table_info(doctors)"))
+    finally:
+        conn.close()
+    if present == 2 and keyed:
+        return
+    # A new database, or one from before 0002_doctor_seq (whose search index
+    # the rebuild below could not fill): let the application create or migrate its tables
+    os.environ.setdefault("DB_PATH", db_path)
+    from sqlalchemy import create_engine
+    from server import ensure_schema
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.begin() as conn:
+        ensure_schema(conn)
+    engine.dispose()
+
+
+def _insert(cursor, table: str, columns: Sequence[str], chunks: Iterator[List[Tuple]]) -> int:
+    sql = f"INSERT INTO {table}({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    total = 0
+    for rows in chunks:
+        cursor.executemany(sql, rows)
+        total += len(rows)
+    return total
+
+
+def generate(db_path: str, doctors: int, events: int, seed: int = 42, anchor: Optional[datetime] = None,
+             replace: bool = False, workers: int = 1) -> Tuple[int, int]:
+    """Write the rows in one transaction; returns (doctors, events) inserted."""
+    _ensure_schema(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA cache_size=-262144")
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            for trigger in (*search.TRIGGERS, *facets.TRIGGERS):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            if replace:
+                cursor.execute("DELETE FROM doctors")
+                cursor.execute("DELETE FROM events")
+            inserted = (
+                _insert(cursor, "doctors", DOCTOR_COLUMNS, doctor_rows(doctors, seed, anchor, workers=workers)),
+                _insert(cursor, "events", EVENT_COLUMNS, event_rows(events, seed, anchor, workers=workers)),
+            )
+            # Missing triggers make both rebuild from the table, in one pass each
+            search.ensure_search_index(conn)
+            facets.ensure_facets(conn)
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.environ.get("DB_PATH", DEFAULT_DB))
+    parser.add_argument("--doctors", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=None, help="default: a tenth of --doctors")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=date.fromisoformat, default=date(2026, 1, 1),
+                        help="events are dated within a year of this day (default 2026-01-01)")
+    parser.add_argument("--replace", action="store_true", help="delete existing doctors and events first")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="processes building rows while this one inserts them (the rows do not depend on it)")
+    args = parser.parse_args()
+    events = args.events if args.events is not None else args.doctors // 10
+
+    start = time.perf_counter()
+    doctors, events = generate(args.db, args.doctors, events, args.seed,
+                               datetime.combine(args.anchor, datetime.min.time()), args.replace, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"{doctors:,} doctors and {events:,} events in {elapsed:.1f}s "
+          f"({(doctors + events) / elapsed:,.0f} rows/s) -> {args.db}")
+    # Running workers drop their cached listings and rebuild the typeahead index
+    versions = cache.DataVersions(cache.default_version_dir())
+    versions.bump("doctors")
+    versions.bump("events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""One-time database initialization: the schema and the first admin account.
+
+Run once per deployment, before the workers start (the Dockerfile does).
+Workers then find the schema version current and boot without running any
+DDL or hashing a password (see backend/schema.py).
+
+The admin account is only created if it does not exist; an existing
+password is never reset. Set ADMIN_PASSWORD (or pass --admin-password)
+for anything but a local setup; an empty or blank ADMIN_PASSWORD, which
+docker-compose passes on when the variable is not set, counts as unset.
+
+    python scripts/init_db.py
+    ADMIN_PASSWORD=... python scripts/init_db.py --admin-email secretaria@spo.org.br
+    python scripts/init_db.py --force    # recreate missing triggers/indexes even if the version matches
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+DEFAULT_ADMIN_EMAIL = "admin@medassoc.com"
+DEFAULT_ADMIN_PASSWORD = "admin123"
+
+
+async def init(email, password, full_name, force):
+    import server
+    from sqlalchemy import select
+
+    try:
+        async with server.engine.begin() as conn:
+            bootstrapped = await conn.run_sync(server.ensure_schema, force)
+        # A one-off command can hold on until the backfills are done (see scripts/migrate.py)
+        await server.run_backfills(server.make_backfiller())
+        print(f"Schema {'bootstrapped' if bootstrapped else 'is current'} (version {server.schema_version()})")
+
+        async with server.AsyncSessionLocal() as session:
+            result = await session.execute(select(server.UserModel).where(server.UserModel.username == email))
+            if result.scalars().first() is not None:
+                print(f"Admin user {email} already exists")
+                return
+            session.add(server.UserModel(
+                username=email, full_name=full_name, hashed_password=await server.password_hasher.hash(password),
+            ))
+            await session.commit()
+            print(f"Admin user {email} created")
+    finally:
+        server.password_hasher.shutdown()
+        await server.engine.dispose()
+        await server.read_engine.dispose()
+
+
+def env_admin_password():
+    password = os.environ.get("ADMIN_PASSWORD", "")
+    return password if password.strip() else DEFAULT_ADMIN_PASSWORD
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--admin-email", default=os.environ.get("ADMIN_EMAIL", DEFAULT_ADMIN_EMAIL))
+    parser.add_argument("--admin-password", default=env_admin_password())
+    parser.add_argument("--admin-name", default="Admin")
+    parser.add_argument("--force", action="store_true", help="run the schema bootstrap even if the version matches")
+    args = parser.parse_args()
+    if not args.admin_password.strip():
+        parser.error("--admin-password must not be empty")
+    if args.admin_password == DEFAULT_ADMIN_PASSWORD:
+        print("⚠️  Using the default admin password. Set ADMIN_PASSWORD in production.")
+    asyncio.run(init(args.admin_email, args.admin_password, args.admin_name, args.force))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Apply pending schema migrations in place and run their backfills.
+
+The schema changes are additive and applied in one short transaction; the
+backfills then run in small batches next to the live site (see
+backend/migrations.py). Workers resume unfinished backfills by themselves
+when they start, so this is for doing it ahead of a deploy, watching the
+progress, or tuning the pace. Ctrl-C stops after the current batch; run it
+again to resume from there.
+
+    python scripts/migrate.py
+    python scripts/migrate.py --status
+    python scripts/migrate.py --batch-size 200 --pause-ms 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+async def migrate(args):
+    import migrations
+    import schema
+    import server
+
+    try:
+        if args.status:
+            async with server.read_engine.connect() as conn:
+                stored = await conn.run_sync(schema.stored_version)
+                rows = await conn.run_sync(migrations.status)
+            print(f"schema version {stored} (this code: {server.schema_version()})")
+            for row in rows:
+                state = f"done {row['finished_at']}" if row["finished_at"] else f"backfilling, at rowid {row['backfill_after']}"
+                print(f"  {row['name']:<28} applied {row['applied_at']}  {state}  ({row['rows_changed']} rows changed)")
+            return
+
+        async with server.engine.begin() as conn:
+            await conn.run_sync(server.ensure_schema, args.force)
+            pending = await conn.run_sync(migrations.pending)
+        if not pending:
+            print("Nothing to backfill")
+            return
+
+        backfiller = server.make_backfiller()
+        if args.batch_size:
+            backfiller.batch_size = args.batch_size
+        if args.pause_ms is not None:
+            backfiller.pause = args.pause_ms / 1000
+        last_report = [0.0]
+
+        def progress(name, rowid, changed):
+            if time.monotonic() - last_report[0] >= 1:
+                last_report[0] = time.monotonic()
+                print(f"  {name}: at rowid {rowid:,}, {changed:,} rows changed", flush=True)
+
+        started = time.perf_counter()
+        try:
+            finished = await server.run_backfills(backfiller, progress)
+        except asyncio.CancelledError:
+            backfiller.stop()
+            print("Stopping after the current batch; run again to resume")
+            raise
+        print(f"Backfills {'finished' if finished else 'stopped'} after {time.perf_counter() - started:.1f}s: {pending}")
+    finally:
+        await server.engine.dispose()
+        await server.read_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="show applied migrations and backfill progress")
+    parser.add_argument("--force", action="store_true", help="run the schema bootstrap even if the version matches")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="rows per transaction (default MIGRATION_BATCH_SIZE or 500)")
+    parser.add_argument("--pause-ms", type=float, default=None,
+                        help="sleep between batches (default MIGRATION_PAUSE_MS or 50)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(migrate(args))
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
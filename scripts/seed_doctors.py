@@ -1,14 +1,15 @@
+import argparse
 import asyncio
 import sys
 import os
-import uuid
-from datetime import datetime
 
 # Ensure backend path is in sys.path
 sys.path.append("/app/backend")
 
-from server import DoctorModel, EventModel, AsyncSessionLocal, engine
-from sqlalchemy import text
+from server import (
+    engine, backfill_event_windows, ensure_schema, make_backfiller, response_cache, run_backfills,
+)
+import datasync
 
 doctors_data = [
     {
@@ -81,50 +82,33 @@ events_data = [
     }
 ]
 
-async def seed():
-    print("Starting seed (Dropping tables to update schema)...")
-    
-    # We need to drop tables to ensure schema update since we added a column
-    async with engine.begin() as conn:
-        await conn.run_sync(EventModel.metadata.drop_all)
-        await conn.run_sync(DoctorModel.metadata.drop_all)
-        await conn.run_sync(EventModel.metadata.create_all)
-        await conn.run_sync(DoctorModel.metadata.create_all)
-
-    async with AsyncSessionLocal() as session:
-        # Insert doctors
-        print("Inserting doctors...")
-        for doc in doctors_data:
-            new_doc = DoctorModel(
-                id=str(uuid.uuid4()),
-                name=doc["name"],
-                city=doc["city"],
-                specialty=doc["specialty"],
-                contact_info=doc["contact_info"],
-                image_url=doc["image_url"],
-                created_at=datetime.utcnow()
-            )
-            session.add(new_doc)
+def _sync_tables(conn, delete_missing):
+    cursor = conn.connection.cursor()
+    return [
+        datasync.sync_table(cursor, "doctors", datasync.DOCTOR_KEY, doctors_data, delete_missing),
+        datasync.sync_table(cursor, "events", datasync.EVENT_KEY, events_data, delete_missing),
+    ]
 
-        # Insert events
-        print("Inserting events...")
-        for evt in events_data:
-            new_evt = EventModel(
-                id=str(uuid.uuid4()),
-                title=evt["title"],
-                date=evt["date"],
-                time=evt["time"],
-                location=evt["location"],
-                description=evt["description"],
-                image_url=evt["image_url"],
-                status=evt["status"],
-                external_link=evt["external_link"],
-                created_at=datetime.utcnow()
-            )
-            session.add(new_evt)
-        
-        await session.commit()
-    print("Seed complete!")
+async def sync(delete_missing=True):
+    # No drop: the schema is migrated in place (see migrations.py), only the
+    # diff is written, in one transaction, and ids survive
+    async with engine.begin() as conn:
+        await conn.run_sync(ensure_schema)
+    await run_backfills(make_backfiller())
+    async with engine.begin() as conn:
+        diffs = await conn.run_sync(_sync_tables, delete_missing)
+        # Raw SQL writes: derive starts_at/ends_at of new or changed events
+        await conn.run_sync(backfill_event_windows)
+    for diff in diffs:
+        print(diff.summary())
+        if diff.changed:
+            response_cache.bump(diff.table)
+    await engine.dispose()
 
 if __name__ == "__main__":
-    asyncio.run(seed())
+    parser = argparse.ArgumentParser(
+        description="Seed the directory with example data, in place. Without --sync, other rows are kept.")
+    parser.add_argument("--sync", action="store_true", help="also delete rows that are not in the seed data")
+    parser.add_argument("--keep-extra", action="store_true", help="with --sync, keep rows that are not in the seed data")
+    args = parser.parse_args()
+    asyncio.run(sync(delete_missing=args.sync and not args.keep_extra))
@@ -1,8 +1,18 @@
+import argparse
+import os
 import sqlite3
+import sys
 import uuid
 import datetime
+from pathlib import Path
 
-DB_PATH = "/app/backend/medassoc.db"
+sys.path.append(str(Path(__file__).resolve().parent.parent / "backend"))
+
+import cache  # noqa: E402
+import datasync  # noqa: E402
+import event_dates  # noqa: E402
+
+DB_PATH = os.environ.get("DB_PATH", "/app/backend/medassoc.db")
 
 # Single real doctor
 doctors_data = [
@@ -108,7 +118,7 @@ events_data = [
     }
 ]
 
-def seed():
+def seed(reset=False, delete_missing=False):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
@@ -125,7 +135,8 @@ def seed():
     
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS doctors (
-            id TEXT PRIMARY KEY,
+            seq INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
             name TEXT,
             city TEXT,
             specialty TEXT,
@@ -146,7 +157,9 @@ def seed():
             image_url TEXT,
             status TEXT,
             external_link TEXT,
-            created_at TIMESTAMP
+            created_at TIMESTAMP,
+            starts_at DATETIME,
+            ends_at DATETIME
         )
     ''')
 
@@ -158,6 +171,12 @@ def seed():
     except Exception as e:
         print(f"Error inserting admin: {e}")
 
+    if not reset:
+        conn.commit()
+        sync_data(conn, delete_missing)
+        conn.close()
+        return
+
     # Clear existing doctors
     cursor.execute("DELETE FROM doctors")
     print("Cleared existing doctors.")
@@ -173,10 +192,50 @@ def seed():
     for evt in events_data:
         cursor.execute("INSERT INTO events (id, title, date, time, location, description, image_url, status, external_link, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
                        (str(uuid.uuid4()), evt["title"], evt["date"], evt["time"], evt["location"], evt["description"], evt["image_url"], evt["status"], evt["external_link"], datetime.datetime.utcnow()))
+    backfill_event_windows(cursor)
 
     conn.commit()
     conn.close()
     print("Sync seed complete.")
 
+def backfill_event_windows(cursor):
+    # Raw SQL writes: derive starts_at/ends_at of new or changed events. A
+    # database from before those columns gets them, backfilled, from the
+    # server's 0001_event_windows migration instead.
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(events)")}
+    if {"starts_at", "ends_at"} <= columns:
+        event_dates.backfill(cursor)
+
+def sync_data(conn, delete_missing=True):
+    # Only the diff is written, in one transaction; ids of unchanged rows survive
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        diffs = [
+            datasync.sync_table(cursor, "doctors", datasync.DOCTOR_KEY, doctors_data, delete_missing),
+            datasync.sync_table(cursor, "events", datasync.EVENT_KEY, events_data, delete_missing),
+        ]
+        backfill_event_windows(cursor)
+        cursor.execute("COMMIT")
+    except BaseException:
+        cursor.execute("ROLLBACK")
+        raise
+    # Running workers drop their cached listings of the changed tables
+    versions = cache.DataVersions(cache.default_version_dir())
+    for diff in diffs:
+        print(diff.summary())
+        if diff.changed:
+            versions.bump(diff.table)
+    return diffs
+
 if __name__ == "__main__":
-    seed()
+    # Same flags as seed_doctors.py
+    parser = argparse.ArgumentParser(
+        description="Seed the directory data, in place. Without --sync, other rows are kept.")
+    parser.add_argument("--sync", action="store_true", help="also delete rows that are not in the seed data")
+    parser.add_argument("--keep-extra", action="store_true", help="with --sync, keep rows that are not in the seed data")
+    parser.add_argument("--reset", action="store_true",
+                        help="delete every doctor and event and insert the seed data under new ids")
+    args = parser.parse_args()
+    seed(reset=args.reset, delete_missing=args.sync and not args.keep_extra)
@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+import pytest
+
+# The app reads its configuration at import time: point every file it
+# writes at a throwaway directory before anything imports it.
+_TMP = tempfile.mkdtemp(prefix="spo-tests-")
+os.environ.update({
+    "DB_PATH": os.path.join(_TMP, "test.db"),
+    "UPLOAD_DIR": os.path.join(_TMP, "uploads"),
+    "IMG_CACHE_DIR": os.path.join(_TMP, "img-cache"),
+    "CACHE_VERSION_DIR": os.path.join(_TMP, "versions"),
+    "METRICS_DIR": os.path.join(_TMP, "metrics"),
+    "SLOW_QUERY_LOG": os.path.join(_TMP, "logs", "slow_queries.log"),
+    "RATE_LIMIT_STORAGE": f"sqlite:///{os.path.join(_TMP, 'ratelimit.db')}",
+    "BACKUP_DIR": os.path.join(_TMP, "backups"),
+    "CORS_ORIGINS": "http://a.example,http://b.example",
+    "SECRET_KEY": "test-" + uuid.uuid4().hex,
+})
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+USERNAME = "tests@medassoc.com"
+PASSWORD = "test-password"
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server
+
+    return server
+
+
+@pytest.fixture(scope="session")
+def client(server):
+    """One app for the whole run; tests use unique values so they can share its database."""
+    import bcrypt
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as client:
+        db = sqlite3.connect(server.DB_PATH)
+        with db:
+            db.execute(
+                "INSERT INTO users(id, username, full_name, hashed_password, disabled) VALUES (?, ?, ?, ?, 0)",
+                (str(uuid.uuid4()), USERNAME, "Tests", bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()),
+            )
+        db.close()
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    response = client.post("/api/auth/login", data={"username": USERNAME, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,52 @@
+import sqlite3
+import uuid
+
+import bcrypt
+from sqlalchemy import select
+
+import auth_cache
+import cache
+
+
+def test_entries_follow_the_users_version(tmp_path):
+    versions = cache.DataVersions(str(tmp_path))
+    principals = auth_cache.PrincipalCache(versions, trust_window=60)
+    principals.put("token", "principal", "ana", token_expires_at=2e9, users_version=versions.current("users"))
+    entry = principals.get("token")
+    assert principals.trusted(entry)
+
+    principals.put("other", "principal", "bia", token_expires_at=2e9, users_version=versions.current("users"))
+    principals.invalidate_user("ana")
+    assert principals.get("token") is None
+    # Other workers only learn through the version: bia must be re-read too
+    assert not principals.trusted(principals.get("other"))
+
+
+def test_expired_token_is_not_served(tmp_path):
+    principals = auth_cache.PrincipalCache(cache.DataVersions(str(tmp_path)))
+    principals.put("token", "principal", "ana", token_expires_at=0, users_version=0)
+    assert principals.get("token") is None
+
+
+def test_disabling_a_user_locks_out_a_cached_token(client, server):
+    username, password = f"{uuid.uuid4().hex[:8]}@medassoc.com", "pw"
+    db = sqlite3.connect(server.DB_PATH)
+    with db:
+        db.execute(
+            "INSERT INTO users(id, username, full_name, hashed_password, disabled) VALUES (?, ?, ?, ?, 0)",
+            (str(uuid.uuid4()), username, "Tmp", bcrypt.hashpw(password.encode(), bcrypt.gensalt(4)).decode()),
+        )
+    db.close()
+    token = client.post("/api/auth/login", data={"username": username, "password": password}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    missing = f"/api/doctors/{uuid.uuid4()}"
+    # 404 rather than 401: authenticated, and the principal is now cached
+    assert client.delete(missing, headers=headers).status_code == 404
+    assert client.delete(missing, headers=headers).status_code == 404
+
+    async def disable(session):
+        user = (await session.execute(select(server.UserModel).where(server.UserModel.username == username))).scalars().one()
+        user.disabled = True
+
+    client.portal.call(server.db_writer.submit, disable)
+    assert client.delete(missing, headers=headers).status_code == 401
@@ -0,0 +1,69 @@
+import fcntl
+import os
+import sqlite3
+
+import pytest
+
+import backups
+
+
+def _database(tmp_path, rows=500):
+    path = str(tmp_path / "live.db")
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)")
+    conn.executemany("INSERT INTO notes(body) VALUES (?)", [(f"note {i}" * 20,) for i in range(rows)])
+    return path, conn
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_snapshot_and_restore(tmp_path, compress):
+    path, conn = _database(tmp_path)
+    manager = backups.BackupManager(path, str(tmp_path / "backups"), compress=compress, pages=4, pause=0)
+    steps = []
+    snapshot = manager.snapshot(progress=lambda done, total: steps.append((done, total)))
+    assert snapshot.path.endswith(".db.gz" if compress else ".db")
+    assert len(steps) > 1 and steps[-1][0] == steps[-1][1]
+    assert not [name for name in os.listdir(manager.directory) if name.endswith(".partial")]
+    assert manager.list() == [snapshot]
+
+    conn.execute("DELETE FROM notes")
+    conn.close()
+    backups.restore(snapshot.path, path)
+    restored = sqlite3.connect(path)
+    assert restored.execute("SELECT count(*) FROM notes").fetchone()[0] == 500
+    assert restored.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_snapshot_prunes_to_keep(tmp_path):
+    path, _ = _database(tmp_path, rows=10)
+    directory = tmp_path / "backups"
+    directory.mkdir()
+    old = [f"live-2024010{day}T000000Z.db.gz" for day in range(1, 6)]
+    for name in old:
+        (directory / name).write_bytes(b"")
+    (directory / "unrelated.db").write_bytes(b"")
+    manager = backups.BackupManager(path, str(directory), keep=3, pause=0)
+
+    snapshot = manager.snapshot()
+    names = [os.path.basename(s.path) for s in manager.list()]
+    assert names == [os.path.basename(snapshot.path), old[4], old[3]]
+    assert (directory / "unrelated.db").exists()
+
+
+def test_max_age_reuses_a_recent_snapshot(tmp_path):
+    path, _ = _database(tmp_path, rows=10)
+    manager = backups.BackupManager(path, str(tmp_path / "backups"), pause=0)
+    first = manager.snapshot()
+    assert manager.snapshot(max_age=3600) == first
+    assert len(manager.list()) == 1
+
+
+def test_concurrent_snapshot_is_refused(tmp_path):
+    path, _ = _database(tmp_path, rows=10)
+    manager = backups.BackupManager(path, str(tmp_path / "backups"), pause=0)
+    os.makedirs(manager.directory)
+    with open(os.path.join(manager.directory, ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        with pytest.raises(backups.BackupBusy):
+            manager.snapshot()
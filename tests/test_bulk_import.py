@@ -0,0 +1,74 @@
+import asyncio
+import time
+import uuid
+
+import bulk_import
+
+
+async def _stream(data: bytes, size: int = 7):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _records(text: str):
+    async def collect():
+        return [(line, record) async for line, record in bulk_import._csv_records(_stream(text.encode()))]
+
+    return asyncio.run(collect())
+
+
+def test_quoted_fields_may_hold_commas_quotes_and_newlines():
+    records = _records('name,city\n"Souza, Maria","Belém"\n"Dr. ""Zé""","linha 1\nlinha 2"\nAna,Marabá\n')
+    assert records == [
+        (2, {"name": "Souza, Maria", "city": "Belém"}),
+        (3, {"name": 'Dr. "Zé"', "city": "linha 1\nlinha 2"}),
+        (5, {"name": "Ana", "city": "Marabá"}),
+    ]
+
+
+def test_quote_inside_a_plain_field_is_literal():
+    assert _records('name,city\nDr. A 5" tall,Belem\nB,Belem\n') == [
+        (2, {"name": 'Dr. A 5" tall', "city": "Belem"}),
+        (3, {"name": "B", "city": "Belem"}),
+    ]
+
+
+def test_unterminated_quote_costs_one_row():
+    text = 'name,city\n"Dr. A,Belem\n' + "".join(f"Dr. {i},Belem\n" for i in range(20000))
+    started = time.perf_counter()
+    records = _records(text)
+    assert time.perf_counter() - started < 10
+    line, error = records[0]
+    assert line == 2 and isinstance(error, ValueError)
+    assert len(records) == 20001
+    assert records[-1] == (20002, {"name": "Dr. 19999", "city": "Belem"})
+
+
+def test_extra_fields_are_reported():
+    line, error = _records("name,city\nA,Belem,extra\n")[0]
+    assert line == 2 and "3 fields" in str(error)
+
+
+def test_failed_import_reports_the_rows_already_written(client, server, auth_headers, monkeypatch):
+    monkeypatch.setattr(server, "IMPORT_CHUNK_ROWS", 2)
+    city = f"Importópolis {uuid.uuid4().hex[:8]}"
+    rows = "".join(f"Dr. {i},{city},Retina,-\n" for i in range(5))
+    data = f"name,city,specialty,contact_info\n{rows}".encode() + b"Dr. \xff,Belem,Retina,-\n"
+    response = client.post("/api/doctors/import", content=data,
+                           headers={**auth_headers, "Content-Type": "text/csv"})
+    assert response.status_code == 400
+    body = response.json()
+    assert body["error"] == "The upload is not valid UTF-8 (line 7)."
+    listed = client.get("/api/doctors", params={"city": city}).json()
+    assert 0 < body["inserted"] == len(listed)
+
+
+def test_import_reports_rejected_rows(client, auth_headers):
+    city = f"Importópolis {uuid.uuid4().hex[:8]}"
+    csv_text = f'name,city,specialty,contact_info\n"Dr. A",{city},Retina,-\nDr. B,{city}\n'
+    response = client.post("/api/doctors/import", params={"format": "csv"}, content=csv_text.encode(),
+                           headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["inserted"] == 1 and body["rejected"] == 1
+    assert body["errors"][0]["line"] == 3
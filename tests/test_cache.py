@@ -0,0 +1,82 @@
+import os
+import threading
+import uuid
+
+import cache
+
+
+def test_cached_listing_gets_cors_headers_per_origin(client):
+    city = f"Cors {uuid.uuid4().hex[:8]}"
+    responses = [
+        client.get("/api/doctors", params={"city": city}, headers=headers)
+        for headers in ({}, {"Origin": "http://a.example"}, {"Origin": "http://b.example"})
+    ]
+    assert all(response.status_code == 200 for response in responses)
+    assert "access-control-allow-origin" not in responses[0].headers
+    assert responses[1].headers["access-control-allow-origin"] == "http://a.example"
+    assert responses[2].headers["access-control-allow-origin"] == "http://b.example"
+    assert "Origin" in responses[2].headers["vary"]
+
+
+def test_doctor_writes_invalidate_cached_listings(client, auth_headers):
+    city = f"Cache {uuid.uuid4().hex[:8]}"
+    listing = {"city": city}
+    first = client.get("/api/doctors", params=listing)
+    assert first.json() == []
+    assert client.get("/api/doctors", params=listing, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+    doctor = {"name": "Dra. Cache", "city": city, "specialty": "Retina", "contact_info": "-"}
+    created = client.post("/api/doctors", json=doctor, headers=auth_headers).json()
+    after_create = client.get("/api/doctors", params=listing, headers={"If-None-Match": first.headers["etag"]})
+    assert after_create.status_code == 200
+    assert [d["name"] for d in after_create.json()] == ["Dra. Cache"]
+
+    client.put(f"/api/doctors/{created['id']}", json={"name": "Dra. Cache Renomeada"}, headers=auth_headers)
+    assert [d["name"] for d in client.get("/api/doctors", params=listing).json()] == ["Dra. Cache Renomeada"]
+
+    client.delete(f"/api/doctors/{created['id']}", headers=auth_headers)
+    assert client.get("/api/doctors", params=listing).json() == []
+
+
+def test_event_writes_invalidate_cached_listings(client, auth_headers):
+    title = f"Cache {uuid.uuid4().hex[:8]}"
+
+    def titles():
+        events = client.get("/api/events", params={"limit": 500}).json()
+        return [event["title"] for event in events if event["title"].startswith(title)]
+
+    assert titles() == []
+    event = {"title": title, "date": "1 de Junho, 2030", "time": "09:00", "location": "Belém",
+             "description": "-", "status": "Aberto"}
+    created = client.post("/api/events", json=event, headers=auth_headers).json()
+    assert titles() == [title]
+
+    client.put(f"/api/events/{created['id']}", json={"title": title + " (adiado)"}, headers=auth_headers)
+    assert titles() == [title + " (adiado)"]
+
+    client.delete(f"/api/events/{created['id']}", headers=auth_headers)
+    assert titles() == []
+
+
+def test_concurrent_bumps_each_replace_the_one_before(tmp_path):
+    # One DataVersions per thread, as each worker process has its own
+    def bump_many(results):
+        versions = cache.DataVersions(str(tmp_path))
+        results.extend(versions.advance("doctors") for _ in range(50))
+
+    results = []
+    threads = [threading.Thread(target=bump_many, args=(results,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    chain = sorted(results, key=lambda pair: pair[1])
+    assert chain[0][0] == 0
+    assert all(previous == before for (previous, _), (_, before) in zip(chain[1:], chain))
+    assert cache.DataVersions(str(tmp_path)).current("doctors") == chain[-1][1]
+
+
+def test_scripts_and_server_share_the_version_directory(server, monkeypatch):
+    assert cache.default_version_dir() == server.data_versions.directory
+    monkeypatch.delenv("CACHE_VERSION_DIR")
+    assert cache.default_version_dir() == os.path.join(server.ROOT_DIR, ".versions")
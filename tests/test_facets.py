@@ -0,0 +1,54 @@
+import sqlite3
+import uuid
+
+import facets
+
+
+def _counts(conn):
+    return {(field, value): count for field, value, count in conn.execute(f"SELECT * FROM {facets.FACET_TABLE}")}
+
+
+def _db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE doctors (id TEXT PRIMARY KEY, name TEXT, city TEXT, specialty TEXT)")
+    conn.execute("INSERT INTO doctors VALUES ('0', 'Old', 'Belém', 'Retina')")
+    facets.ensure_facets(conn)
+    return conn
+
+
+def test_existing_rows_are_counted_on_creation():
+    assert _counts(_db()) == {("city", "Belém"): 1, ("specialty", "Retina"): 1}
+
+
+def test_triggers_follow_insert_update_and_delete():
+    conn = _db()
+    conn.execute("INSERT INTO doctors VALUES ('1', 'A', 'Belém', 'Glaucoma'), ('2', 'B', 'Marabá', ''), "
+                 "('3', 'C', NULL, 'Retina')")
+    assert _counts(conn) == {("city", "Belém"): 2, ("city", "Marabá"): 1,
+                             ("specialty", "Retina"): 2, ("specialty", "Glaucoma"): 1}
+
+    conn.execute("UPDATE doctors SET city = 'Santarém' WHERE id = '2'")
+    conn.execute("UPDATE doctors SET name = 'Renamed' WHERE id = '1'")
+    assert _counts(conn)[("city", "Santarém")] == 1
+    assert ("city", "Marabá") not in _counts(conn)
+
+    conn.execute("DELETE FROM doctors WHERE id IN ('0', '3')")
+    assert _counts(conn) == {("city", "Belém"): 1, ("city", "Santarém"): 1, ("specialty", "Glaucoma"): 1}
+
+
+def test_recreated_doctors_table_is_recounted():
+    conn = _db()
+    conn.execute("DROP TABLE doctors")
+    conn.execute("CREATE TABLE doctors (id TEXT PRIMARY KEY, name TEXT, city TEXT, specialty TEXT)")
+    conn.execute("INSERT INTO doctors VALUES ('9', 'Z', 'Castanhal', 'Plástica')")
+    facets.ensure_facets(conn)
+    assert _counts(conn) == {("city", "Castanhal"): 1, ("specialty", "Plástica"): 1}
+
+
+def test_facets_endpoint_sees_api_writes(client, auth_headers):
+    city = f"Facetópolis {uuid.uuid4().hex[:8]}"
+    doctor = {"name": "Dr. F", "city": city, "specialty": "Retina", "contact_info": "-"}
+    created = client.post("/api/doctors", json=doctor, headers=auth_headers).json()
+    assert {"value": city, "count": 1} in client.get("/api/doctors/facets").json()["city"]
+    client.delete(f"/api/doctors/{created['id']}", headers=auth_headers)
+    assert city not in [facet["value"] for facet in client.get("/api/doctors/facets").json()["city"]]
@@ -0,0 +1,117 @@
+import hashlib
+import os
+from email.utils import formatdate
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import file_serving
+from file_serving import RangeNotSatisfiable, parse_range
+from static_assets import IMMUTABLE, REVALIDATE
+
+DATA = bytes(range(256)) * 40
+NAME = hashlib.sha256(DATA).hexdigest() + ".jpg"
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / NAME).write_bytes(DATA)
+    (tmp_path / "abc.variants.json").write_text("{}")
+    server = file_serving.FileServer(str(tmp_path), chunk_size=1000)
+
+    async def serve(request):
+        return server.response(request.path_params["name"], request) or Response(status_code=404)
+
+    app = Starlette(routes=[Route("/uploads/{name}", serve, methods=["GET", "HEAD"])])
+    with TestClient(app) as client:
+        yield client, server
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-10", (990, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=10-5", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 1000)
+
+
+def test_whole_file_is_immutable(files):
+    client, _ = files
+    response = client.get(f"/uploads/{NAME}")
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.headers["etag"] == f'"{NAME[:64]}"'
+    assert client.get("/uploads/abc.variants.json").headers["cache-control"] == REVALIDATE
+    assert client.get("/uploads/missing.jpg").status_code == 404
+    assert client.get("/uploads/.partial").status_code == 404
+
+
+def test_range_gets_206(files):
+    client, server = files
+    response = client.get(f"/uploads/{NAME}", headers={"Range": "bytes=1000-2999"})
+    assert response.status_code == 206
+    assert response.content == DATA[1000:3000]
+    assert response.headers["content-range"] == f"bytes 1000-2999/{len(DATA)}"
+    assert response.headers["content-length"] == "2000"
+    assert server.partial == 1
+
+
+def test_unsatisfiable_range_gets_416(files):
+    client, _ = files
+    response = client.get(f"/uploads/{NAME}", headers={"Range": f"bytes={len(DATA)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+def test_if_range(files):
+    client, _ = files
+    etag = client.get(f"/uploads/{NAME}").headers["etag"]
+    matching = client.get(f"/uploads/{NAME}", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert matching.status_code == 206 and matching.content == DATA[:10]
+    stale = client.get(f"/uploads/{NAME}", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert stale.status_code == 200 and stale.content == DATA
+    weak = client.get(f"/uploads/{NAME}", headers={"Range": "bytes=0-9", "If-Range": "W/" + etag})
+    assert weak.status_code == 200
+
+
+def test_conditional_get_gets_304(files):
+    client, server = files
+    first = client.get(f"/uploads/{NAME}")
+    by_etag = client.get(f"/uploads/{NAME}", headers={"If-None-Match": first.headers["etag"]})
+    assert by_etag.status_code == 304 and by_etag.content == b""
+    by_date = client.get(f"/uploads/{NAME}", headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert by_date.status_code == 304
+    # If-None-Match takes precedence over If-Modified-Since
+    changed = client.get(f"/uploads/{NAME}", headers={
+        "If-None-Match": '"other"', "If-Modified-Since": first.headers["last-modified"],
+    })
+    assert changed.status_code == 200
+    older = formatdate(os.stat(os.path.join(server.directory, NAME)).st_mtime - 60, usegmt=True)
+    assert client.get(f"/uploads/{NAME}", headers={"If-Modified-Since": older}).status_code == 200
+    assert server.not_modified == 2
+
+
+def test_accel_redirect_leaves_the_body_to_nginx(files):
+    client, server = files
+    server.accel_redirect = "/_uploads/"
+    response = client.get(f"/uploads/{NAME}", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 200
+    assert response.headers["x-accel-redirect"] == f"/_uploads/{NAME}"
+    assert response.content == b""
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+
+import hashing
+from .conftest import PASSWORD, USERNAME
+
+
+def test_verify_runs_in_the_pool():
+    hasher = hashing.PasswordHasher(max_workers=1)
+    hashed = hasher.context.hash("secret")
+
+    async def check():
+        return await hasher.verify("secret", hashed), await hasher.verify("wrong", hashed)
+
+    try:
+        assert asyncio.run(check()) == (True, False)
+    finally:
+        hasher.shutdown()
+
+
+def test_full_queue_fails_fast():
+    hasher = hashing.PasswordHasher(max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def burst():
+        running = asyncio.ensure_future(hasher._run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(hashing.HasherBusy):
+            await hasher._run(release.wait)
+        release.set()
+        await running
+
+    try:
+        asyncio.run(burst())
+    finally:
+        hasher.shutdown()
+    assert hasher.rejected == 1
+    assert hasher.pending == 0
+
+
+def test_busy_hasher_answers_login_with_503(client, server, monkeypatch):
+    monkeypatch.setattr(server.password_hasher, "pending", server.password_hasher.max_pending)
+    response = client.post("/api/auth/login", data={"username": USERNAME, "password": PASSWORD})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
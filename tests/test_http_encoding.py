@@ -0,0 +1,82 @@
+import gzip
+import json
+import uuid
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import http_encoding
+
+ROWS = [{"id": i, "name": f"Médico {i}", "city": "Belém"} for i in range(200)]
+
+
+def _rows(request):
+    return JSONResponse(ROWS, headers={"ETag": '"v1"'})
+
+
+def _small(request):
+    return JSONResponse({"ok": True})
+
+
+def _image(request):
+    return Response(b"\x89PNG" + b"\0" * 5000, media_type="image/png")
+
+
+@pytest.fixture(scope="module")
+def app_client():
+    app = Starlette(routes=[Route("/api/rows", _rows), Route("/api/small", _small), Route("/api/image", _image),
+                            Route("/other", _rows)])
+    app.add_middleware(http_encoding.CompressionMiddleware, prefixes=("/api/",), min_size=1024)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("accept, encoding", [("gzip", "gzip"), ("br, gzip", "br")])
+def test_large_json_is_compressed_with_a_weak_etag(app_client, accept, encoding):
+    response = app_client.get("/api/rows", headers={"Accept-Encoding": accept})
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["etag"] == 'W/"v1"'
+    assert "Accept-Encoding" in response.headers["vary"]
+    # httpx decodes the body
+    assert response.json() == ROWS
+
+
+def test_compressed_bodies_are_memoized_by_etag(app_client):
+    middleware = app_client.app.middleware_stack.app
+    app_client.get("/api/rows", headers={"Accept-Encoding": "gzip"})
+    assert middleware.memo.get(('"v1"', "gzip")) is not None
+
+
+@pytest.mark.parametrize("path, accept", [
+    ("/api/small", "gzip"),      # below min_size
+    ("/api/image", "gzip"),      # not a text type
+    ("/api/rows", "identity"),   # not accepted
+    ("/other", "gzip"),          # outside the prefixes
+])
+def test_passthrough(app_client, path, accept):
+    response = app_client.get(path, headers={"Accept-Encoding": accept})
+    assert "content-encoding" not in response.headers
+
+
+def test_fast_json_matches_stdlib_json():
+    body = http_encoding.FastJSONResponse({"name": "Belém", 1: [1.5, None]}).body
+    assert json.loads(body) == {"name": "Belém", "1": [1.5, None]}
+
+
+def test_weak_etag_revalidates_cached_listing(client, auth_headers):
+    city = f"Gzipópolis {uuid.uuid4().hex[:8]}"
+    for i in range(10):
+        doctor = {"name": f"Dr. {i}", "city": city, "specialty": "Retina", "contact_info": "(91) 3222-1234 " * 10}
+        client.post("/api/doctors", json=doctor, headers=auth_headers)
+    first = client.get("/api/doctors", params={"city": city}, headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"].startswith("W/")
+    again = client.get("/api/doctors", params={"city": city},
+                       headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_gzip_round_trip():
+    assert gzip.decompress(http_encoding.compress(b"x" * 100, "gzip")) == b"x" * 100
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import os
+import threading
+
+from PIL import Image
+
+import images
+
+
+def _photo(upload_dir, name="abc.jpg", size=(1000, 500)):
+    Image.new("RGB", size, (200, 30, 30)).save(os.path.join(upload_dir, name), "JPEG")
+    return name
+
+
+def test_variants_are_width_bounded_and_never_upscaled(tmp_path):
+    name = _photo(tmp_path)
+    variants = images.render_variants(str(tmp_path), name, (320, 640, 1280), "webp")
+    assert variants == {"320w": "abc-320w.webp", "640w": "abc-640w.webp"}
+    with Image.open(tmp_path / "abc-320w.webp") as variant:
+        assert variant.format == "WEBP" and variant.size == (320, 160)
+    assert json.loads((tmp_path / "abc.variants.json").read_text()) == variants
+
+
+def test_jpeg_variants_of_transparent_images(tmp_path):
+    Image.new("RGBA", (800, 800)).save(tmp_path / "t.png")
+    assert images.render_variants(str(tmp_path), "t.png", (320,), "jpeg") == {"320w": "t-320w.jpg"}
+
+
+def test_srcset_of_stored_and_external_urls(tmp_path):
+    name = _photo(tmp_path)
+    images.render_variants(str(tmp_path), name, (320,), "webp")
+    pipeline = images.ImagePipeline(str(tmp_path), url_prefix="/uploads/")
+    assert pipeline.srcset(f"/uploads/{name}") == {"320w": "/uploads/abc-320w.webp"}
+    assert pipeline.srcset("https://example.com/abc.jpg") is None
+    assert pipeline.srcset(None) is None
+
+
+def test_srcsets_are_bounded_and_misses_expire(tmp_path, monkeypatch):
+    pipeline = images.ImagePipeline(str(tmp_path), max_srcsets=2, miss_ttl=60)
+    assert pipeline.srcset("/uploads/late.jpg") is None
+    (tmp_path / "late.variants.json").write_text('{"320w": "late-320w.webp"}')
+    assert pipeline.srcset("/uploads/late.jpg") is None
+    clock = images.time.monotonic() + 61
+    monkeypatch.setattr(images.time, "monotonic", lambda: clock)
+    assert pipeline.srcset("/uploads/late.jpg") == {"320w": "/uploads/late-320w.webp"}
+
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        pipeline.srcset(f"/uploads/{name}")
+    assert list(pipeline._srcsets) == ["b.jpg", "c.jpg"]
+
+
+def test_preload_reads_manifests_off_the_event_loop(tmp_path):
+    (tmp_path / "p.variants.json").write_text('{"320w": "p-320w.webp"}')
+    pipeline = images.ImagePipeline(str(tmp_path))
+    readers = []
+    load = pipeline._load
+    pipeline._load = lambda filename: readers.append(threading.current_thread()) or load(filename)
+
+    asyncio.run(pipeline.preload(["/uploads/p.jpg", "/uploads/p.jpg", "https://example.com/x.jpg", None]))
+    assert len(readers) == 1 and readers[0] is not threading.current_thread()
+    assert pipeline.srcset("/uploads/p.jpg") == {"320w": "/uploads/p-320w.webp"}
+    assert len(readers) == 1
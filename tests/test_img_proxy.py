@@ -0,0 +1,67 @@
+import asyncio
+
+import httpx
+import pytest
+
+import img_proxy
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+def upstream(request: httpx.Request) -> httpx.Response:
+    routes = {
+        "/photo.png": lambda: httpx.Response(200, content=PNG, headers={"content-type": "image/png"}),
+        "/moved": lambda: httpx.Response(302, headers={"location": "/photo.png"}),
+        "/escape": lambda: httpx.Response(302, headers={"location": "http://internal.test/secret.png"}),
+        "/loop": lambda: httpx.Response(302, headers={"location": "/loop"}),
+        "/etag.png": lambda: (
+            httpx.Response(304) if request.headers.get("if-none-match") == '"v1"'
+            else httpx.Response(200, content=PNG, headers={"content-type": "image/png", "etag": '"v1"'})
+        ),
+        "/logo.svg": lambda: httpx.Response(200, content=b"<svg onload='alert(1)'/>",
+                                             headers={"content-type": "image/svg+xml"}),
+    }
+    if request.url.host != "allowed.test" or request.url.path not in routes:
+        return httpx.Response(200, content=PNG, headers={"content-type": "image/png"})
+    return routes[request.url.path]()
+
+
+@pytest.fixture
+def proxy(tmp_path):
+    return img_proxy.ImageProxyCache(
+        str(tmp_path), allowed_hosts=["allowed.test"], default_ttl=0,
+        client_factory=lambda: httpx.AsyncClient(transport=httpx.MockTransport(upstream), follow_redirects=True),
+    )
+
+
+def fetch(proxy, url):
+    async def run():
+        try:
+            return await proxy.fetch(url)
+        finally:
+            await proxy.close()
+
+    return asyncio.run(run())
+
+
+def test_serves_allowed_image_and_redirect_within_allowlist(proxy):
+    assert open(fetch(proxy, "http://allowed.test/photo.png").path, "rb").read() == PNG
+    assert fetch(proxy, "http://allowed.test/moved").content_type == "image/png"
+
+
+def test_revalidates_with_a_304(proxy):
+    first = fetch(proxy, "http://allowed.test/etag.png")
+    assert fetch(proxy, "http://allowed.test/etag.png") == first
+    assert proxy.revalidations == 1
+
+
+@pytest.mark.parametrize("url, status", [
+    ("http://internal.test/secret.png", 403),
+    ("http://allowed.test/escape", 502),
+    ("http://allowed.test/loop", 502),
+    ("http://allowed.test/logo.svg", 502),
+])
+def test_refuses_other_hosts_redirects_out_of_the_allowlist_and_svg(proxy, url, status):
+    with pytest.raises(img_proxy.ProxyError) as error:
+        fetch(proxy, url)
+    assert error.value.status_code == status
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import init_db  # noqa: E402
+
+
+@pytest.mark.parametrize("value", ["", "   "])
+def test_blank_admin_password_counts_as_unset(monkeypatch, value):
+    monkeypatch.setenv("ADMIN_PASSWORD", value)
+    assert init_db.env_admin_password() == init_db.DEFAULT_ADMIN_PASSWORD
+
+
+def test_admin_password_from_environment(monkeypatch):
+    monkeypatch.setenv("ADMIN_PASSWORD", "s3cret")
+    assert init_db.env_admin_password() == "s3cret"
+
+
+def test_empty_admin_password_argument_is_refused():
+    result = subprocess.run([sys.executable, init_db.__file__, "--admin-password", " "], capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "must not be empty" in result.stderr
@@ -0,0 +1,81 @@
+import json
+import subprocess
+import sys
+
+from starlette.requests import Request
+
+import metrics
+
+
+def _metrics(tmp_path):
+    m = metrics.Metrics(str(tmp_path), buckets=(0.1, 1.0))
+    m.counter("jobs_total", "Jobs", ("kind",))
+    m.histogram("job_seconds", "Job time", ("kind",))
+    m.gauge("busy", "Busy workers")
+    return m
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_render_counters_and_cumulative_histograms(tmp_path):
+    m = _metrics(tmp_path)
+    m.inc("jobs_total", ("a",), 2)
+    for seconds in (0.05, 0.5, 5):
+        m.observe("job_seconds", ("a",), seconds)
+    text = m.render()
+    assert 'jobs_total{kind="a"} 2' in text
+    assert 'job_seconds_bucket{kind="a",le="0.1"} 1' in text
+    assert 'job_seconds_bucket{kind="a",le="1"} 2' in text
+    assert 'job_seconds_bucket{kind="a",le="+Inf"} 3' in text
+    assert 'job_seconds_count{kind="a"} 3' in text
+
+
+def test_dead_workers_are_folded_into_the_archive(tmp_path):
+    m = _metrics(tmp_path)
+    m.inc("jobs_total", ("a",), 1)
+    dead = tmp_path / f"{_dead_pid()}.json"
+    dead.write_text(json.dumps({
+        "counters": [["jobs_total", ["a"], 10]],
+        "histograms": [["job_seconds", ["a"], [1, 0, 0, 0.05]]],
+        "gauges": [["busy", [], 7]],
+    }))
+    first = m.render()
+    assert 'jobs_total{kind="a"} 11' in first
+    assert 'job_seconds_count{kind="a"} 1' in first
+    # Gauges only count live workers
+    assert "busy 7" not in first
+    assert not dead.exists()
+    assert json.loads((tmp_path / metrics.ARCHIVE).read_text())["counters"] == [["jobs_total", ["a"], 10]]
+    # Folded once: the totals do not grow on the next scrape
+    assert 'jobs_total{kind="a"} 11' in m.render()
+
+
+def test_collectors_are_sampled_at_flush(tmp_path):
+    m = _metrics(tmp_path)
+    m.counter("cache_hits_total", "Hits", ("cache",))
+    m.counter("cache_misses_total", "Misses", ("cache",))
+    m.collectors.append(metrics.cache_collector("responses", lambda: {"hits": 3, "misses": 1}))
+    assert 'cache_hit_ratio{cache="responses"} 0.7500' in m.render()
+
+
+def _request(host, headers=()):
+    return Request({"type": "http", "client": (host, 5000), "headers": list(headers)})
+
+
+def test_metrics_endpoint_needs_the_token_or_a_local_scraper(client, server, monkeypatch):
+    assert client.get("/metrics").status_code == 403
+    assert server._is_local(_request("127.0.0.1")) and server._is_local(_request("::1"))
+    assert not server._is_local(_request("203.0.113.9"))
+    assert not server._is_local(_request("127.0.0.1", [(b"x-forwarded-for", b"203.0.113.9")]))
+
+    monkeypatch.setattr(server, "_is_local", lambda request: True)
+    response = client.get("/metrics")
+    assert response.status_code == 200 and "http_requests_total" in response.text
+
+    monkeypatch.setattr(server, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
@@ -0,0 +1,105 @@
+import sqlite3
+from datetime import datetime
+
+import migrations
+import search
+
+
+def _double(cursor, after, limit):
+    cursor.execute("SELECT rowid FROM items WHERE rowid > ? ORDER BY rowid LIMIT ?", (after, limit))
+    rowids = [row[0] for row in cursor.fetchall()]
+    cursor.executemany("UPDATE items SET doubled = v * 2 WHERE rowid = ?", [(rowid,) for rowid in rowids])
+    return (rowids[-1] if rowids else None), len(rowids)
+
+
+MIGRATION = migrations.Migration("0001_doubled", ("ALTER TABLE items ADD COLUMN doubled INTEGER",), _double, "items")
+
+
+def _database(tmp_path):
+    path = str(tmp_path / "m.db")
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("CREATE TABLE items (v INTEGER)")
+    conn.executemany("INSERT INTO items VALUES (?)", [(i,) for i in range(100)])
+    conn.execute("BEGIN IMMEDIATE")
+    assert migrations.apply(conn, [MIGRATION]) == ["0001_doubled"]
+    conn.execute("COMMIT")
+    return path, conn
+
+
+def test_backfill_resumes_where_it_stopped(tmp_path):
+    path, conn = _database(tmp_path)
+    first = migrations.Backfiller(path, [MIGRATION], batch_size=10, pause=0)
+    batches = []
+
+    def stop_after_three(name, reached, changed):
+        batches.append(reached)
+        if len(batches) == 3:
+            first.stop()
+
+    assert first.run(stop_after_three) is False
+    assert conn.execute("SELECT count(*) FROM items WHERE doubled IS NOT NULL").fetchone()[0] == 30
+    assert migrations.status(conn)[0]["backfill_after"] == 30
+
+    second = migrations.Backfiller(path, [MIGRATION], batch_size=10, pause=0)
+    assert second.run() is True
+    assert second.changed == {"items"}
+    assert conn.execute("SELECT count(*) FROM items WHERE doubled = v * 2").fetchone()[0] == 100
+    row = migrations.status(conn)[0]
+    assert row["rows_changed"] == 100 and row["finished_at"] is not None
+    assert migrations.pending(conn) == []
+
+
+def test_apply_skips_applied_migrations_and_existing_columns(tmp_path):
+    path, conn = _database(tmp_path)
+    assert migrations.apply(conn, [MIGRATION]) == ["0001_doubled"]
+    fresh = sqlite3.connect(":memory:")
+    # The models already created the column: the ALTER is skipped
+    fresh.execute("CREATE TABLE items (v INTEGER, doubled INTEGER)")
+    assert migrations.apply(fresh, [MIGRATION]) == ["0001_doubled"]
+
+
+def test_unknown_pending_backfill_is_left_alone(tmp_path):
+    path, _ = _database(tmp_path)
+    assert migrations.Backfiller(path, [], pause=0).run() is False
+
+
+def test_doctors_are_rekeyed_on_seq(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "old.db"), isolation_level=None)
+    # The schema before 0002_doctor_seq, search index and index included
+    conn.execute("CREATE TABLE doctors (id TEXT PRIMARY KEY, name TEXT, city TEXT, specialty TEXT, "
+                 "contact_info TEXT, image_url TEXT, created_at TIMESTAMP)")
+    conn.execute("CREATE INDEX ix_doctors_name ON doctors (name)")
+    conn.execute("CREATE VIRTUAL TABLE doctors_fts USING fts5(name, city, specialty, content='doctors')")
+    conn.executemany("INSERT INTO doctors(id, name, city) VALUES (?, ?, ?)",
+                     [(f"id-{i}", f"Dr. {i}", "Belém" if i % 2 else "Santarém") for i in range(10)])
+    conn.execute("DELETE FROM doctors WHERE id IN ('id-2', 'id-5')")
+    before = conn.execute("SELECT rowid, id FROM doctors ORDER BY rowid").fetchall()
+
+    conn.execute("BEGIN IMMEDIATE")
+    migrations.apply(conn, [m for m in migrations.MIGRATIONS if m.name == "0002_doctor_seq"])
+    search.ensure_search_index(conn)
+    conn.execute("COMMIT")
+
+    assert conn.execute("SELECT seq, id FROM doctors ORDER BY seq").fetchall() == before
+    assert {row[1] for row in conn.execute("PRAGMA index_list(doctors)")} == {"ix_doctors_name", "sqlite_autoindex_doctors_1"}
+    conn.execute("INSERT INTO doctors(id, name, city) VALUES ('id-new', 'Dr. Novo', 'Belém')")
+    conn.execute("DELETE FROM doctors WHERE id = 'id-0'")
+    conn.execute("VACUUM")
+    hits = conn.execute(
+        "SELECT d.name FROM doctors_fts JOIN doctors d ON d.seq = doctors_fts.rowid "
+        "WHERE doctors_fts MATCH 'belem' ORDER BY d.seq"
+    ).fetchall()
+    assert [name for (name,) in hits] == ["Dr. 1", "Dr. 3", "Dr. 7", "Dr. 9", "Dr. Novo"]
+
+
+def test_events_without_created_at_get_one(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "old.db"), isolation_level=None)
+    conn.execute("CREATE TABLE events (id TEXT PRIMARY KEY, title TEXT, created_at DATETIME)")
+    conn.execute("INSERT INTO events(id, title) VALUES ('old', 'Antigo')")
+    migrations.apply(conn, [m for m in migrations.MIGRATIONS if m.name == "0003_event_created_at"])
+    conn.execute("INSERT INTO events(id, title) VALUES ('new', 'Novo')")
+    conn.execute("INSERT INTO events(id, title, created_at) VALUES ('set', 'Com data', '2030-01-01 00:00:00.000000')")
+    created = dict(conn.execute("SELECT id, created_at FROM events"))
+    assert created["old"] == "1970-01-01 00:00:00.000000"
+    assert created["set"] == "2030-01-01 00:00:00.000000"
+    assert datetime.strptime(created["new"], "%Y-%m-%d %H:%M:%S.%f") > datetime(2020, 1, 1)
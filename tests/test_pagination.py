@@ -0,0 +1,83 @@
+import sqlite3
+import uuid
+
+import pytest
+
+
+def _pages(client, path, params):
+    """Every page of a listing, following X-Next-Cursor."""
+    pages, cursor = [], None
+    while True:
+        response = client.get(path, params=dict(params, cursor=cursor) if cursor else params)
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture(scope="module")
+def city(client, auth_headers):
+    city = f"Paginópolis {uuid.uuid4().hex[:8]}"
+    for i in range(5):
+        doctor = {"name": f"Oculista {i}", "city": city, "specialty": "Córnea", "contact_info": "-"}
+        assert client.post("/api/doctors", json=doctor, headers=auth_headers).status_code == 201
+    return city
+
+
+def test_doctor_pages_cover_every_row_once(client, city):
+    pages = _pages(client, "/api/doctors", {"city": city, "limit": 2})
+    assert [len(page) for page in pages] == [2, 2, 1]
+    names = [doctor["name"] for page in pages for doctor in page]
+    assert names == [f"Oculista {i}" for i in range(5)]
+
+
+def test_search_pages_follow_the_ranking(client, city):
+    whole = client.get("/api/doctors", params={"q": "oculista", "city": city}).json()
+    pages = _pages(client, "/api/doctors", {"q": "oculista", "city": city, "limit": 2})
+    assert [doctor["id"] for page in pages for doctor in page] == [doctor["id"] for doctor in whole]
+    assert len(whole) == 5
+
+
+def test_event_pages_cover_every_row_once(client, auth_headers):
+    title = f"Jornada {uuid.uuid4().hex[:8]}"
+    for day in (10, 11, 12):
+        event = {"title": title, "date": f"{day} de Março, 2031", "time": "08:00 - 12:00",
+                 "location": "Belém", "description": "-", "status": "Aberto"}
+        assert client.post("/api/events", json=event, headers=auth_headers).status_code == 201
+
+    whole = [event["id"] for page in _pages(client, "/api/events", {"limit": 500}) for event in page]
+    paged = [event["id"] for page in _pages(client, "/api/events", {"limit": 2}) for event in page]
+    assert paged == whole
+    assert len(set(paged)) == len(paged)
+
+    window = {"from": "2031-03-10T00:00:00", "to": "2031-03-12T23:59:59", "limit": 1}
+    found = [event for page in _pages(client, "/api/events", window) for event in page if event["title"] == title]
+    assert [event["date"] for event in found] == [f"{day} de Março, 2031" for day in (10, 11, 12)]
+
+
+def test_events_written_without_created_at_are_paged(client, server):
+    # Raw SQL that leaves created_at out (see the 0003_event_created_at migration)
+    ids = [str(uuid.uuid4()) for _ in range(2)]
+    db = sqlite3.connect(server.DB_PATH)
+    with db:
+        db.executemany(
+            "INSERT INTO events(id, title, date, time, location, description, status) "
+            "VALUES (?, 'Sem data', '-', '-', '-', '-', '-')",
+            [(event_id,) for event_id in ids],
+        )
+    db.close()
+    server.response_cache.bump("events")
+
+    paged = [event["id"] for page in _pages(client, "/api/events", {"limit": 2}) for event in page]
+    assert set(ids) <= set(paged)
+    assert len(set(paged)) == len(paged)
+
+
+@pytest.mark.parametrize("path, cursor", [
+    ("/api/doctors", "not-a-cursor"),
+    # A doctors cursor replayed on events
+    ("/api/events", "WyJkb2N0b3JzIixbMV1d"),
+])
+def test_foreign_or_malformed_cursor_is_rejected(client, path, cursor):
+    assert client.get(path, params={"cursor": cursor}).status_code == 400
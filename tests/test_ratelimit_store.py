@@ -0,0 +1,48 @@
+import multiprocessing
+import time
+
+from limits import parse
+from limits.strategies import FixedWindowRateLimiter
+
+from ratelimit_store import SQLiteStorage
+
+
+def _hammer(uri, times):
+    storage = SQLiteStorage(uri, busy_timeout=10)
+    for _ in range(times):
+        storage.incr("shared", 60)
+
+
+def test_increments_are_atomic_across_processes(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'rl.db'}"
+    SQLiteStorage(uri)
+    fork = multiprocessing.get_context("fork")
+    workers = [fork.Process(target=_hammer, args=(uri, 200)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    assert SQLiteStorage(uri).get("shared") == 800
+
+
+def test_counters_expire(tmp_path):
+    storage = SQLiteStorage(f"sqlite:///{tmp_path / 'rl.db'}")
+    assert storage.incr("k", 0.05) == 1
+    assert storage.incr("k", 0.05) == 2
+    time.sleep(0.1)
+    assert storage.get("k") == 0
+    # An expired window restarts
+    assert storage.incr("k", 60) == 1
+    assert storage.get_expiry("k") > time.time() + 50
+
+
+def test_workers_share_one_limit(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'rl.db'}"
+    # Two workers, each with its own storage object on the same file
+    limiters = [FixedWindowRateLimiter(SQLiteStorage(uri)) for _ in range(2)]
+    limit = parse("5/minute")
+    allowed = [limiters[i % 2].hit(limit, "login", "1.2.3.4") for i in range(7)]
+    assert allowed == [True] * 5 + [False] * 2
+    limiters[0].storage.clear(limit.key_for("login", "1.2.3.4"))
+    assert limiters[1].hit(limit, "login", "1.2.3.4")
@@ -0,0 +1,49 @@
+import uuid
+
+import pytest
+
+import search
+
+
+@pytest.fixture(scope="module")
+def city(client, auth_headers):
+    city = f"Busca {uuid.uuid4().hex[:8]}"
+    for name, specialty in (("Dra. Maria de Souza", "Retina"), ("João Cirurgião", "Cirurgia Refrativa")):
+        response = client.post("/api/doctors", headers=auth_headers, json={
+            "name": name, "city": city, "specialty": specialty, "contact_info": "-",
+        })
+        assert response.status_code == 201, response.text
+    return city
+
+
+@pytest.mark.parametrize("q", ["dr", "de", "*", "  ", '"', "da dos -"])
+def test_query_without_search_terms_is_ignored(client, city, q):
+    response = client.get("/api/doctors", params={"q": q, "city": city})
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 2
+
+
+@pytest.mark.parametrize("q", ["dr", "de", "*", "  "])
+def test_query_without_search_terms_and_no_other_filter(client, city, q):
+    response = client.get("/api/doctors", params={"q": q})
+    assert response.status_code == 200, response.text
+    assert response.json()
+
+
+@pytest.mark.parametrize("q, expected", [
+    ("souza", ["Dra. Maria de Souza"]),
+    ("SOUZÁ", ["Dra. Maria de Souza"]),
+    ("cirurgias", ["João Cirurgião"]),
+    ('retina" OR "x', []),
+    ("NEAR(a b)", []),
+])
+def test_query_is_accent_insensitive_and_never_parsed_as_fts_syntax(client, city, q, expected):
+    response = client.get("/api/doctors", params={"q": q, "city": city})
+    assert response.status_code == 200, response.text
+    assert [doctor["name"] for doctor in response.json()] == expected
+
+
+def test_build_match_quotes_every_term():
+    assert search.build_match(q="de") is None
+    assert search.build_match(q="Belém*") == '"belem"*'
+    assert search.build_match(city="São Paulo") == '{city} : ("sao"* AND "paul"*)'
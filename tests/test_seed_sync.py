@@ -0,0 +1,40 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import seed_sync  # noqa: E402
+
+
+@pytest.mark.parametrize("reset", [False, True])
+def test_seeded_events_get_their_windows(tmp_path, monkeypatch, reset):
+    monkeypatch.setattr(seed_sync, "DB_PATH", str(tmp_path / "seed.db"))
+    monkeypatch.setenv("CACHE_VERSION_DIR", str(tmp_path / "versions"))
+    seed_sync.seed(reset=reset)
+
+    conn = sqlite3.connect(seed_sync.DB_PATH)
+    rows = conn.execute("SELECT title, starts_at, ends_at FROM events").fetchall()
+    conn.close()
+    assert len(rows) == len(seed_sync.events_data)
+    assert all(starts_at and ends_at for _, starts_at, ends_at in rows), rows
+
+
+@pytest.mark.parametrize("delete_missing", [False, True])
+def test_sync_deletes_extra_rows_only_when_asked(tmp_path, monkeypatch, delete_missing):
+    monkeypatch.setattr(seed_sync, "DB_PATH", str(tmp_path / "seed.db"))
+    monkeypatch.setenv("CACHE_VERSION_DIR", str(tmp_path / "versions"))
+    seed_sync.seed()
+    conn = sqlite3.connect(seed_sync.DB_PATH)
+    with conn:
+        conn.execute("INSERT INTO doctors (id, name, city, specialty) VALUES ('extra', 'Added By Admin', 'Belém', 'Retina')")
+    ids = {row[0] for row in conn.execute("SELECT id FROM doctors")}
+    conn.close()
+
+    seed_sync.seed(delete_missing=delete_missing)
+    conn = sqlite3.connect(seed_sync.DB_PATH)
+    after = {row[0] for row in conn.execute("SELECT id FROM doctors")}
+    conn.close()
+    assert after == (ids - {"extra"} if delete_missing else ids)
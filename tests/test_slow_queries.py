@@ -0,0 +1,56 @@
+import json
+
+from sqlalchemy import create_engine, text
+
+import slow_queries
+
+
+def _log(tmp_path, **options):
+    log = slow_queries.SlowQueryLog(str(tmp_path / "slow.log"), **options)
+    engine = create_engine("sqlite://")
+    log.instrument(engine, "write")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER, y TEXT)"))
+        conn.execute(text("CREATE INDEX t_y ON t (y)"))
+    return log, engine
+
+
+def _entries(log):
+    with open(log.path) as fh:
+        return [json.loads(line) for line in fh]
+
+
+def test_normalize_hides_literals():
+    sql = "SELECT * FROM t WHERE y = 'ana@x.com' AND x IN (1, 2, 3) LIMIT 10"
+    assert slow_queries.normalize(sql) == "SELECT * FROM t WHERE y = ? AND x IN (...) LIMIT ?"
+
+
+def test_full_scans_are_logged_once_per_statement_shape(tmp_path):
+    log, engine = _log(tmp_path, threshold=60)
+    with engine.connect() as conn:
+        for x in (1, 2):
+            conn.execute(text("SELECT * FROM t WHERE x = :x"), {"x": x})
+        conn.execute(text("SELECT * FROM t WHERE y = :y"), {"y": "a"})
+    scans = [entry for entry in _entries(log) if entry["kind"] == "full_scan"]
+    assert [entry["sql"] for entry in scans] == ["SELECT * FROM t WHERE x = ?"]
+    assert scans[0]["endpoint"] == "background"
+    assert "SELECT * FROM t WHERE y = ?" in log.plans
+    assert list(log.report()["worker"]["full_scans"]) == ["SELECT * FROM t WHERE x = ?"]
+
+
+def test_slow_statements_record_parameter_types_not_values(tmp_path):
+    log, engine = _log(tmp_path, threshold=0)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT * FROM t WHERE y = :y"), {"y": "secret@medassoc.com"})
+    slow = [entry for entry in _entries(log) if entry["kind"] == "slow" and "y = ?" in entry["sql"]]
+    assert slow and slow[0]["params"] == "(str)"
+    assert "secret" not in open(log.path).read()
+
+
+def test_log_rotates_past_max_bytes(tmp_path):
+    log = slow_queries.SlowQueryLog(str(tmp_path / "slow.log"), max_bytes=200, backups=2)
+    # Two entries pass max_bytes: every second write rotates
+    for i in range(21):
+        log._write({"kind": "slow", "sql": "x" * 100, "i": i})
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["slow.log", "slow.log.1", "slow.log.2"]
+    assert log.tail(1)[0]["i"] == 20
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+
+import static_assets
+from http_encoding import accepted_encodings
+
+BUNDLE = "static/js/main.3f2a1b9c.js"
+
+
+def _request(**headers):
+    return SimpleNamespace(headers={name.replace("_", "-"): value for name, value in headers.items()})
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / BUNDLE).write_text("console.log('spo');\n" * 500)
+    (tmp_path / "index.html").write_text("<!doctype html><div id=root></div>" + " " * 2000)
+    (tmp_path / "robots.txt").write_text("User-agent: *\n")
+    return static_assets.StaticManifest(str(tmp_path)).scan()
+
+
+def test_accepted_encodings_skip_q_zero():
+    assert accepted_encodings("gzip;q=0, br;q=0.5, identity") == {"br", "identity"}
+
+
+@pytest.mark.parametrize("accept, encoding", [("br, gzip", "br"), ("gzip", "gzip"), ("gzip;q=0", None), (None, None)])
+def test_encoding_follows_accept_encoding(manifest, accept, encoding):
+    response = manifest.lookup(BUNDLE).response(_request(accept_encoding=accept) if accept else _request())
+    assert response.headers.get("content-encoding") == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_precompressed_siblings_are_written(manifest, tmp_path):
+    assert (tmp_path / (BUNDLE + ".gz")).exists() and (tmp_path / (BUNDLE + ".br")).exists()
+    # Not listed as assets of their own
+    assert manifest.lookup(BUNDLE + ".gz") is None
+    # Too small to pay off
+    assert list(manifest.lookup("robots.txt").variants) == ["identity"]
+
+
+def test_each_encoding_has_its_own_etag_and_304(manifest):
+    asset = manifest.lookup(BUNDLE)
+    gzip_etag = asset.response(_request(accept_encoding="gzip")).headers["etag"]
+    assert gzip_etag != asset.response(_request()).headers["etag"]
+    assert asset.response(_request(accept_encoding="gzip", if_none_match=gzip_etag)).status_code == 304
+    assert asset.response(_request(accept_encoding="gzip", if_none_match='"other"')).status_code == 200
+
+
+def test_cache_control_depends_on_hashed_names(manifest):
+    assert manifest.lookup(BUNDLE).cache_control == static_assets.IMMUTABLE
+    assert manifest.index.cache_control == static_assets.REVALIDATE
+    # index.html is served from memory
+    assert manifest.index.variants["identity"].body is not None
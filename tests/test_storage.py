@@ -0,0 +1,69 @@
+import asyncio
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import storage
+
+
+class Boom(Exception):
+    pass
+
+
+def _run(db_path, scenario):
+    async def main():
+        write_engine, read_engine = storage.create_engines(db_path)
+        try:
+            async with write_engine.begin() as conn:
+                await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            writer = storage.SerializedWriter(async_sessionmaker(write_engine, expire_on_commit=False))
+            try:
+                return await scenario(writer, read_engine)
+            finally:
+                await writer.close()
+        finally:
+            await write_engine.dispose()
+            await read_engine.dispose()
+
+    return asyncio.run(main())
+
+
+def _insert(x, fail=False):
+    async def job(session):
+        await session.execute(text("INSERT INTO t VALUES (:x)"), {"x": x})
+        if fail:
+            raise Boom(x)
+        return x
+
+    return job
+
+
+def test_failed_job_rolls_back_alone(tmp_path):
+    db_path = str(tmp_path / "w.db")
+
+    async def scenario(writer, _):
+        results = await asyncio.gather(
+            writer.submit(_insert(1)), writer.submit(_insert(2, fail=True)), writer.submit(_insert(3)),
+            return_exceptions=True,
+        )
+        return results, writer.stats()
+
+    results, stats = _run(db_path, scenario)
+    assert results[0] == 1 and results[2] == 3
+    assert isinstance(results[1], Boom)
+    # One transaction, one commit for the three jobs
+    assert stats["batches"] == 1 and stats["jobs"] == 3
+    assert [row[0] for row in sqlite3.connect(db_path).execute("SELECT x FROM t ORDER BY x")] == [1, 3]
+
+
+def test_connections_use_wal_and_readers_cannot_write(tmp_path):
+    async def scenario(_, read_engine):
+        async with read_engine.connect() as conn:
+            mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            with pytest.raises(Exception, match="readonly|query_only"):
+                await conn.execute(text("INSERT INTO t VALUES (1)"))
+        return mode
+
+    assert _run(str(tmp_path / "r.db"), scenario).lower() == "wal"
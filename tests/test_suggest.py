@@ -0,0 +1,36 @@
+import time
+import uuid
+
+
+def _current(client, server):
+    # The first request may have to catch up with earlier tests' writes
+    client.get("/api/doctors/suggest", params={"field": "name", "prefix": "a"})
+    deadline = time.monotonic() + 10
+    while server.suggest_index.version != server.data_versions.current("doctors"):
+        assert time.monotonic() < deadline, "suggest index never caught up"
+        time.sleep(0.05)
+
+
+def test_own_writes_do_not_rebuild_the_index(client, server, auth_headers):
+    _current(client, server)
+    rebuilds = server.suggest_index.rebuilds
+    name = f"Zed {uuid.uuid4().hex[:8]}"
+    doctor = {"name": name, "city": "Suggestópolis", "specialty": "Glaucoma", "contact_info": "-"}
+
+    created = client.post("/api/doctors", json=doctor, headers=auth_headers)
+    assert created.status_code == 201, created.text
+    response = client.get("/api/doctors/suggest", params={"field": "name", "prefix": name})
+    assert response.json() == [{"value": name, "count": 1}]
+
+    renamed = name + " Jr"
+    doctor_id = created.json()["id"]
+    assert client.put(f"/api/doctors/{doctor_id}", json={"name": renamed}, headers=auth_headers).status_code == 200
+    response = client.get("/api/doctors/suggest", params={"field": "name", "prefix": name})
+    assert response.json() == [{"value": renamed, "count": 1}]
+
+    assert client.delete(f"/api/doctors/{doctor_id}", headers=auth_headers).status_code == 200
+    response = client.get("/api/doctors/suggest", params={"field": "name", "prefix": name})
+    assert response.json() == []
+
+    assert server.suggest_index.rebuilds == rebuilds
+    assert server.suggest_index.version == server.data_versions.current("doctors")
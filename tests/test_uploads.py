@@ -0,0 +1,60 @@
+import io
+import uuid
+
+import pytest
+from PIL import Image
+
+
+def _png() -> bytes:
+    # Unique pixels, so the first upload is never a duplicate of another run's
+    out = io.BytesIO()
+    Image.frombytes("RGB", (4, 4), uuid.uuid4().bytes * 3).save(out, "PNG")
+    return out.getvalue()
+
+
+def test_upload_is_stored_under_its_hash_and_deduplicated(client, auth_headers):
+    data = _png()
+    first = client.post("/api/upload", files={"file": ("foto.png", data, "image/png")}, headers=auth_headers)
+    assert first.status_code == 200, first.text
+    assert first.json()["size"] == len(data)
+    assert first.json()["deduplicated"] is False
+
+    second = client.post("/api/upload", files={"file": ("outra.PNG", data, "image/png")}, headers=auth_headers)
+    assert second.json()["url"] == first.json()["url"]
+    assert second.json()["deduplicated"] is True
+    assert client.get(first.json()["url"]).content == data
+
+
+@pytest.mark.parametrize("filename", ["foto.svg", "foto.exe", "foto", "foto.png.html"])
+def test_disallowed_extension_is_rejected(client, auth_headers, filename):
+    response = client.post("/api/upload", files={"file": (filename, b"<svg/>", "image/svg+xml")}, headers=auth_headers)
+    assert response.status_code == 400
+    assert "Invalid file type" in response.json()["detail"]
+
+
+def test_oversized_upload_is_rejected(client, server, auth_headers, monkeypatch):
+    monkeypatch.setattr(server, "UPLOAD_MAX_BYTES", 1024)
+    response = client.post("/api/upload", files={"file": ("big.png", b"\0" * 4096, "image/png")}, headers=auth_headers)
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("request_kwargs", [
+    {"files": {"other": ("foto.png", b"x", "image/png")}},
+    {"content": b"not multipart", "headers": {"Content-Type": "application/octet-stream"}},
+])
+def test_upload_without_a_file_field_is_rejected(client, auth_headers, request_kwargs):
+    kwargs = dict(request_kwargs)
+    kwargs["headers"] = {**auth_headers, **kwargs.get("headers", {})}
+    assert client.post("/api/upload", **kwargs).status_code == 400
+
+
+def test_upload_requires_login(client):
+    response = client.post("/api/upload", files={"file": ("foto.png", _png(), "image/png")})
+    assert response.status_code == 401
+
+
+def test_malformed_multipart_body_is_a_client_error(client, auth_headers):
+    headers = {**auth_headers, "Content-Type": "multipart/form-data; boundary=xyz"}
+    response = client.post("/api/upload", content=b"--xyz\r\nno headers here\x00\r\n\r\n", headers=headers)
+    assert response.status_code == 400
+    assert "Malformed multipart body" in response.json()["detail"]